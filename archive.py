@@ -0,0 +1,235 @@
+import os
+import sys
+import glob
+import gzip
+import json
+import shutil
+import hashlib
+import argparse
+import tempfile
+from datetime import datetime, date
+
+ARCHIVE_DIR = "Archive/store"
+# Files at least this big are stored gzipped when that saves at least a tenth of their size
+COMPRESS_MIN_BYTES = 1024 * 1024
+CHUNK_SIZE = 1024 * 1024
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def file_hash(path):
+    """Returns the SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def code_hash():
+    """Hashes the pipeline's own .py files, so a code change never reuses stale outputs."""
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(CODE_DIR, "*.py"))):
+        digest.update(os.path.basename(path).encode())
+        digest.update(file_hash(path).encode())
+    return digest.hexdigest()
+
+
+def run_key(inputs, run_date=None, extra=None):
+    """Builds the lookup key of a run from its input hashes, the code version and the run date.
+
+    The date is part of the key because derived columns (week of receipt,
+    90-day status) depend on the day the pipeline runs.
+
+    Args:
+        inputs (dict): Role name to file path (inputs, template and config).
+        run_date (date, optional): Day of the run. Defaults to today.
+        extra (dict, optional): Further run settings that change the outputs, such as
+            batch config overrides or the output path.
+
+    Returns:
+        tuple: (key, {role: hash}) where key is a hex digest.
+    """
+    hashes = {role: file_hash(path) for role, path in sorted(inputs.items()) if path and os.path.exists(path)}
+    payload = json.dumps({"inputs": hashes, "code": code_hash(), "date": str(run_date or date.today()),
+                          "extra": extra}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest(), hashes
+
+
+class RunArchive:
+    """Content-addressed store of pipeline runs.
+
+    Layout under the archive directory:
+        objects/ab/<sha256>[.gz]  every distinct file, stored once
+        runs/<run_id>.json        one manifest per run
+        keys/<run_key>            the run_id of the latest run for a given key
+    """
+
+    def __init__(self, archive_dir=ARCHIVE_DIR, compress_min_bytes=COMPRESS_MIN_BYTES):
+        self.archive_dir = archive_dir
+        self.compress_min_bytes = compress_min_bytes
+        for sub in ("objects", "runs", "keys"):
+            os.makedirs(os.path.join(archive_dir, sub), exist_ok=True)
+
+    def _object_path(self, digest, compressed):
+        return os.path.join(self.archive_dir, "objects", digest[:2], digest + (".gz" if compressed else ""))
+
+    def _find_object(self, digest):
+        for compressed in (False, True):
+            path = self._object_path(digest, compressed)
+            if os.path.exists(path):
+                return path, compressed
+        return None, None
+
+    def store_file(self, path, digest=None):
+        """Stores a file once by content hash.
+
+        Each writer copies into its own temp file, so batch jobs archiving the same
+        input in parallel never move each other's half-written copy into place; an
+        object another writer stored first is kept.
+
+        Returns:
+            dict: The manifest entry (hash, size, compressed, original name).
+        """
+        digest = digest or file_hash(path)
+        size = os.path.getsize(path)
+        stored, compressed = self._find_object(digest)
+        if stored is None:
+            compressed = False
+            target = self._object_path(digest, False)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            handle, tmp = tempfile.mkstemp(dir=os.path.dirname(target), prefix=digest, suffix=".tmp")
+            os.close(handle)
+            if size >= self.compress_min_bytes:
+                with open(path, "rb") as src, gzip.open(tmp, "wb", compresslevel=6) as dst:
+                    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+                if os.path.getsize(tmp) <= size * 0.9:
+                    compressed = True
+                    target = self._object_path(digest, True)
+                else:
+                    os.remove(tmp)
+            if not compressed:
+                shutil.copyfile(path, tmp)
+            try:
+                if os.path.exists(target):
+                    os.remove(tmp)
+                else:
+                    os.replace(tmp, target)
+            except OSError:
+                # On Windows replacing an object another job has just stored and opened fails
+                if not os.path.exists(target):
+                    raise
+                os.remove(tmp)
+        return {"hash": digest, "size": size, "compressed": compressed, "name": os.path.basename(path)}
+
+    def archive_run(self, inputs, outputs, key=None, input_hashes=None, extra=None):
+        """Stores a run's inputs and outputs and writes its manifest.
+
+        Args:
+            inputs (dict): Role name to input path (inputs, template, config).
+            outputs (dict): Role name to output path.
+            key (str, optional): Run key from run_key(); computed when omitted.
+            input_hashes (dict, optional): Input hashes already computed by run_key().
+            extra (dict, optional): Additional fields recorded in the manifest.
+
+        Returns:
+            dict: The run manifest.
+        """
+        if key is None:
+            key, input_hashes = run_key(inputs)
+        input_hashes = input_hashes or {}
+        run_id = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        manifest = {
+            "run_id": run_id,
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "key": key,
+            "inputs": {role: dict(self.store_file(path, input_hashes.get(role)), path=path)
+                       for role, path in inputs.items() if path and os.path.exists(path)},
+            "outputs": {role: dict(self.store_file(path), path=path)
+                        for role, path in outputs.items() if path and os.path.exists(path)},
+        }
+        manifest.update(extra or {})
+        with open(os.path.join(self.archive_dir, "runs", f"{run_id}.json"), "w") as f:
+            json.dump(manifest, f, indent=2)
+        with open(os.path.join(self.archive_dir, "keys", key), "w") as f:
+            f.write(run_id)
+        return manifest
+
+    def load_run(self, run_id):
+        with open(os.path.join(self.archive_dir, "runs", f"{run_id}.json")) as f:
+            return json.load(f)
+
+    def find_run(self, key):
+        """Returns the manifest of the latest run with this key, or None."""
+        pointer = os.path.join(self.archive_dir, "keys", key)
+        if not os.path.exists(pointer):
+            return None
+        with open(pointer) as f:
+            run_id = f.read().strip()
+        try:
+            return self.load_run(run_id)
+        except FileNotFoundError:
+            return None
+
+    def list_runs(self):
+        runs = sorted(glob.glob(os.path.join(self.archive_dir, "runs", "*.json")))
+        return [os.path.splitext(os.path.basename(path))[0] for path in runs]
+
+    def restore_file(self, entry, destination):
+        """Writes a stored object back to destination, decompressing if needed."""
+        stored, compressed = self._find_object(entry["hash"])
+        if stored is None:
+            raise FileNotFoundError(f"Archived object {entry['hash']} is missing from {self.archive_dir}")
+        os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+        if compressed:
+            with gzip.open(stored, "rb") as src, open(destination, "wb") as dst:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+        else:
+            shutil.copyfile(stored, destination)
+
+    def restore_outputs(self, manifest, output_dir=None):
+        """Restores every output of a run to its original path, or into output_dir.
+
+        Returns:
+            list: The paths written.
+        """
+        written = []
+        for entry in manifest["outputs"].values():
+            destination = os.path.join(output_dir, entry["name"]) if output_dir else entry["path"]
+            self.restore_file(entry, destination)
+            written.append(destination)
+        return written
+
+    def disk_usage(self):
+        total = 0
+        for root, _, files in os.walk(os.path.join(self.archive_dir, "objects")):
+            total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+        return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and restore archived pipeline runs.")
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="List archived runs")
+    show = sub.add_parser("show", help="Print a run manifest")
+    show.add_argument("run_id")
+    restore = sub.add_parser("restore", help="Restore a run's outputs")
+    restore.add_argument("run_id")
+    restore.add_argument("output_dir", nargs="?", help="Directory to restore into (default: original paths)")
+    args = parser.parse_args(argv)
+
+    archive = RunArchive(args.archive_dir)
+    if args.command == "list":
+        for run_id in archive.list_runs():
+            manifest = archive.load_run(run_id)
+            print(f"{run_id}  inputs={len(manifest['inputs'])}  outputs={len(manifest['outputs'])}")
+        print(f"Object store size: {archive.disk_usage() / 1024 / 1024:.1f} MB")
+    elif args.command == "show":
+        print(json.dumps(archive.load_run(args.run_id), indent=2))
+    elif args.command == "restore":
+        for path in archive.restore_outputs(archive.load_run(args.run_id), args.output_dir):
+            print(f"Restored {path}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
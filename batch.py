@@ -0,0 +1,218 @@
+import io
+import os
+import sys
+import time
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import pandas as pd
+import yaml
+from inputs import read_input_cached, input_files
+from runlog import stop_logging
+from validation import load_config, merge_config
+
+CACHE_DIR = "cache/inputs"
+LOG_DIR = "logs/batch"
+JOB_FILES = ("sfid_file", "sfdc_dump_file", "template_file", "output_file")
+
+# Side outputs named after the job's output file unless the job sets them itself,
+# so jobs running side by side never write to the same report
+SIDE_OUTPUTS = [
+    ("exports", "csv_file", ".csv"),
+    ("exports", "parquet_file", ".parquet"),
+    ("exports", "pdf_file", ".pdf"),
+    ("validation", "quality_report_file", "_Data_Quality.xlsx"),
+    ("matching", "report_file", "_Match_Report.xlsx"),
+    ("consolidation", "report_file", "_Consolidation_Report.xlsx"),
+    ("workload", "report_file", "_Workload.xlsx"),
+    ("workload", "parquet_file", "_Workload.parquet"),
+    ("forecast", "report_file", "_Forecast.xlsx"),
+    ("forecast", "parquet_file", "_Forecast.parquet"),
+]
+
+
+def load_manifest(manifest_file):
+    """Loads a YAML (or JSON) batch manifest.
+
+    Layout:
+        workers: 4                 # optional, 0 = one per CPU
+        cache_dir: cache/inputs    # optional parsed-input cache
+        defaults: {...}            # optional config overrides for every job
+        jobs:
+          - name: emea
+            sfid_file: regions/emea/SFID_file.xlsx
+            sfdc_dump_file: shared/SFDC_dump.xlsx
+            template_file: regions/emea/Weekly_Template.xlsx
+            output_file: output/emea/Updated_Template.xlsx
+            overrides: {...}       # optional config overrides for this job
+
+    Returns:
+        dict: The manifest, with every job named and checked for its file paths.
+    """
+    with open(manifest_file) as f:
+        manifest = yaml.safe_load(f) or {}
+    jobs = manifest.get("jobs") or []
+    if not jobs:
+        raise ValueError(f"Manifest '{manifest_file}' has no jobs.")
+    names = set()
+    for number, job in enumerate(jobs, start=1):
+        missing = [name for name in JOB_FILES if not job.get(name)]
+        if missing:
+            raise ValueError(f"Job {number} in '{manifest_file}' is missing {', '.join(missing)}.")
+        job.setdefault("name", os.path.splitext(os.path.basename(job["output_file"]))[0])
+        if job["name"] in names:
+            raise ValueError(f"Job name '{job['name']}' appears more than once in '{manifest_file}'.")
+        names.add(job["name"])
+    return manifest
+
+
+def job_config(base_config, defaults, job):
+    """Builds one job's configuration from the base config, manifest defaults and job overrides.
+
+    Args:
+        base_config (dict): The loaded config/config.yaml.
+        defaults (dict): Overrides applied to every job.
+        job (dict): The manifest entry.
+
+    Returns:
+        tuple: (config, overrides) where overrides are the combined defaults and job overrides.
+    """
+    overrides = merge_config(defaults, job.get("overrides"))
+    config = merge_config(base_config, overrides)
+    stem, _ = os.path.splitext(job["output_file"])
+    for section, setting, suffix in SIDE_OUTPUTS:
+        section_config = config.get(section) or {}
+        if section_config.get(setting) and setting not in ((job.get("overrides") or {}).get(section) or {}):
+            config = merge_config(config, {section: {setting: stem + suffix}})
+    if config.get("templates") and "templates" not in (job.get("overrides") or {}):
+        config = dict(config, templates=[dict(entry, output_file=f"{stem}_{entry['name']}.xlsx")
+                                         for entry in config["templates"]])
+    # Jobs already run one per process, so a partitioned derive would only oversubscribe the CPUs
+    if "workers" not in (overrides.get("derive") or {}):
+        config = merge_config(config, {"derive": {"workers": 1}})
+    return config, overrides
+
+
+def _warm_cache(task):
+    """Pool entry point: parses one shared input into the cache.
+
+    A file that fails to parse is left to the jobs that use it, which report the error.
+    """
+    path, cache_dir, options = task
+    started = time.perf_counter()
+    try:
+        read_input_cached(path, cache_dir, **options)
+    except Exception:
+        return path, None
+    return path, time.perf_counter() - started
+
+
+def _run_job(task):
+    """Pool entry point: runs one job, capturing its console output in the job's log file."""
+    import script
+    job, config, overrides, config_file, cache_dir, log_dir = task
+    log = io.StringIO()
+    result = {"Job": job["name"], "Status": "failed", "Rows": None, "Seconds": None, "Error": ""}
+    started = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(log):
+            outcome = script.run_pipeline(job["sfid_file"], job["sfdc_dump_file"], job["template_file"],
+                                          job["output_file"], config, config_file, cache_dir,
+                                          run_settings={"overrides": overrides})
+        result.update(Status=outcome["status"], Rows=outcome["rows"])
+    except Exception as e:
+        result["Error"] = str(e)
+    finally:
+        # Pool workers skip atexit, so flush this job's structured log now
+        stop_logging()
+    result["Seconds"] = round(time.perf_counter() - started, 2)
+    os.makedirs(log_dir, exist_ok=True)
+    with open(os.path.join(log_dir, f"{job['name']}.log"), "w") as f:
+        f.write(log.getvalue())
+    return result
+
+
+def _input_size(job):
+    return sum(os.path.getsize(file) for name in ("sfid_file", "sfdc_dump_file") for file in input_files(job[name])
+               if os.path.exists(file))
+
+
+def run_batch(manifest, base_config, config_file, workers=None, cache_dir=CACHE_DIR, log_dir=LOG_DIR):
+    """Runs every manifest job on a process pool.
+
+    Inputs used by more than one job are parsed once up front into the
+    parsed-input cache; every other input is parsed (and cached) by its job.
+    Jobs are started largest-input first so that the slow ones do not end
+    up alone at the tail of the run.
+
+    Args:
+        manifest (dict): The manifest from load_manifest.
+        base_config (dict): The loaded config/config.yaml.
+        config_file (str): Path of the config file, archived with each run.
+        workers (int, optional): Process count. Defaults to the CPU count.
+        cache_dir (str, optional): Parsed-input cache directory.
+        log_dir (str, optional): Directory for the per-job console logs.
+
+    Returns:
+        pd.DataFrame: One summary row per job (Job, Status, Rows, Seconds, Error), in manifest order.
+    """
+    jobs = manifest["jobs"]
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    tasks = []
+    shared = {}
+    for job in jobs:
+        config, overrides = job_config(base_config, manifest.get("defaults"), job)
+        tasks.append((job, config, overrides, config_file, cache_dir, log_dir))
+        input_config = config.get("inputs", {}) or {}
+        for path, role in ((job["sfid_file"], "sfid"), (job["sfdc_dump_file"], "sfdc")):
+            options = input_config.get(role, {}) or {}
+            key = (path, repr(sorted(options.items())))
+            shared.setdefault(key, [path, options, 0])[2] += 1
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        warm = [(path, cache_dir, options) for path, options, uses in shared.values()
+                if uses > 1 and all(os.path.exists(file) for file in input_files(path) or [path])]
+        for path, seconds in executor.map(_warm_cache, warm):
+            if seconds is not None:
+                print(f"Cached shared input {path} ({seconds:.2f}s)")
+
+        order = sorted(range(len(tasks)), key=lambda index: _input_size(jobs[index]), reverse=True)
+        futures = {executor.submit(_run_job, tasks[index]): index for index in order}
+        results = [None] * len(tasks)
+        for future in as_completed(futures):
+            result = future.result()
+            results[futures[future]] = result
+            print(f"{result['Job']}: {result['Status']} ({result['Seconds']:.2f}s) {result['Error']}".rstrip())
+    return pd.DataFrame(results).astype({"Rows": "Int64"})
+
+
+def main(argv=None):
+    import script
+    parser = argparse.ArgumentParser(description="Run the pipeline for every job in a batch manifest.")
+    parser.add_argument("manifest", help="YAML or JSON manifest of jobs")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: manifest, then one per CPU)")
+    parser.add_argument("--config", default=script.CONFIG_FILE, help="Base pipeline config")
+    parser.add_argument("--summary", help="Also write the per-job summary to this CSV file")
+    args = parser.parse_args(argv)
+
+    try:
+        manifest = load_manifest(args.manifest)
+    except (OSError, ValueError, yaml.YAMLError) as e:
+        print(f"Error: Could not load manifest. Error: {e}")
+        return 1
+    workers = args.workers if args.workers is not None else manifest.get("workers")
+    started = time.perf_counter()
+    summary = run_batch(manifest, load_config(args.config), args.config, workers or None,
+                        manifest.get("cache_dir", CACHE_DIR), manifest.get("log_dir", LOG_DIR))
+    elapsed = time.perf_counter() - started
+
+    print(summary.to_string(index=False))
+    print(f"{len(summary)} job(s) in {elapsed:.2f}s wall time ({summary['Seconds'].sum():.2f}s of job time)")
+    if args.summary:
+        os.makedirs(os.path.dirname(args.summary) or ".", exist_ok=True)
+        summary.to_csv(args.summary, index=False)
+    return int((summary["Status"] == "failed").any())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
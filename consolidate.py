@@ -0,0 +1,182 @@
+import os
+import heapq
+import shutil
+import tempfile
+from datetime import datetime
+from itertools import groupby
+import pandas as pd
+from exports import typed_frame, unified_schema
+
+KEY_COLUMN = "Opportunity ID"
+# Rows per record batch when a streaming merge reads or writes its sorted runs
+BATCH_ROWS = 100_000
+REPORT_COLUMNS = ["Dump", "File", "Rows", "Kept", "Superseded", "Missing Key"]
+_OLDEST = datetime.min
+
+
+def dump_order(files, order="mtime"):
+    """Orders dump files oldest to newest, by modification time or by file name (dated names)."""
+    if order == "name":
+        return sorted(files)
+    return sorted(files, key=lambda path: (os.path.getmtime(path), path))
+
+
+def _has_key(series):
+    return series.notna() & (series.astype(object).fillna("").astype(str).str.strip() != "")
+
+
+def _report(files, rows, kept, missing):
+    report = pd.DataFrame({"Dump": range(1, len(files) + 1), "File": files, "Rows": rows, "Kept": kept,
+                           "Missing Key": missing})
+    report["Superseded"] = report["Rows"] - report["Kept"]
+    return report[REPORT_COLUMNS]
+
+
+def consolidate_frames(frames, files, key=KEY_COLUMN, modified_column=None):
+    """Keeps the most recent record per key across overlapping dumps, in one vectorized pass.
+
+    Records are ranked by modified_column when the dumps have it, then by dump
+    recency; a stable sort followed by keep-last picks the winner per key.
+    Rows without a key cannot be matched across dumps and are all kept.
+
+    Args:
+        frames (list): One DataFrame per dump, oldest dump first.
+        files (list): The dump file names, in the same order, for the report.
+        key (str, optional): Record key. Defaults to "Opportunity ID".
+        modified_column (str, optional): Last-modified timestamp column, if the dumps have one.
+
+    Returns:
+        tuple: (consolidated DataFrame in first-seen row order, per-dump contribution report).
+    """
+    combined = pd.concat([df.assign(_dump=number) for number, df in enumerate(frames)], ignore_index=True)
+    sort_columns = [key]
+    if modified_column and modified_column in combined.columns:
+        combined["_modified"] = pd.to_datetime(combined[modified_column], errors="coerce")
+        sort_columns.append("_modified")
+    sort_columns.append("_dump")
+
+    keyed = _has_key(combined[key]) if key in combined.columns else pd.Series(False, index=combined.index)
+    latest = (combined[keyed].sort_values(sort_columns, kind="stable", na_position="first")
+              .drop_duplicates(key, keep="last"))
+    result = pd.concat([latest, combined[~keyed]]).sort_index()
+
+    counts = lambda series: series.value_counts().reindex(range(len(frames)), fill_value=0).tolist()
+    report = _report(files, counts(combined["_dump"]), counts(result["_dump"]), counts(combined.loc[~keyed, "_dump"]))
+    result = result.drop(columns=[col for col in ("_dump", "_modified") if col in result.columns])
+    return result.reset_index(drop=True), report
+
+
+def _write_sorted_run(df, path, sort_columns):
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    table = pa.Table.from_pandas(typed_frame(df.sort_values(sort_columns, kind="stable", na_position="first")),
+                                 preserve_index=False)
+    with ipc.new_file(path, table.schema) as writer:
+        writer.write_table(table, max_chunksize=BATCH_ROWS)
+    return table.schema, {name for name in table.column_names if table.column(name).null_count < len(table)}
+
+
+def _read_rows(path, schema):
+    """The run's records, cast to the unified schema; columns the dump lacks come back empty."""
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    with ipc.open_file(path) as reader:
+        for number in range(reader.num_record_batches):
+            batch = reader.get_batch(number)
+            columns = [batch.column(field.name).cast(field.type) if field.name in batch.schema.names
+                       else pa.nulls(batch.num_rows, field.type) for field in schema]
+            yield from pa.RecordBatch.from_arrays(columns, schema=schema).to_pylist()
+
+
+def consolidate_streaming(files, read, key=KEY_COLUMN, modified_column=None, batch_rows=BATCH_ROWS):
+    """Consolidates dumps too large to hold together, with an external sort and a k-way merge.
+
+    Each dump is read on its own, sorted by key, and written to disk as an
+    Arrow IPC run; the runs are then merged with heapq.merge, keeping the
+    latest record of each key group. Only one dump, plus one record batch per
+    run, is in memory at a time. A column empty in one dump takes its type from
+    the dumps that fill it, so all runs merge under one schema. Requires pyarrow.
+
+    Args:
+        files (list): Dump files, oldest first.
+        read (callable): Reads one dump file into a DataFrame.
+        key (str, optional): Record key. Defaults to "Opportunity ID".
+        modified_column (str, optional): Last-modified timestamp column, if the dumps have one.
+        batch_rows (int, optional): Rows per output record batch.
+
+    Returns:
+        tuple: (consolidated DataFrame in key order, rows without a key last; per-dump contribution report).
+    """
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    work_dir = tempfile.mkdtemp(prefix="consolidate_")
+    try:
+        runs, loose, schemas, filled, rows, missing = [], [], [], [], [], []
+        for number, path in enumerate(files):
+            df = read(path)
+            df["_dump"] = number
+            df["_modified"] = (pd.to_datetime(df[modified_column], errors="coerce")
+                               if modified_column and modified_column in df.columns else pd.NaT)
+            keyed = _has_key(df[key]) if key in df.columns else pd.Series(False, index=df.index)
+            rows.append(len(df))
+            missing.append(int((~keyed).sum()))
+            runs.append(os.path.join(work_dir, f"run_{number}.arrow"))
+            for frame, path, sort_columns in [(df[keyed], runs[-1], [key, "_modified", "_dump"])] + (
+                    [(df[~keyed], os.path.join(work_dir, f"loose_{number}.arrow"), ["_dump"])] if missing[-1] else []):
+                run_schema, run_filled = _write_sorted_run(frame, path, sort_columns)
+                schemas.append(run_schema)
+                filled.append(run_filled)
+            if missing[-1]:
+                loose.append(os.path.join(work_dir, f"loose_{number}.arrow"))
+            del df
+
+        schema = unified_schema(schemas, filled)
+        output = os.path.join(work_dir, "consolidated.arrow")
+        kept = [0] * len(files)
+
+        def rank(row):
+            return row[key], row["_modified"] or _OLDEST, row["_dump"]
+
+        def latest_records():
+            for _, group in groupby(heapq.merge(*(_read_rows(run, schema) for run in runs), key=rank),
+                                    key=lambda row: row[key]):
+                *_, last = group
+                yield last
+            for path in loose:
+                yield from _read_rows(path, schema)
+
+        with ipc.new_file(output, schema) as writer:
+            buffer = []
+            for row in latest_records():
+                kept[row["_dump"]] += 1
+                buffer.append(row)
+                if len(buffer) >= batch_rows:
+                    writer.write_table(pa.Table.from_pylist(buffer, schema))
+                    buffer = []
+            if buffer:
+                writer.write_table(pa.Table.from_pylist(buffer, schema))
+
+        result = pd.read_feather(output).drop(columns=["_dump", "_modified"])
+        return result, _report(files, rows, kept, missing)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def consolidate_dumps(files, read, key=KEY_COLUMN, modified_column=None, order="mtime", streaming=False):
+    """Consolidates overlapping SFDC dumps into one frame holding the latest record per key.
+
+    Args:
+        files (list): Dump files, in any order.
+        read (callable): Reads one dump file into a DataFrame.
+        key (str, optional): Record key. Defaults to "Opportunity ID".
+        modified_column (str, optional): Last-modified timestamp column, if the dumps have one.
+        order (str, optional): How dump recency is decided, "mtime" or "name".
+        streaming (bool, optional): Use the disk-backed k-way merge instead of the in-memory sort.
+
+    Returns:
+        tuple: (consolidated DataFrame, per-dump contribution report, oldest dump first).
+    """
+    files = dump_order(files, order)
+    if streaming:
+        return consolidate_streaming(files, read, key, modified_column)
+    return consolidate_frames([read(path) for path in files], files, key, modified_column)
@@ -0,0 +1,118 @@
+import os
+import numpy as np
+import pandas as pd
+from inputs import read_input, read_input_cached
+
+BASE_CURRENCY = "USD"
+FX_FILE = "config/fx_rates.csv"
+MILLION = 1_000_000
+# Input column added by normalize_deal_values: the deal value in absolute base-currency units
+NORMALIZED_COLUMN = "Deal Value (USD)"
+# (amount column, its currency column) on the SFDC side, first non-empty amount wins
+SFDC_AMOUNTS = [("Amount (converted)", "Amount (converted) Currency"), ("Amount", "Amount Currency")]
+SFID_VALUE_M = "$ Value (M)"
+RATE_COLUMNS = ["Currency", "Effective Date", "USD Rate"]
+
+_rates = {}
+
+
+def load_fx_rates(path=FX_FILE, cache_dir=None):
+    """Loads the date-effective FX table once per file version.
+
+    The table lists Currency, Effective Date and USD Rate (USD per one unit of
+    the currency); each rate applies from its effective date until the next one.
+    Within a process the parsed table is kept in memory, and with cache_dir it is
+    also shared between runs through the parsed-input cache.
+
+    Returns:
+        pd.DataFrame: The rates sorted by Effective Date, or None when the file does not exist.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    version = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if version not in _rates:
+        df = read_input_cached(path, cache_dir) if cache_dir else read_input(path)
+        missing = [col for col in RATE_COLUMNS if col not in df.columns]
+        if missing:
+            raise ValueError(f"FX table '{path}' lacks column(s): {', '.join(missing)}")
+        rates = pd.DataFrame({
+            "Currency": df["Currency"].astype(str).str.strip().str.upper(),
+            "Effective Date": pd.to_datetime(df["Effective Date"], errors="coerce").astype("datetime64[ns]"),
+            "USD Rate": pd.to_numeric(df["USD Rate"], errors="coerce"),
+        }).dropna()
+        _rates[version] = rates.sort_values("Effective Date", kind="stable").reset_index(drop=True)
+    return _rates[version]
+
+
+def to_base_currency(amounts, currencies, dates, rates=None):
+    """Converts amounts to USD at the rate effective on each row's date, in one merge_asof.
+
+    Amounts dated before a currency's first rate use its earliest rate; undated
+    amounts use its latest. Currencies without any rate come back missing.
+
+    Args:
+        amounts (pd.Series): Amounts in their own currency.
+        currencies (pd.Series): ISO currency code per row; missing means USD.
+        dates (pd.Series): Date each amount is valued at.
+        rates (pd.DataFrame, optional): Table from load_fx_rates; without it only USD amounts convert.
+
+    Returns:
+        pd.Series: USD amounts, on the amounts' index.
+    """
+    amounts = pd.to_numeric(amounts, errors="coerce")
+    codes = currencies.astype(object).where(currencies.notna(), BASE_CURRENCY).astype(str).str.strip().str.upper()
+    rate = pd.Series(np.where(codes == BASE_CURRENCY, 1.0, np.nan), index=amounts.index)
+    foreign = (codes != BASE_CURRENCY) & amounts.notna()
+    if rates is not None and len(rates) and foreign.any():
+        when = pd.to_datetime(dates[foreign], errors="coerce").astype("datetime64[ns]")
+        lookup = pd.DataFrame({"Currency": codes[foreign].astype(object),
+                               "Effective Date": when.fillna(pd.Timestamp.max.floor("D")),
+                               "_position": np.flatnonzero(foreign.to_numpy())})
+        matched = pd.merge_asof(lookup.sort_values("Effective Date", kind="stable"),
+                                rates.astype({"Currency": object, "Effective Date": "datetime64[ns]"}),
+                                on="Effective Date", by="Currency",
+                                direction="backward")
+        earliest = rates.drop_duplicates("Currency").set_index("Currency")["USD Rate"]
+        found = matched["USD Rate"].fillna(matched["Currency"].map(earliest))
+        values = rate.to_numpy(copy=True)
+        values[matched["_position"].to_numpy()] = found.to_numpy(dtype=float)
+        rate = pd.Series(values, index=amounts.index)
+    return amounts * rate
+
+
+def sfdc_deal_value(sfdc_dump_df, rates=None, date_column="Close Date"):
+    """The SFDC deal value in USD: Amount (converted), else Amount, each in its own currency."""
+    amounts = pd.Series(np.nan, index=sfdc_dump_df.index)
+    currencies = pd.Series(None, index=sfdc_dump_df.index, dtype=object)
+    for amount_column, currency_column in SFDC_AMOUNTS:
+        if amount_column not in sfdc_dump_df.columns:
+            continue
+        fill = amounts.isna() & pd.to_numeric(sfdc_dump_df[amount_column], errors="coerce").notna()
+        amounts[fill] = pd.to_numeric(sfdc_dump_df.loc[fill, amount_column], errors="coerce")
+        if currency_column in sfdc_dump_df.columns:
+            currencies[fill] = sfdc_dump_df.loc[fill, currency_column].astype(object)
+    dates = sfdc_dump_df[date_column] if date_column in sfdc_dump_df.columns else pd.Series(pd.NaT, index=amounts.index)
+    return to_base_currency(amounts, currencies, dates, rates)
+
+
+def sfid_deal_value(sfid_df):
+    """The tracker's deal value in USD: $ Value (M) is in millions."""
+    if SFID_VALUE_M not in sfid_df.columns:
+        return pd.Series(np.nan, index=sfid_df.index)
+    return pd.to_numeric(sfid_df[SFID_VALUE_M], errors="coerce") * MILLION
+
+
+def normalize_deal_values(sfid_df, sfdc_dump_df, rates=None, date_column="Close Date"):
+    """Adds NORMALIZED_COLUMN, the deal value in absolute USD, to both inputs in place.
+
+    Returns:
+        int: SFDC rows with an amount that could not be converted for lack of a rate.
+    """
+    sfdc_dump_df[NORMALIZED_COLUMN] = sfdc_deal_value(sfdc_dump_df, rates, date_column)
+    sfid_df[NORMALIZED_COLUMN] = sfid_deal_value(sfid_df)
+    has_amount = pd.Series(False, index=sfdc_dump_df.index)
+    for amount_column, _ in SFDC_AMOUNTS:
+        if amount_column in sfdc_dump_df.columns:
+            has_amount |= pd.to_numeric(sfdc_dump_df[amount_column], errors="coerce").notna()
+    return int((has_amount & sfdc_dump_df[NORMALIZED_COLUMN].isna()).sum())
@@ -0,0 +1,383 @@
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+from legacy import LARGE_DEAL_THRESHOLD, FISCAL_OFFSET
+from currency import NORMALIZED_COLUMN, SFID_VALUE_M, MILLION
+
+# Template column -> (function, required template columns, (side, column) inputs read)
+DERIVATIONS = {}
+
+OPEN_STAGES = ["1 - Opportunity", "2 - Qualification", "3 - Pursuit", "4 - Proposal", "5 - Closing", "6 - Verbal"]
+NO_BID_STATUSES = ["No-Go", "On-Hold", "Deferred"]
+# Label lookup tables indexed by month number / two-digit year, so labelling is one array take
+QUARTER_LABELS = np.array([None, "Q4", "Q4", "Q4", "Q1", "Q1", "Q1", "Q2", "Q2", "Q2", "Q3", "Q3", "Q3"], dtype=object)
+FY_LABELS = np.array([f"FY{year}" for year in range(100)], dtype=object)
+BID_DIRECTORS = {
+    **dict.fromkeys(["GM APAC", "GM ASIA", "GM ANZ"], "Piyush J"),
+    **dict.fromkeys(["GM EME", "GM MIDDLE EAST", "GM CONTINENTAL EUROPE", "GM UNITED KINGDOM"], "Samrat B"),
+    **dict.fromkeys(["BET NA TELCO", "BET NA EMERGING", "BET NA BFS US", "BET NA CANADA",
+                     "Platinum ac-Citi", "Platinum ac-JPMC"], "Nadeem A"),
+    **dict.fromkeys(["HIL LIFE SCIENCES", "HIL HEALTHCARE", "HIL INSURANCE"], "Anish R"),
+    **dict.fromkeys(["TIME ALPHABET", "TIME IME", "TIME TECHNOLOGY"], "Vineeth V"),
+}
+
+# Template columns copied from the inputs: first non-empty candidate wins, else the default
+SOURCE_COLUMNS = {
+    "Account Name": ([("sfid", "Account Name"), ("sfdc", "Account Name")], ""),
+    "SFID": ([("sfid", "SFID"), ("sfdc", "Opportunity ID")], ""),
+    "Opportunity ID": ([], ""),
+    "Created Date": ([("sfid", "Created Date"), ("sfdc", "Created Date")], None),
+    "Opportunity Description": ([("sfid", "Opportunity Description"), ("sfdc", "Description")], ""),
+    "Group SBU": ([("sfdc", "Group SBU")], None),
+    "Created By": ([("sfdc", "Opportunity Owner")], None),
+    "Stage": ([("sfid", "Deal Stage"), ("sfdc", "Stage")], None),
+    "Opp Type": ([("sfdc", "Type")], None),
+    "Vertical Practice": ([("sfdc", "Vertical Practice")], None),
+    "Tech. Practice": ([("sfid", "Partner Details")], None),
+    "Service Offering": ([("sfdc", "Service Offering")], None),
+    "Engagement Type": ([("sfdc", "Project Type")], None),
+    "Probability": ([("sfdc", "Probability (%)")], None),
+    "Close Date": ([("sfid", "Close Date"), ("sfdc", "Close Date")], None),
+    "Next Steps": ([("sfdc", "Next Step")], None),
+    "Loss Stage": ([("sfdc", "Loss Stage")], None),
+    "Lost Reason": ([("sfdc", "Lost Reason")], None),
+    "Age": ([("sfdc", "Age")], None),
+    "BOLT": ([("sfdc", "BOLT Details")], None),
+    "Category": ([("sfid", "Activity Type")], None),
+    "Partner Details": ([("sfid", "Partner Details")], None),
+    "Proposed Sub. Date": ([("sfid", "Due Date")], None),
+    "Solution SPOCs": ([("sfid", "Solution SPOCs")], None),
+    "Delivery SPOC": ([("sfid", "Delivery Lead")], None),
+    "Proposal Owner": ([("sfid", "Bid Manager")], None),
+    "Proposal Writer": ([("sfid", "Proposal Writer")], None),
+    "Orals SPOC": ([("sfid", "Orals SPOC")], None),
+    "Proposal Updates": ([("sfid", "Status/ Next Steps")], None),
+    "Proposal Status": ([("sfid", "Deal Status")], None),
+    "Actual Sub. Date": ([("sfid", "Due Date")], None),
+    "DSC": ([("sfid", "DSC Status")], None),
+    "Opportunity Stage": ([("sfdc", "Stage")], None),
+    "SBU Mapping": ([("sfdc", "Group SBU")], None),
+}
+
+
+class DerivationContext:
+    """Holds both inputs aligned to the output length plus the columns derived so far.
+
+    A context may cover a row partition of the full inputs: row_offset is the
+    position of its first row and sfid_length the length of the whole SFID input.
+    """
+
+    def __init__(self, sfid_df, sfdc_dump_df, today=None, row_offset=0, sfid_length=None):
+        self.length = max(len(sfid_df), len(sfdc_dump_df))
+        self.index = pd.RangeIndex(row_offset, row_offset + self.length)
+        self.sfid_length = len(sfid_df) + row_offset if sfid_length is None else sfid_length
+        self.frames = {
+            "sfid": self._align(sfid_df),
+            "sfdc": self._align(sfdc_dump_df),
+        }
+        self.today = today or datetime.today()
+        self.values = {}
+
+    def _align(self, df):
+        # Positions past the end of the shorter input read as missing, like the row loop's empty Series
+        df = df.reset_index(drop=True)
+        if len(df) != self.length:
+            df = df.reindex(pd.RangeIndex(self.length))
+        return df.set_axis(self.index)
+
+    def source(self, side, column):
+        """Returns an input column aligned to the output, or None if the input lacks it."""
+        frame = self.frames[side]
+        return frame[column] if column in frame.columns else None
+
+    def constant(self, value):
+        return pd.Series([value] * self.length, index=self.index, dtype=object)
+
+    def __getitem__(self, column):
+        return self.values[column]
+
+
+def derivation(column, requires=(), inputs=()):
+    """Registers a vectorized derivation for a template column.
+
+    The function receives the DerivationContext and returns the whole column at
+    once, as a Series on ctx.index or an array of ctx.length values. This is
+    also the plugin interface: modules in the plugin directory use it the same way.
+
+    Args:
+        column (str): The template column the function produces.
+        requires (tuple, optional): Template columns the function reads from the context.
+        inputs (tuple, optional): (side, column) input columns the function reads, side being "sfid" or "sfdc".
+    """
+    def register(func):
+        DERIVATIONS[column] = (func, tuple(requires), tuple(inputs))
+        return func
+    return register
+
+
+def coalesce(ctx, candidates, default):
+    """Takes the first non-empty candidate input column per row, falling back to default."""
+    result = None
+    for side, column in candidates:
+        series = ctx.source(side, column)
+        if series is None:
+            continue
+        result = series if result is None else result.where(result.notna(), series)
+    if result is None:
+        return ctx.constant(default)
+    if default is not None:
+        if pd.api.types.is_string_dtype(result) or result.dtype == object:
+            return result.fillna(default)
+        result = result.astype(object).where(result.notna(), default)
+    return result
+
+
+def _register_source(column, candidates, default):
+    DERIVATIONS[column] = (lambda ctx: coalesce(ctx, candidates, default), (), tuple(candidates))
+
+
+for _column, (_candidates, _default) in SOURCE_COLUMNS.items():
+    _register_source(_column, _candidates, _default)
+
+
+# --- Vectorized helpers (column equivalents of the legacy row helpers) ---
+def _whole_numbers(series):
+    """Keeps integer dtype when nothing is missing, otherwise floats with NaN (as the row loop's frame did)."""
+    if series.isna().any():
+        return series.astype("float64")
+    return series.astype("int64")
+
+
+def week_from_date(values):
+    dates = pd.to_datetime(values, errors="coerce")
+    return _whole_numbers(dates.dt.isocalendar().week)
+
+
+def _label_array(codes, labels, valid):
+    """Looks up labels for integer codes; rows that are not valid stay None."""
+    result = np.full(len(codes), None, dtype=object)
+    result[valid] = labels[codes[valid]]
+    return result
+
+
+def fiscal_year_short(values, fiscal_offset=FISCAL_OFFSET):
+    dates = pd.to_datetime(values, errors="coerce")
+    valid = dates.notna().to_numpy()
+    year = (dates.dt.year - (dates.dt.month <= fiscal_offset)).fillna(0).astype("int64").to_numpy()
+    return pd.Series(_label_array(year % 100, FY_LABELS, valid), index=dates.index)
+
+
+def quarter(values):
+    dates = pd.to_datetime(values, errors="coerce")
+    valid = dates.notna().to_numpy()
+    month = dates.dt.month.fillna(0).astype("int64").to_numpy()
+    return pd.Series(_label_array(month, QUARTER_LABELS, valid), index=dates.index)
+
+
+def large_deal_from_value(amount):
+    amount = pd.to_numeric(amount, errors="coerce")
+    labels = pd.Series("--", index=amount.index, dtype=object)
+    labels[amount > 0] = "No"
+    labels[amount >= LARGE_DEAL_THRESHOLD] = "Yes"
+    return labels
+
+
+def bid_director(group_sbu):
+    return group_sbu.map(BID_DIRECTORS).astype(object).where(group_sbu.isin(list(BID_DIRECTORS)), "-")
+
+
+def opportunity_status(proposal_status, stage, created_date, today):
+    """Column version of calculate_opportunity_status_from_template; later rules only fill rows still unset."""
+    created = pd.to_datetime(created_date, errors="coerce")
+    unparsable = created_date.notna() & created.isna()
+    stale = created.isna() | ((pd.Timestamp(today) - created).dt.days > 90)
+    status = pd.Series(None, index=proposal_status.index, dtype=object)
+    rules = [
+        (proposal_status.isin(NO_BID_STATUSES), "No-BID"),
+        (stage == "7 - Contract Award", "WON"),
+        (stage == "Lost", "LOST"),
+        (stage.isin(OPEN_STAGES), "OPEN"),
+        (unparsable, "OPEN"),
+        (stale, "CLOSED"),
+    ]
+    unset = pd.Series(True, index=proposal_status.index)
+    for mask, label in rules:
+        mask = mask.fillna(False).astype(bool) & unset
+        status[mask] = label
+        unset &= ~mask
+    return status
+
+
+# --- Derived columns ---
+@derivation("Opportunity Name", inputs=[("sfid", "Opportunity Name")])
+def _opportunity_name(ctx):
+    # The row loop copies the SFID value as-is (even when empty) for rows the SFID input has
+    series = ctx.source("sfid", "Opportunity Name")
+    if series is None:
+        return ctx.constant("")
+    return series.astype(object).where(ctx.index < ctx.sfid_length, "")
+
+
+@derivation("Doc. Recvd. Date")
+def _doc_recvd_date(ctx):
+    today = ctx.today.date()
+    return ctx.constant(today - timedelta(days=today.weekday()))
+
+
+@derivation("Est Deal Value", inputs=[("sfdc", NORMALIZED_COLUMN), ("sfdc", "Amount (converted)"),
+                                     ("sfid", NORMALIZED_COLUMN), ("sfid", SFID_VALUE_M)])
+def _est_deal_value(ctx):
+    # Absolute USD from either input. The row loop never set this column (so its value
+    # columns stay empty) and mixed SFDC dollars with the tracker's millions; here the
+    # normalize stage's column is used when it ran, else the same units are applied inline
+    sfdc = ctx.source("sfdc", NORMALIZED_COLUMN)
+    if sfdc is None:
+        sfdc = ctx.source("sfdc", "Amount (converted)")
+    sfid = ctx.source("sfid", NORMALIZED_COLUMN)
+    if sfid is None and ctx.source("sfid", SFID_VALUE_M) is not None:
+        sfid = pd.to_numeric(ctx.source("sfid", SFID_VALUE_M), errors="coerce") * MILLION
+    value = pd.Series(np.nan, index=ctx.index)
+    for series in (sfdc, sfid):
+        if series is not None:
+            value = value.fillna(pd.to_numeric(series, errors="coerce"))
+    return value.astype(object).where(value.notna(), None)
+
+
+@derivation("Est. Deal Value", inputs=[("sfdc", NORMALIZED_COLUMN), ("sfdc", "Amount (converted)")])
+def _est_deal_value_sfdc(ctx):
+    # The SFDC amount in the same absolute USD as Est Deal Value; the raw Amount (converted)
+    # only when the normalize stage did not run
+    value = ctx.source("sfdc", NORMALIZED_COLUMN)
+    if value is None:
+        value = ctx.source("sfdc", "Amount (converted)")
+    if value is None:
+        return ctx.constant(None)
+    return value.astype(object).where(value.notna(), None)
+
+
+@derivation("Est Deal Value in USD", requires=["Est Deal Value"])
+def _est_deal_value_usd(ctx):
+    return ctx["Est Deal Value"]
+
+
+@derivation("Commercial Value", requires=["Est Deal Value"])
+def _commercial_value(ctx):
+    return ctx["Est Deal Value"]
+
+
+@derivation("Large Deal", requires=["Est Deal Value"])
+def _large_deal(ctx):
+    return large_deal_from_value(ctx["Est Deal Value"])
+
+
+@derivation("Bid Director", requires=["Group SBU"])
+def _bid_director(ctx):
+    return bid_director(ctx["Group SBU"])
+
+
+@derivation("Created in Week", requires=["Created Date"])
+def _created_in_week(ctx):
+    return week_from_date(ctx["Created Date"])
+
+
+@derivation("Submitted in Week", requires=["Proposed Sub. Date"])
+def _submitted_in_week(ctx):
+    return week_from_date(ctx["Proposed Sub. Date"])
+
+
+@derivation("Closing in Week", requires=["Close Date"])
+def _closing_in_week(ctx):
+    return week_from_date(ctx["Close Date"])
+
+
+@derivation("Opp. Status", requires=["Proposal Status", "Stage", "Created Date"])
+def _opp_status(ctx):
+    return opportunity_status(ctx["Proposal Status"], ctx["Stage"], ctx["Created Date"], ctx.today)
+
+
+@derivation("Sb. FY", requires=["Proposed Sub. Date"])
+def _sb_fy(ctx):
+    return fiscal_year_short(ctx["Proposed Sub. Date"])
+
+
+@derivation("Sb. Qtr.", requires=["Proposed Sub. Date"])
+def _sb_qtr(ctx):
+    return quarter(ctx["Proposed Sub. Date"])
+
+
+@derivation("Cl. FY", requires=["Close Date"])
+def _cl_fy(ctx):
+    return fiscal_year_short(ctx["Close Date"])
+
+
+@derivation("Cl. QTR", requires=["Close Date"])
+def _cl_qtr(ctx):
+    return quarter(ctx["Close Date"])
+
+
+def resolve_columns(columns):
+    """Orders the requested columns and everything they depend on so dependencies come first.
+
+    Columns without a registered derivation are skipped; they stay empty in the output.
+    """
+    ordered, visiting = [], set()
+
+    def visit(column):
+        if column in ordered or column not in DERIVATIONS:
+            return
+        if column in visiting:
+            raise ValueError(f"Circular derivation dependency at '{column}'")
+        visiting.add(column)
+        for dependency in DERIVATIONS[column][1]:
+            visit(dependency)
+        visiting.discard(column)
+        ordered.append(column)
+
+    for column in columns:
+        visit(column)
+    return ordered
+
+
+def required_inputs(columns):
+    """Lists the input columns needed to derive the given template columns.
+
+    Returns:
+        dict: {"sfid": [...], "sfdc": [...]} input column names.
+    """
+    needed = {"sfid": [], "sfdc": []}
+    for column in resolve_columns(columns):
+        for side, name in DERIVATIONS[column][2]:
+            if name not in needed[side]:
+                needed[side].append(name)
+    return needed
+
+
+def derive_template(sfid_df, sfdc_dump_df, columns, today=None, row_offset=0, sfid_length=None, timings=None):
+    """Computes only the requested template columns (plus their dependencies), column by column.
+
+    Args:
+        sfid_df (pd.DataFrame): The SFID tracker frame.
+        sfdc_dump_df (pd.DataFrame): The SFDC dump frame.
+        columns (list): Template header, in output order.
+        today (datetime, optional): Reference date for week/age logic. Defaults to now.
+        row_offset (int, optional): Position of the first row when deriving a partition.
+        sfid_length (int, optional): Length of the whole SFID input when deriving a partition.
+        timings (dict, optional): Receives the seconds spent per derived column, added to any
+            value already there.
+
+    Returns:
+        pd.DataFrame: One row per input position with exactly the requested columns.
+    """
+    ctx = DerivationContext(sfid_df, sfdc_dump_df, today, row_offset, sfid_length)
+    for column in resolve_columns(columns):
+        func = DERIVATIONS[column][0]
+        started = time.perf_counter()
+        values = func(ctx)
+        if not isinstance(values, pd.Series):
+            values = pd.Series(values, index=ctx.index)
+        ctx.values[column] = values
+        if timings is not None:
+            timings[column] = timings.get(column, 0.0) + time.perf_counter() - started
+    return pd.DataFrame({col: ctx.values[col] for col in columns if col in ctx.values}, index=ctx.index).reindex(
+        columns=columns)
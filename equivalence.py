@@ -0,0 +1,291 @@
+import sys
+import math
+import time
+import argparse
+from datetime import date, datetime
+import numpy as np
+import pandas as pd
+from app import generate_fake_data
+from inputs import normalize_types
+from validation import load_config
+from legacy import build_template_data, template_dict, calculate_large_deal_from_value
+from currency import normalize_deal_values, NORMALIZED_COLUMN
+from derivations import derive_template
+from parallel import derive_parallel
+from governor import MemoryGovernor, derive_in_chunks
+
+CONFIG_FILE = "config/config.yaml"
+DEFAULT_SEEDS = [1, 2, 3]
+DEFAULT_SIZES = [50, 500, 2000]
+# Relative tolerance for numeric cells; text and dates must match exactly
+REL_TOL = 1e-9
+MAX_EXAMPLES = 5
+# Columns where the engines deliberately differ from the row loop, which never sets a deal
+# value (so these stay empty or "--" there) and copies Est. Deal Value in its source currency.
+# They are compared against expected_values instead: the row loop's rules on the USD value
+VALUE_COLUMNS = ["Est. Deal Value", "Est Deal Value", "Est Deal Value in USD", "Commercial Value", "Large Deal"]
+# Harness FX table: EUR changes rate mid-year; XYZ in the foreign_currency case has no rate
+FX_RATES = pd.DataFrame({
+    "Currency": ["EUR", "GBP", "EUR"],
+    "Effective Date": pd.to_datetime(["2020-01-01", "2020-01-01", "2024-07-01"]),
+    "USD Rate": [1.10, 1.27, 1.05],
+})
+
+
+class _FixedChunks(MemoryGovernor):
+    """Governor with a fixed chunk size, so the chunked and spill paths run on small inputs too."""
+
+    def __init__(self, mode, rows):
+        super().__init__(None)
+        self.mode = mode
+        self.rows = rows
+
+    def chunk_rows(self, n_columns):
+        return self.rows
+
+
+def _run_chunked(sfid_df, sfdc_dump_df, columns, mode="chunked"):
+    governor = _FixedChunks(mode, max(max(len(sfid_df), len(sfdc_dump_df)) // 3, 1))
+    return governor.collect(derive_in_chunks(sfid_df, sfdc_dump_df, columns, governor))
+
+
+# Alternative engines, each called as engine(sfid_df, sfdc_dump_df, columns) -> DataFrame
+ENGINES = {
+    "vectorized": derive_template,
+    "parallel": lambda sfid_df, sfdc_dump_df, columns: derive_parallel(sfid_df, sfdc_dump_df, columns, workers=2,
+                                                                       min_partition_rows=1),
+    "chunked": _run_chunked,
+    "spill": lambda sfid_df, sfdc_dump_df, columns: _run_chunked(sfid_df, sfdc_dump_df, columns, "spill"),
+}
+
+
+def expected_values(sfid_df, sfdc_dump_df, length):
+    """The deal value columns for normalized inputs, row by row: Est. Deal Value is the SFDC
+    amount in USD, Est Deal Value falls back to the tracker's, and Large Deal follows the
+    row loop's thresholds."""
+    sfdc = sfdc_dump_df[NORMALIZED_COLUMN].reset_index(drop=True).reindex(range(length))
+    sfid = sfid_df[NORMALIZED_COLUMN].reset_index(drop=True).reindex(range(length))
+    rows = []
+    for sfdc_value, sfid_value in zip(sfdc, sfid):
+        sfdc_value = None if pd.isna(sfdc_value) else float(sfdc_value)
+        value = sfdc_value if sfdc_value is not None else None if pd.isna(sfid_value) else float(sfid_value)
+        rows.append({"Est. Deal Value": sfdc_value, "Est Deal Value": value, "Est Deal Value in USD": value,
+                     "Commercial Value": value, "Large Deal": calculate_large_deal_from_value(value)})
+    return pd.DataFrame(rows, columns=VALUE_COLUMNS)
+
+
+def run_legacy(sfid_df, sfdc_dump_df, columns):
+    """The reference: the original row loop, reordered to the template header as script.py does,
+    with the deal value columns taken from expected_values."""
+    reference = pd.DataFrame(build_template_data(sfid_df, sfdc_dump_df)).reindex(columns=columns)
+    expected = expected_values(sfid_df, sfdc_dump_df, len(reference))
+    for col in VALUE_COLUMNS:
+        if col in reference.columns:
+            reference[col] = expected[col].to_numpy(dtype=object)
+    return reference
+
+
+# --- Edge cases: each takes (sfid_df, sfdc_dump_df) and returns modified copies ---
+
+def _nat_dates(sfid_df, sfdc_dump_df):
+    sfid_df, sfdc_dump_df = sfid_df.copy(), sfdc_dump_df.copy()
+    for df in (sfid_df, sfdc_dump_df):
+        for col in ("Created Date", "Due Date", "Close Date"):
+            if col in df.columns:
+                df[col] = df[col].astype(object)
+                df.loc[df.index[::4], col] = pd.NaT
+                df.loc[df.index[1::7], col] = None
+    return sfid_df, sfdc_dump_df
+
+
+def _zero_amounts(sfid_df, sfdc_dump_df):
+    sfid_df, sfdc_dump_df = sfid_df.copy(), sfdc_dump_df.copy()
+    for df in (sfid_df, sfdc_dump_df):
+        for col in ("$ Value (M)", "Amount", "Amount (converted)", "Expected Revenue", "Probability (%)", "Age"):
+            if col in df.columns:
+                df.loc[df.index[::3], col] = 0
+    return sfid_df, sfdc_dump_df
+
+
+def _missing_columns(sfid_df, sfdc_dump_df):
+    return (sfid_df.drop(columns=["Due Date", "Bid Manager", "Partner Details"], errors="ignore"),
+            sfdc_dump_df.drop(columns=["Group SBU", "Close Date", "Amount (converted)"], errors="ignore"))
+
+
+def _foreign_currency(sfid_df, sfdc_dump_df):
+    sfdc_dump_df = sfdc_dump_df.copy()
+    for col in ("Amount (converted) Currency", "Amount Currency"):
+        if col in sfdc_dump_df.columns:
+            sfdc_dump_df[col] = np.resize(["EUR", "USD", "GBP", "XYZ"], len(sfdc_dump_df))
+    return sfid_df, sfdc_dump_df
+
+
+def _fewer_sfdc_rows(sfid_df, sfdc_dump_df):
+    return sfid_df, sfdc_dump_df.iloc[: len(sfdc_dump_df) // 2]
+
+
+def _fewer_sfid_rows(sfid_df, sfdc_dump_df):
+    return sfid_df.iloc[: len(sfid_df) // 3], sfdc_dump_df
+
+
+CASES = {
+    "fake": lambda sfid_df, sfdc_dump_df: (sfid_df, sfdc_dump_df),
+    "nat_dates": _nat_dates,
+    "zero_amounts": _zero_amounts,
+    "missing_columns": _missing_columns,
+    "foreign_currency": _foreign_currency,
+    "fewer_sfdc_rows": _fewer_sfdc_rows,
+    "fewer_sfid_rows": _fewer_sfid_rows,
+}
+
+
+def normalize_cell(value):
+    """Maps a cell to a comparable Python value: every kind of missing becomes None,
+    dates become Timestamps and numpy scalars become their Python equivalents."""
+    if value is None or value is pd.NaT:
+        return None
+    if isinstance(value, (float, np.floating)) and math.isnan(value):
+        return None
+    if isinstance(value, (datetime, date, np.datetime64)):
+        return pd.Timestamp(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return float(value)
+    return value
+
+
+def cells_equal(left, right, rel_tol=REL_TOL):
+    """Type-aware cell comparison: numbers within rel_tol, everything else exactly."""
+    left, right = normalize_cell(left), normalize_cell(right)
+    if left is None or right is None:
+        return left is None and right is None
+    numbers = (int, float)
+    if isinstance(left, numbers) and isinstance(right, numbers) and not isinstance(left, bool) \
+            and not isinstance(right, bool):
+        return math.isclose(left, right, rel_tol=rel_tol, abs_tol=1e-12)
+    return type(left) is type(right) and left == right
+
+
+def compare_frames(reference, candidate, rel_tol=REL_TOL, skip=()):
+    """Compares two template frames cell by cell, leaving out the columns in skip.
+
+    Returns:
+        tuple: (mismatched cell count, list of (row, column, reference, candidate) examples).
+    """
+    mismatches = 0
+    examples = []
+    if len(reference) != len(candidate):
+        return abs(len(reference) - len(candidate)) * len(reference.columns), [
+            ("-", "row count", len(reference), len(candidate))]
+    for col in reference.columns:
+        if col in skip:
+            continue
+        if col not in candidate.columns:
+            mismatches += len(reference)
+            examples.append(("-", col, "present", "missing"))
+            continue
+        ref_values = reference[col].to_numpy(dtype=object)
+        cand_values = candidate[col].to_numpy(dtype=object)
+        for row, (left, right) in enumerate(zip(ref_values, cand_values)):
+            if not cells_equal(left, right, rel_tol):
+                mismatches += 1
+                if len(examples) < MAX_EXAMPLES:
+                    examples.append((row, col, left, right))
+    return mismatches, examples
+
+
+def _timed(func, *args):
+    started = time.perf_counter()
+    try:
+        return func(*args), None, time.perf_counter() - started
+    except Exception as e:
+        return None, e, time.perf_counter() - started
+
+
+def run_harness(engines, seeds=DEFAULT_SEEDS, sizes=DEFAULT_SIZES, cases=None, columns=None, config=None):
+    """Runs the legacy loop and each engine side by side on generated inputs and compares the outputs.
+
+    Inputs come from app.generate_fake_data for every seed and size, go
+    through each edge case, and are typed with the validation config as
+    script.py does before deriving, deal values normalized at the FX_RATES rates.
+    VALUE_COLUMNS are compared against expected_values rather than the loop.
+
+    Args:
+        engines (list): Names from ENGINES to check against the legacy loop.
+        seeds (list, optional): Seeds for generate_fake_data.
+        sizes (list, optional): Record counts for generate_fake_data.
+        cases (list, optional): Names from CASES. Defaults to all.
+        columns (list, optional): Template header. Defaults to every legacy template column.
+        config (dict, optional): Pipeline config supplying the validation dtypes.
+
+    Returns:
+        pd.DataFrame: One row per (case, size, seed, engine) with the result, mismatch
+            count, both timings and the speedup.
+    """
+    columns = columns or list(template_dict)
+    validation_config = (config or {}).get("validation", {}) or {}
+    results = []
+    for size in sizes:
+        for seed in seeds:
+            base_sfid, base_sfdc = generate_fake_data(size, seed)
+            for case in cases or CASES:
+                sfid_df, sfdc_dump_df = CASES[case](base_sfid, base_sfdc)
+                sfid_df, sfdc_dump_df = sfid_df.copy(), sfdc_dump_df.copy()
+                normalize_types(sfid_df, (validation_config.get("sfid", {}) or {}).get("dtypes"))
+                normalize_types(sfdc_dump_df, (validation_config.get("sfdc", {}) or {}).get("dtypes"))
+                normalize_deal_values(sfid_df, sfdc_dump_df, FX_RATES)
+                reference, ref_error, ref_seconds = _timed(run_legacy, sfid_df, sfdc_dump_df, columns)
+                for engine in engines:
+                    candidate, error, seconds = _timed(ENGINES[engine], sfid_df, sfdc_dump_df, columns)
+                    mismatches, examples = 0, []
+                    if ref_error or error:
+                        # Both failing the same way is equivalent; anything else is not
+                        same = type(ref_error) is type(error)
+                        result = "both raised" if same else "raised"
+                        detail = f"legacy: {ref_error!r}, {engine}: {error!r}"
+                    else:
+                        mismatches, examples = compare_frames(reference, candidate)
+                        result = "equal" if not mismatches else "DIFFERENT"
+                        detail = "; ".join(f"row {row} {col}: {left!r} != {right!r}"
+                                           for row, col, left, right in examples)
+                    results.append({
+                        "Case": case, "Size": size, "Seed": seed, "Engine": engine, "Result": result,
+                        "Mismatches": mismatches, "Legacy s": round(ref_seconds, 3), "Engine s": round(seconds, 3),
+                        "Speedup": round(ref_seconds / seconds, 1) if seconds else None, "Detail": detail,
+                    })
+                    row = results[-1]
+                    print(f"{case:<16} n={size:<6} seed={seed:<4} {engine:<10} {result:<11} "
+                          f"mismatches={mismatches:<6} speedup x{row['Speedup']}")
+    return pd.DataFrame(results)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check alternative derive engines against the legacy row loop.")
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument("--seeds", nargs="+", type=int, default=DEFAULT_SEEDS)
+    parser.add_argument("--sizes", nargs="+", type=int, default=DEFAULT_SIZES)
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), help="Edge cases to run (default: all)")
+    parser.add_argument("--template", help="Compare only this template workbook's SFDC header columns")
+    parser.add_argument("--report", help="Also write the results to this CSV file")
+    args = parser.parse_args(argv)
+
+    columns = None
+    if args.template:
+        import openpyxl
+        columns = [cell.value for cell in openpyxl.load_workbook(args.template, read_only=True)["SFDC"][1]]
+    results = run_harness(args.engines, args.seeds, args.sizes, args.cases, columns, load_config(CONFIG_FILE))
+    failed = results[~results["Result"].isin(["equal", "both raised"])]
+    for row in failed.itertuples(index=False):
+        print(f"{row.Engine} differs on {row.Case} n={row.Size} seed={row.Seed}: {row.Detail}")
+    print(f"{len(results) - len(failed)}/{len(results)} comparisons equivalent; "
+          f"median speedup x{results['Speedup'].median():.1f}")
+    if args.report:
+        results.to_csv(args.report, index=False)
+    return int(len(failed) > 0)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
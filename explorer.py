@@ -0,0 +1,109 @@
+import os
+import numpy as np
+import pandas as pd
+from inputs import read_input
+
+FILTER_COLUMNS = ["Bid Director", "Opp. Status", "Sb. FY", "Large Deal"]
+SEARCH_COLUMNS = ["SFID", "Account Name"]
+BLANK_LABEL = "(blank)"
+PAGE_SIZE = 50
+
+
+def results_cache_path(output_file):
+    """The Parquet copy of a run's output, written next to the xlsx by the exports step."""
+    return os.path.splitext(output_file)[0] + ".parquet"
+
+
+def load_results(output_file):
+    """Loads a run's derived frame, preferring the columnar Parquet copy over the xlsx."""
+    cache = results_cache_path(output_file)
+    if os.path.exists(cache):
+        return pd.read_parquet(cache)
+    return read_input(output_file, sheet_name="SFDC")
+
+
+def _labels(series):
+    """Text labels for filtering, with every kind of missing value shown as BLANK_LABEL."""
+    return series.astype(object).where(series.notna(), BLANK_LABEL).map(str).to_numpy(dtype=object)
+
+
+class ResultExplorer:
+    """Searchable, filterable, paginated view over a derived template frame.
+
+    Everything expensive happens once in the constructor:
+        - a sorted prefix index over SFID and Account Name (whole values and
+          each word), so a search is two binary searches
+        - integer codes for every filter column, so a filter is one isin() over ints
+    A query returns row positions; only the requested page is ever materialised.
+    """
+
+    def __init__(self, df, filter_columns=FILTER_COLUMNS, search_columns=SEARCH_COLUMNS):
+        self.df = df.reset_index(drop=True)
+        self.codes = {}
+        self.categories = {}
+        for col in filter_columns:
+            if col in self.df.columns:
+                self.codes[col], self.categories[col] = pd.factorize(_labels(self.df[col]), sort=True)
+
+        keys, positions = [], []
+        for col in search_columns:
+            if col not in self.df.columns:
+                continue
+            values = pd.Series(self.df[col]).astype(object)
+            for position, value in enumerate(values):
+                if value is None or (isinstance(value, float) and np.isnan(value)):
+                    continue
+                text = str(value).strip().lower()
+                keys.append(text)
+                positions.append(position)
+                for word in text.split()[1:]:
+                    keys.append(word)
+                    positions.append(position)
+        order = np.argsort(np.array(keys, dtype=str), kind="stable") if keys else np.array([], dtype=int)
+        self.index_keys = np.array(keys, dtype=str)[order] if keys else np.array([], dtype=str)
+        self.index_positions = np.array(positions, dtype=np.int64)[order] if keys else np.array([], dtype=np.int64)
+
+    def options(self, col):
+        """The distinct labels of a filter column, sorted."""
+        return list(self.categories.get(col, []))
+
+    def search(self, text):
+        """Rows whose SFID or Account Name (or any word of it) starts with text, case-insensitively.
+
+        Returns:
+            np.ndarray: Sorted row positions.
+        """
+        prefix = text.strip().lower()
+        start = np.searchsorted(self.index_keys, prefix, side="left")
+        stop = np.searchsorted(self.index_keys, prefix + "\uffff", side="left")
+        return np.unique(self.index_positions[start:stop])
+
+    def query(self, search=None, filters=None):
+        """Row positions matching the search text and every filter.
+
+        Args:
+            search (str, optional): Prefix to look up in the SFID/Account Name index.
+            filters (dict, optional): Filter column to the list of labels to keep;
+                an empty list leaves the column unfiltered.
+
+        Returns:
+            np.ndarray: Matching row positions in original row order.
+        """
+        mask = np.ones(len(self.df), dtype=bool)
+        for col, selected in (filters or {}).items():
+            if selected and col in self.codes:
+                wanted = np.flatnonzero(np.isin(self.categories[col], list(selected)))
+                mask &= np.isin(self.codes[col], wanted)
+        positions = np.flatnonzero(mask)
+        if search and search.strip():
+            positions = np.intersect1d(positions, self.search(search), assume_unique=True)
+        return positions
+
+    def page(self, positions, page=1, page_size=PAGE_SIZE):
+        """The rows of one page of a query result.
+
+        Returns:
+            pd.DataFrame: At most page_size rows, indexed by their original row number.
+        """
+        start = max(page - 1, 0) * page_size
+        return self.df.iloc[positions[start:start + page_size]]
@@ -0,0 +1,387 @@
+import os
+import copy
+import time
+import importlib.util
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.formatting.rule import FormulaRule
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.dataframe import dataframe_to_rows
+from pdf_report import render_pdf
+
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+# Rows per worksheet in the xlsx format, header row included
+EXCEL_MAX_ROWS = 1_048_576
+# Rows per Parquet row group, the unit a filtered read can skip
+PARQUET_ROW_GROUP = 100_000
+HEADER_STYLE_ATTRIBUTES = ("font", "fill", "border", "alignment", "number_format", "protection")
+
+
+def typed_frame(df):
+    """Gives every object column of the derived frame a concrete dtype.
+
+    The row-built template frame holds mixed Python objects (dates, Timestamps,
+    ints with None). Columnar formats need one type per column, so each object
+    column is inferred as datetime, numeric or string in a single pass.
+    """
+    typed = df.copy()
+    for col in typed.columns:
+        series = typed[col]
+        if series.dtype != object:
+            continue
+        kind = pd.api.types.infer_dtype(series, skipna=True)
+        if kind in ("datetime", "datetime64", "date"):
+            typed[col] = pd.to_datetime(series, errors="coerce")
+        elif kind in ("integer", "floating", "mixed-integer-float", "decimal"):
+            typed[col] = pd.to_numeric(series, errors="coerce")
+        else:
+            typed[col] = series.astype("string")
+    return typed
+
+
+def unified_schema(schemas, filled):
+    """One Arrow schema for tables typed separately, such as consolidation runs or weekly outputs.
+
+    A column takes its type only from the tables where it holds values, so a
+    column left empty in one table does not clash with its type elsewhere.
+    Where those tables disagree the types are promoted, or fall back to
+    string when they cannot be.
+
+    Args:
+        schemas (list): pa.Schema per table.
+        filled (list): Per table, the set of columns holding at least one value.
+
+    Returns:
+        pa.Schema: The columns of every table, in first-seen order.
+    """
+    import pyarrow as pa
+    fields = []
+    for name in dict.fromkeys(name for schema in schemas for name in schema.names):
+        types = list(dict.fromkeys(schema.field(name).type for schema, columns in zip(schemas, filled)
+                                   if name in columns))
+        if not types:
+            first = next(schema.field(name).type for schema in schemas if name in schema.names)
+            types = [pa.string() if pa.types.is_null(first) else first]
+        try:
+            unified = pa.unify_schemas([pa.schema([(name, kind)]) for kind in types],
+                                       promote_options="permissive").field(name).type
+        except (pa.ArrowTypeError, pa.ArrowInvalid):
+            unified = pa.string()
+        fields.append(pa.field(name, pa.string() if pa.types.is_null(unified) else unified))
+    return pa.schema(fields)
+
+
+def xlsx_parts(n_rows, row_limit=EXCEL_MAX_ROWS):
+    """Splits n_rows data rows into (start, stop) ranges that fit one worksheet each below the header."""
+    per_part = row_limit - 1
+    return [(start, min(start + per_part, n_rows)) for start in range(0, n_rows, per_part)] or [(0, 0)]
+
+
+def part_name(name, number):
+    """Name of the number-th part (1-based): the original name, then name_2, name_3..."""
+    if number == 1:
+        return name
+    stem, ext = os.path.splitext(name)
+    return f"{stem}_{number}{ext}"
+
+
+def xlsx_output_files(output_file, n_rows, overflow="sheets", row_limit=EXCEL_MAX_ROWS):
+    """The workbook files write_xlsx produces for n_rows rows."""
+    if overflow != "workbooks":
+        return [output_file]
+    return [part_name(output_file, number) for number in range(1, len(xlsx_parts(n_rows, row_limit)) + 1)]
+
+
+def _header_spec(template_ws):
+    """Header values and styles plus column widths of a template sheet, as plain picklable data."""
+    header = [(cell.value, {attr: copy.copy(getattr(cell, attr)) for attr in HEADER_STYLE_ATTRIBUTES})
+              for cell in template_ws[1]]
+    widths = {key: dim.width for key, dim in template_ws.column_dimensions.items() if dim.width}
+    return header, widths, template_ws.freeze_panes
+
+
+def _xlsx_row(row):
+    """A data row as written to the xlsx: Timestamps become dd/mm/yyyy text."""
+    return [value.strftime("%d/%m/%Y") if isinstance(value, pd.Timestamp) else value for value in row]
+
+
+def _formula_cells(pieces, index, first_row=2):
+    """A template formula written on every row: the pieces from formulas.formula_pieces, each
+    relative row offset added to the row number, assembled as whole-column string operations."""
+    rows = pd.Series(np.arange(first_row, first_row + len(index)), index=index)
+    cells = pd.Series("", index=index, dtype=object)
+    for piece in pieces:
+        cells = cells + (piece if isinstance(piece, str) else (rows + piece).astype(str).astype(object))
+    return cells
+
+
+def _column_spans(columns):
+    """Contiguous runs of 1-based column positions, as (first letter, last letter) pairs."""
+    columns = np.asarray(columns)
+    breaks = np.flatnonzero(np.diff(columns) != 1)
+    return [(get_column_letter(int(first)), get_column_letter(int(last)))
+            for first, last in zip(columns[np.r_[0, breaks + 1]], columns[np.r_[breaks, len(columns) - 1]])]
+
+
+def _highlight_ranges(codes, number, columns, first_row=2):
+    """The cell ranges of the rows highlighted by rule number, one per run of consecutive rows and columns."""
+    rows = np.flatnonzero(codes == number)
+    if not len(rows):
+        return []
+    breaks = np.flatnonzero(np.diff(rows) != 1)
+    starts, stops = rows[np.r_[0, breaks + 1]] + first_row, rows[np.r_[breaks, len(rows) - 1]] + first_row
+    spans = _column_spans(columns)
+    return [f"{first}{start}:{last}{stop}" for start, stop in zip(starts.tolist(), stops.tolist()) for first, last in spans]
+
+
+def _rule_style(ws, rule):
+    """The style array of a data cell styled by rule, copied into every cell the rule highlights."""
+    cell = WriteOnlyCell(ws)
+    if rule["fill"]:
+        cell.fill = rule["fill"]
+    if rule["font"]:
+        cell.font = rule["font"]
+    return cell._style
+
+
+def _add_conditional_formats(ws, codes, rules, first_row=2):
+    """One native conditional format per rule over the ranges its mask selected, so no data cell is restyled."""
+    for number, rule in enumerate(rules, start=1):
+        ranges = _highlight_ranges(codes, number, rule["columns"], first_row)
+        if ranges:
+            ws.conditional_formatting.add(" ".join(ranges), FormulaRule(formula=["TRUE"], stopIfTrue=True,
+                                                                        fill=rule["fill"], font=rule["font"]))
+
+
+def _data_rows(ws, df, highlights=None):
+    """The frame's rows as written to ws. In "styles" mode the cells a rule highlights are
+    built already styled, each with a copy of the rule's style array."""
+    rows = (_xlsx_row(row) for row in dataframe_to_rows(df, index=False, header=False))
+    if not highlights or highlights[2] != "styles":
+        yield from rows
+        return
+    codes, rules, _ = highlights
+    styles = [(_rule_style(ws, rule), set(rule["columns"])) for rule in rules]
+    for code, row in zip(codes.tolist(), rows):
+        if code:
+            style, columns = styles[code - 1]
+            row = [_styled_cell(ws, value, style) if column in columns else value
+                   for column, value in enumerate(row, start=1)]
+        yield row
+
+
+def _styled_cell(ws, value, style):
+    cell = WriteOnlyCell(ws, value=value)
+    cell._style = StyleArray(style)
+    return cell
+
+
+def _stream_sheet(wb, title, spec, df, highlights=None):
+    """Streams the header and the frame's rows into a new write-only sheet, converting Timestamps as write_xlsx does.
+
+    highlights is (codes, rules, mode) for this frame's rows: "conditional"
+    adds the ranges as conditional formats, "styles" streams highlighted rows
+    as styled cells.
+    """
+    header, widths, freeze_panes = spec
+    ws = wb.create_sheet(title)
+    for key, width in widths.items():
+        ws.column_dimensions[key].width = width
+    if freeze_panes:
+        ws.freeze_panes = freeze_panes
+    cells = []
+    for value, styles in header:
+        cell = WriteOnlyCell(ws, value=value)
+        for attr, style in styles.items():
+            setattr(cell, attr, style)
+        cells.append(cell)
+    ws.append(cells)
+    if highlights and highlights[2] == "conditional":
+        _add_conditional_formats(ws, *highlights[:2])
+    for row in _data_rows(ws, df, highlights):
+        ws.append(row)
+
+
+def _write_xlsx_part(task):
+    """Worker entry point: writes one part as its own workbook with the template header."""
+    df, output_file, sheet_name, spec, highlights = task
+    wb = openpyxl.Workbook(write_only=True)
+    _stream_sheet(wb, sheet_name, spec, df, highlights)
+    wb.save(output_file)
+    return output_file
+
+
+def _part_highlights(highlights, start, stop):
+    """The highlights of rows start:stop of the frame."""
+    if not highlights:
+        return None
+    codes, rules, mode = highlights
+    return codes[start:stop], rules, mode
+
+
+def write_xlsx_overflow(df, output_file, template_wb, sheet_name, overflow="sheets", row_limit=EXCEL_MAX_ROWS,
+                        max_workers=None, highlights=None):
+    """Writes a frame too long for one worksheet, streaming rows in write-only mode.
+
+    "sheets" spills into sheet_name, sheet_name_2, ... of one workbook, each
+    with the template's header row, header styles and column widths.
+    "workbooks" writes output_file, output_file_2, ... in parallel worker
+    processes, one sheet each. The workers are spawned rather than forked:
+    export_frame calls this from a thread pool, and a fork would copy locks
+    held by the other export threads into the children. Write-only workbooks keep memory flat however
+    many rows are written. Other sheets of the template are not carried over.
+
+    Returns:
+        list: The workbook files written.
+    """
+    spec = _header_spec(template_wb[sheet_name])
+    parts = xlsx_parts(len(df), row_limit)
+    if overflow == "workbooks":
+        files = xlsx_output_files(output_file, len(df), overflow, row_limit)
+        tasks = [(df.iloc[start:stop], path, sheet_name, spec, _part_highlights(highlights, start, stop))
+                 for (start, stop), path in zip(parts, files)]
+        with ProcessPoolExecutor(max_workers=max_workers or min(len(tasks), os.cpu_count() or 1),
+                                 mp_context=multiprocessing.get_context("spawn")) as executor:
+            return list(executor.map(_write_xlsx_part, tasks))
+    wb = openpyxl.Workbook(write_only=True)
+    for number, (start, stop) in enumerate(parts, start=1):
+        _stream_sheet(wb, part_name(sheet_name, number), spec, df.iloc[start:stop],
+                      _part_highlights(highlights, start, stop))
+    wb.save(output_file)
+    return [output_file]
+
+
+def write_xlsx(df, output_file, template_wb, sheet_name, overflow="sheets", row_limit=EXCEL_MAX_ROWS,
+               max_workers=None, highlights=None, formulas=None):
+    """Writes the frame into the template workbook's sheet below its header row.
+
+    Frames longer than one worksheet allows are detected before anything is
+    written and go to write_xlsx_overflow instead.
+
+    Args:
+        highlights (tuple, optional): (codes, rules, mode) from highlights.highlight_codes and
+            highlight_rules. "conditional" adds one conditional format per rule over the rows it
+            matched; "styles" writes a shared style into those cells.
+        formulas (dict, optional): {column: formula pieces} written as formulas instead of the
+            column's values. Overflow sheets and workbooks, which carry no other template sheets
+            for the formulas to refer to, keep the values.
+    """
+    if len(df) > row_limit - 1:
+        return write_xlsx_overflow(df, output_file, template_wb, sheet_name, overflow, row_limit, max_workers,
+                                   highlights)
+    template_ws = template_wb[sheet_name]
+
+    # Clear existing data (excluding header)
+    if template_ws.max_row > 1:
+        template_ws.delete_rows(2, template_ws.max_row - 1)
+
+    if formulas:
+        df = df.assign(**{column: _formula_cells(pieces, df.index) for column, pieces in formulas.items()
+                          if column in df.columns})
+
+    # Append data rows, dates in dd/mm/yyyy format
+    for row in _data_rows(template_ws, df, highlights):
+        template_ws.append(row)
+    if highlights and highlights[2] == "conditional":
+        _add_conditional_formats(template_ws, *highlights[:2])
+
+    template_wb.save(output_file)
+    return [output_file]
+
+
+def write_csv(typed, output_file):
+    """Writes the typed frame as CSV, through pyarrow's native writer when available."""
+    if HAS_PYARROW:
+        import pyarrow as pa
+        import pyarrow.csv as pa_csv
+        pa_csv.write_csv(pa.Table.from_pandas(typed, preserve_index=False), output_file)
+    else:
+        typed.to_csv(output_file, index=False)
+
+
+def write_parquet(typed, output_file):
+    """Writes the typed frame as Parquet, keeping the template column order.
+
+    Row groups are kept to PARQUET_ROW_GROUP rows so their min/max statistics
+    let filtered reads (query.py) skip most of a large output.
+    """
+    typed.to_parquet(output_file, index=False, row_group_size=PARQUET_ROW_GROUP)
+
+
+def table_writers(df, sheet_name, report_file=None, parquet_file=None):
+    """export_frame writer entries for a side table such as a rollup or forecast: one xlsx
+    sheet and a Parquet copy (queryable with query.py). They ignore the frame export_frame
+    passes in and write df instead."""
+    writers = {}
+    if report_file:
+        writers[report_file] = (lambda _: df.to_excel(report_file, sheet_name=sheet_name, index=False), False)
+    if parquet_file:
+        writers[parquet_file] = (lambda _: write_parquet(typed_frame(df), parquet_file), False)
+    return writers
+
+
+def build_writers(export_config, output_file, template_wb, sheet_name, highlights=None, formulas=None):
+    """Collects the writers enabled in the `exports` config section.
+
+    highlights and formulas, as write_xlsx takes them, apply to the xlsx output only.
+
+    Returns:
+        dict: Output path to a (callable, needs_typed_frame) pair.
+    """
+    overflow = export_config.get("xlsx_overflow", "sheets")
+    row_limit = export_config.get("xlsx_row_limit", EXCEL_MAX_ROWS)
+    writers = {output_file: (lambda df: write_xlsx(df, output_file, template_wb, sheet_name, overflow, row_limit,
+                                                   highlights=highlights, formulas=formulas), False)}
+    if export_config.get("csv_file"):
+        writers[export_config["csv_file"]] = (lambda df: write_csv(df, export_config["csv_file"]), True)
+    if export_config.get("parquet_file"):
+        writers[export_config["parquet_file"]] = (lambda df: write_parquet(df, export_config["parquet_file"]), True)
+    if export_config.get("pdf_file"):
+        pdf_config = export_config.get("pdf", {}) or {}
+        writers[export_config["pdf_file"]] = (lambda df: render_pdf(df, export_config["pdf_file"], **pdf_config), True)
+    return writers
+
+
+def _timed(writer, df):
+    start = time.perf_counter()
+    writer(df)
+    return time.perf_counter() - start
+
+
+def export_frame(df, writers, max_workers=None):
+    """Runs every writer concurrently against the same in-memory frame.
+
+    The pyarrow-backed CSV and Parquet writers release the GIL, so they
+    overlap with the pure-Python openpyxl writer and the total time is close
+    to that of the slowest writer.
+
+    Args:
+        df (pd.DataFrame): The derived template frame, already in template column order.
+        writers (dict): Output path to (writer, needs_typed_frame), as returned by build_writers.
+        max_workers (int, optional): Thread count. Defaults to one thread per writer.
+
+    Returns:
+        list: (output_path, seconds, error) tuples; error is None on success.
+    """
+    for path in writers:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # The typed copy is built once and shared by every columnar writer
+    typed = typed_frame(df) if any(needs_typed for _, needs_typed in writers.values()) else None
+    results = []
+    with ThreadPoolExecutor(max_workers=max_workers or len(writers)) as executor:
+        futures = {
+            path: executor.submit(_timed, writer, typed if needs_typed else df)
+            for path, (writer, needs_typed) in writers.items()
+        }
+        for path, future in futures.items():
+            try:
+                results.append((path, future.result(), None))
+            except Exception as e:
+                results.append((path, None, e))
+    return results
@@ -0,0 +1,177 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+
+VALUE_COLUMN = "Est Deal Value in USD"
+PROBABILITY_COLUMN = "Probability"
+STATUS_COLUMN = "Opp. Status"
+# Each level is reported separately: percentiles of a sum are not sums of percentiles
+LEVELS = [["Cl. FY", "Cl. QTR"], ["Cl. FY", "Cl. QTR", "Group SBU"], ["Cl. FY", "Cl. QTR", "Bid Director"]]
+PERCENTILES = (10, 50, 90)
+BLANK_LABEL = "(blank)"
+# Deals x scenarios per thread-pool task
+CHUNK_CELLS = 20_000_000
+# Deals sharing one random stream; chunks are whole blocks
+BLOCK_ROWS = 256
+# Win draws are 16-bit: a deal wins a scenario when its draw is below round(p * 65536)
+_DRAW_RANGE = 65536
+
+# Per-thread BLOCK_ROWS x scenarios win matrix, reused across blocks
+_buffers = threading.local()
+
+
+def open_deals(derived, statuses=("OPEN",), value_column=VALUE_COLUMN, probability_column=PROBABILITY_COLUMN,
+               group_columns=None):
+    """The deals to simulate: rows with an allowed status, a positive value and a probability.
+
+    Probability (%) values above 1 are read as percentages.
+
+    Returns:
+        pd.DataFrame: Value, Probability (0-1) and the group columns, blanks labelled BLANK_LABEL.
+    """
+    group_columns = group_columns or sorted({col for level in LEVELS for col in level})
+    rows = derived
+    if statuses is not None and STATUS_COLUMN in rows.columns:
+        rows = rows[rows[STATUS_COLUMN].isin(list(statuses))]
+    value = pd.to_numeric(rows[value_column], errors="coerce") if value_column in rows.columns else \
+        pd.Series(np.nan, index=rows.index)
+    probability = pd.to_numeric(rows[probability_column], errors="coerce") if probability_column in rows.columns \
+        else pd.Series(np.nan, index=rows.index)
+    probability = probability.where(probability <= 1, probability / 100).clip(0, 1)
+    deals = pd.DataFrame({"Value": value, "Probability": probability})
+    for col in group_columns:
+        labels = rows[col].astype(object) if col in rows.columns else pd.Series(None, index=rows.index, dtype=object)
+        deals[col] = labels.where(labels.notna(), BLANK_LABEL).astype(str)
+    return deals[(deals["Value"] > 0) & deals["Probability"].notna()].reset_index(drop=True)
+
+
+def _simulate_chunk(seeds, values, thresholds, groups, scenarios):
+    """Bookings per group for each block of deals in one chunk.
+
+    Each block of BLOCK_ROWS deals draws 16-bit numbers from its own stream,
+    compares them with the deals' thresholds straight into the thread's win
+    matrix, and one float64 (groups x deals) @ (deals x scenarios) product sums
+    the won values, so large deal values keep their precision.
+
+    Returns:
+        list: (block groups, block bookings) per block, for the caller to add in block order.
+    """
+    if getattr(_buffers, "wins", None) is None or _buffers.wins.shape[1] != scenarios:
+        _buffers.wins = np.empty((BLOCK_ROWS, scenarios), dtype=np.float64)
+    sums = []
+    for block, seed in enumerate(seeds):
+        start, stop = block * BLOCK_ROWS, min((block + 1) * BLOCK_ROWS, len(values))
+        rows = stop - start
+        raw = np.random.SFC64(seed).random_raw(-(-rows * scenarios // 4))
+        draws = raw.view(np.uint16)[:rows * scenarios].reshape(rows, scenarios)
+        wins = _buffers.wins[:rows]
+        np.less(draws, thresholds[start:stop, None], out=wins, casting="unsafe")
+        block_groups, inverse = np.unique(groups[start:stop], return_inverse=True)
+        weights = np.zeros((len(block_groups), rows), dtype=np.float64)
+        weights[inverse, np.arange(rows)] = values[start:stop]
+        sums.append((block_groups, weights @ wins))
+    return sums
+
+
+def simulate_bookings(values, probabilities, groups, n_groups, scenarios=10_000, seed=None, chunk_cells=CHUNK_CELLS,
+                      max_workers=None):
+    """Simulates win/loss for every deal in every scenario and sums the won value per group.
+
+    Deals are processed in chunks of about chunk_cells // scenarios rows. Every
+    block of BLOCK_ROWS deals has its own random stream spawned from seed, so a
+    seed reproduces the same result whatever the chunk size or thread count.
+    Chunks run on a thread pool; NumPy releases the GIL for the draws, the
+    comparison and the matrix product.
+
+    Args:
+        values (np.ndarray): Deal values.
+        probabilities (np.ndarray): Win probabilities, 0-1.
+        groups (np.ndarray): Group code per deal, 0 to n_groups - 1.
+        n_groups (int): Number of groups.
+        scenarios (int, optional): Number of scenarios.
+        seed (int, optional): Seed for reproducible runs.
+        chunk_cells (int, optional): Deals x scenarios per chunk.
+        max_workers (int, optional): Threads. Defaults to the CPU count.
+
+    Returns:
+        np.ndarray: (n_groups, scenarios) bookings.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    groups = np.asarray(groups)
+    totals = np.zeros((n_groups, scenarios), dtype=np.float64)
+    # Certain wins add to every scenario without drawing
+    certain = probabilities >= 1
+    totals += np.bincount(groups[certain], weights=values[certain], minlength=n_groups)[:, None]
+    uncertain = ~certain & (probabilities > 0)
+    order = np.flatnonzero(uncertain)[np.argsort(groups[uncertain], kind="stable")]
+    if not len(order):
+        return totals
+    # Sorted by group, a chunk touches few groups and its weight matrix stays small
+    values, groups = values[order], groups[order]
+    thresholds = np.minimum(np.round(probabilities[order] * _DRAW_RANGE), _DRAW_RANGE - 1).astype(np.uint16)
+    # One stream per block of deals, so a seed gives the same result for any chunk size or thread count
+    seeds = np.random.SeedSequence(seed).spawn(-(-len(order) // BLOCK_ROWS))
+    chunk_blocks = max(chunk_cells // (scenarios * BLOCK_ROWS), 1)
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count() or 1) as executor:
+        futures = []
+        for first in range(0, len(seeds), chunk_blocks):
+            rows = slice(first * BLOCK_ROWS, (first + chunk_blocks) * BLOCK_ROWS)
+            futures.append(executor.submit(_simulate_chunk, seeds[first:first + chunk_blocks], values[rows],
+                                           thresholds[rows], groups[rows], scenarios))
+        # Block sums are added in block order, so the float64 rounding is the same for any chunking
+        for future in futures:
+            for block_groups, bookings in future.result():
+                totals[block_groups] += bookings
+    return totals
+
+
+def forecast_bookings(derived, scenarios=10_000, seed=None, statuses=("OPEN",), value_column=VALUE_COLUMN,
+                      levels=LEVELS, percentiles=PERCENTILES, chunk_cells=CHUNK_CELLS, max_workers=None):
+    """P10/P50/P90 bookings of the open pipeline per fiscal quarter, SBU and Bid Director.
+
+    The deals are simulated once at the finest grouping (every level's columns
+    together); each level's scenario totals are sums of those rows, so all
+    levels come from the same scenarios.
+
+    Args:
+        derived (pd.DataFrame): The derived template frame.
+        scenarios (int, optional): Number of simulated scenarios.
+        seed (int, optional): Seed for reproducible runs.
+        statuses (tuple, optional): Opp. Status values simulated; None takes every row.
+        value_column (str, optional): Deal value column.
+        levels (list, optional): Column lists to report bookings by.
+        percentiles (tuple, optional): Percentiles reported, as P<n> columns.
+        chunk_cells (int, optional): Deals x scenarios simulated per chunk.
+        max_workers (int, optional): Simulation threads.
+
+    Returns:
+        pd.DataFrame: Level, the group columns, Deals, Pipeline, Expected and the percentile columns.
+    """
+    group_columns = list(dict.fromkeys(col for level in levels for col in level))
+    deals = open_deals(derived, statuses, value_column, group_columns=group_columns)
+    columns = ["Level", *group_columns, "Deals", "Pipeline", "Expected", *[f"P{p}" for p in percentiles]]
+    if deals.empty:
+        return pd.DataFrame(columns=columns)
+    fine = deals.groupby(group_columns, sort=True).ngroup().to_numpy()
+    fine_labels = deals.groupby(group_columns, sort=True)[group_columns].first().reset_index(drop=True)
+    totals = simulate_bookings(deals["Value"].to_numpy(), deals["Probability"].to_numpy(), fine, len(fine_labels),
+                               scenarios, seed, chunk_cells, max_workers)
+
+    reports = []
+    for level in levels:
+        codes = fine_labels.groupby(level, sort=True).ngroup().to_numpy()
+        order = np.argsort(codes, kind="stable")
+        level_totals = np.add.reduceat(totals[order], np.flatnonzero(np.diff(codes[order], prepend=-1)), axis=0)
+        report = fine_labels.groupby(level, sort=True)[level].first().reset_index(drop=True)
+        by_deal = deals.groupby(level, sort=True)
+        report["Deals"] = by_deal.size().to_numpy()
+        report["Pipeline"] = by_deal["Value"].sum().to_numpy()
+        report["Expected"] = level_totals.mean(axis=1)
+        for p, values in zip(percentiles, np.percentile(level_totals, percentiles, axis=1)):
+            report[f"P{p}"] = values
+        report.insert(0, "Level", " / ".join(level))
+        reports.append(report)
+    return pd.concat(reports, ignore_index=True).reindex(columns=columns)
@@ -0,0 +1,671 @@
+import re
+import numpy as np
+import pandas as pd
+from openpyxl.formula import Tokenizer
+from openpyxl.formula.tokenizer import Token
+from openpyxl.utils import column_index_from_string, range_boundaries
+from exports import typed_frame
+
+# Template row holding the formula definitions, the first data row below the header
+FORMULA_ROW = 2
+# "values" writes the computed values into the xlsx; "formulas" keeps the template formulas there
+FORMULA_MODES = ("values", "formulas")
+# Binding power of the infix operators; negation binds tighter than all of them, as in Excel
+_INFIX = {"=": 1, "<>": 1, "<": 1, ">": 1, "<=": 1, ">=": 1, "&": 2, "+": 3, "-": 3, "*": 4, "/": 4, "^": 5}
+_CELL = re.compile(r"(?<![A-Za-z0-9_.])(\$?)([A-Z]{1,3})(\$?)(\d+)(?![A-Za-z0-9_(])")
+_DATE_CODES = re.compile(r"(yyyy|yy|mmmm|mmm|mm|m|dddd|ddd|dd|d)", re.IGNORECASE)
+_NUMBER_FORMAT = re.compile(r"^(#,##)?0(\.0+)?(%?)$")
+EXCEL_EPOCH = pd.Timestamp("1899-12-30")
+
+
+def template_formulas(template_ws, header_row, row=FORMULA_ROW):
+    """The formula columns of a template: {column: formula} from the first data row's formula cells."""
+    formulas = {}
+    for column, cell in zip(header_row, template_ws[row] if template_ws.max_row >= row else []):
+        if column is not None and isinstance(cell.value, str) and cell.value.startswith("="):
+            formulas[column] = cell.value
+    return formulas
+
+
+# --- Parsing ---
+
+def _reference(text, header_row, workbook, sheet_name):
+    """Resolves a range operand: same-row cells of the data sheet become column references,
+    ranges on other sheets become lookup tables read once from the workbook."""
+    sheet, _, ref = text.rpartition("!")
+    sheet = sheet.strip("'").replace("''", "'") if sheet else sheet_name
+    if sheet == sheet_name:
+        cells = [_CELL.fullmatch(part) for part in ref.split(":")]
+        if not all(cells) or any(cell[3] or int(cell[4]) != FORMULA_ROW for cell in cells):
+            raise ValueError(f"only same-row references are supported on the data sheet, got '{text}'")
+        first, last = (column_index_from_string(cell[2]) for cell in (cells[0], cells[-1]))
+        if last > len(header_row) or any(header_row[i - 1] is None for i in range(first, last + 1)):
+            raise ValueError(f"'{text}' refers to a column without a header")
+        names = [header_row[i - 1] for i in range(first, last + 1)]
+        return ("col", names[0]) if len(names) == 1 else ("cols", names)
+    if sheet not in workbook.sheetnames:
+        raise ValueError(f"unknown sheet '{sheet}'")
+    ws = workbook[sheet]
+    min_col, min_row, max_col, max_row = range_boundaries(ref.replace("$", ""))
+    rows = list(ws.iter_rows(min_row=min_row or 1, max_row=max_row or ws.max_row, min_col=min_col or 1,
+                             max_col=max_col or ws.max_column, values_only=True))
+    table = np.array(rows, dtype=object).reshape(len(rows), -1)
+    return ("value", table[0, 0]) if table.shape == (1, 1) else ("table", table)
+
+
+class _Parser:
+    """Recursive-descent parser over openpyxl's formula tokens, producing nested tuples."""
+
+    def __init__(self, formula, resolve):
+        self.tokens = [token for token in Tokenizer(formula).items if token.type != Token.WSPACE]
+        self.position = 0
+        self.resolve = resolve
+
+    def parse(self):
+        node = self.expression(0)
+        if self.position < len(self.tokens):
+            raise ValueError(f"unexpected '{self.tokens[self.position].value}'")
+        return node
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def next(self):
+        token = self.peek()
+        if token is None:
+            raise ValueError("unexpected end of formula")
+        self.position += 1
+        return token
+
+    def expression(self, floor):
+        node = self.unary()
+        while True:
+            token = self.peek()
+            if token is None or token.type != Token.OP_IN or _INFIX.get(token.value, 0) <= floor:
+                return node
+            self.next()
+            node = ("op", token.value, node, self.expression(_INFIX[token.value]))
+
+    def unary(self):
+        token = self.next()
+        if token.type == Token.OP_PRE:
+            node = self.unary()
+            return ("neg", node) if token.value == "-" else node
+        node = self.primary(token)
+        while self.peek() is not None and self.peek().type == Token.OP_POST:
+            self.next()
+            node = ("op", "/", node, ("value", 100.0))
+        return node
+
+    def primary(self, token):
+        if token.type == Token.OPERAND:
+            if token.subtype == Token.NUMBER:
+                return ("value", float(token.value))
+            if token.subtype == Token.TEXT:
+                return ("value", token.value[1:-1].replace('""', '"'))
+            if token.subtype == Token.LOGICAL:
+                return ("value", token.value.upper() == "TRUE")
+            if token.subtype == Token.RANGE:
+                return self.resolve(token.value)
+            raise ValueError(f"unsupported operand '{token.value}'")
+        if token.type == Token.FUNC and token.subtype == Token.OPEN:
+            name = token.value[:-1].upper().removeprefix("_XLFN.")
+            if name not in _FUNCTIONS:
+                raise ValueError(f"unsupported function {name}")
+            args = []
+            if self.peek() is not None and self.peek().type == Token.FUNC and self.peek().subtype == Token.CLOSE:
+                self.next()
+                return ("func", name, args)
+            while True:
+                args.append(self.expression(0))
+                separator = self.next()
+                if separator.type == Token.FUNC and separator.subtype == Token.CLOSE:
+                    return ("func", name, args)
+                if separator.type != Token.SEP or separator.subtype != Token.ARG:
+                    raise ValueError(f"unexpected '{separator.value}' in {name}")
+        if token.type == Token.PAREN and token.subtype == Token.OPEN:
+            node = self.expression(0)
+            closing = self.next()
+            if closing.type != Token.PAREN:
+                raise ValueError(f"unexpected '{closing.value}'")
+            return node
+        raise ValueError(f"unexpected '{token.value}'")
+
+
+def compile_formula(formula, header_row, workbook, sheet_name):
+    """Parses a template formula into an expression tree.
+
+    Returns:
+        tuple: (tree, columns it references).
+
+    Raises:
+        ValueError: When the formula uses a function or reference outside the supported subset.
+    """
+    references = []
+
+    def resolve(text):
+        node = _reference(text, header_row, workbook, sheet_name)
+        if node[0] in ("col", "cols"):
+            references.extend([node[1]] if node[0] == "col" else node[1])
+        return node
+
+    tree = _Parser(formula if formula.startswith("=") else f"={formula}", resolve).parse()
+    return tree, list(dict.fromkeys(references))
+
+
+def compile_formulas(formulas, header_row, workbook, sheet_name):
+    """Compiles every template formula.
+
+    Returns:
+        tuple: ({column: (tree, references)}, {column: reason} for the formulas that cannot be evaluated).
+    """
+    compiled, errors = {}, {}
+    for column, formula in formulas.items():
+        try:
+            compiled[column] = compile_formula(formula, header_row, workbook, sheet_name)
+        except ValueError as e:
+            errors[column] = str(e)
+    return compiled, errors
+
+
+def formula_order(compiled):
+    """Formula columns ordered so the formula columns each one references come first.
+
+    Raises:
+        ValueError: On a circular reference.
+    """
+    ordered, visiting = [], set()
+
+    def visit(column):
+        if column in ordered or column not in compiled:
+            return
+        if column in visiting:
+            raise ValueError(f"Circular formula reference at '{column}'")
+        visiting.add(column)
+        for reference in compiled[column][1]:
+            visit(reference)
+        visiting.discard(column)
+        ordered.append(column)
+
+    for column in compiled:
+        visit(column)
+    return ordered
+
+
+# --- Value conversions: formula values are scalars, Series, column lists or lookup tables ---
+
+def _is_date(x):
+    return pd.api.types.is_datetime64_any_dtype(x)
+
+
+def _is_text(x):
+    return pd.api.types.is_string_dtype(x) or x.dtype == object
+
+
+def _number(x):
+    """Numeric view of a value; blanks count as 0, dates as Excel serial numbers, text that is no number is missing."""
+    if _is_date(x):
+        return ((x - EXCEL_EPOCH) / pd.Timedelta(days=1)).fillna(0.0)
+    if pd.api.types.is_bool_dtype(x):
+        return x.astype(float)
+    return pd.to_numeric(x, errors="coerce").astype(float).where(x.notna(), 0.0)
+
+
+def _per_value(x, formatter):
+    """formatter applied to each distinct value only (dates and amounts repeat a lot), blanks as ""."""
+    codes, uniques = pd.factorize(x)
+    labels = np.array([formatter(value) for value in uniques] + [""], dtype=object)
+    return pd.Series(labels[codes], index=x.index)
+
+
+def _number_text(value):
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+
+def _text(x):
+    """Text view of a value as Excel shows it: whole numbers without decimals, dates as the output's dd/mm/yyyy."""
+    if _is_date(x):
+        return _per_value(x, lambda value: value.strftime("%d/%m/%Y"))
+    if pd.api.types.is_bool_dtype(x):
+        return x.map({True: "TRUE", False: "FALSE"}).astype(object)
+    if pd.api.types.is_numeric_dtype(x):
+        return _per_value(x, _number_text)
+    return x.astype(object).where(x.notna(), "").astype(str).astype(object)
+
+
+def _truth(x):
+    if pd.api.types.is_bool_dtype(x):
+        return x.fillna(False).astype(bool)
+    if _is_date(x):
+        return x.notna()
+    if _is_text(x):
+        return pd.to_numeric(x, errors="coerce").fillna(0).ne(0) | _text(x).str.upper().eq("TRUE")
+    return _number(x).fillna(0).ne(0)
+
+
+def _date(x):
+    if _is_date(x):
+        return x
+    if _is_text(x) and pd.to_numeric(x, errors="coerce").isna().all():
+        return pd.to_datetime(x, dayfirst=True, errors="coerce")
+    return EXCEL_EPOCH + pd.to_timedelta(pd.to_numeric(x, errors="coerce"), unit="D")
+
+
+def _scalar(value):
+    return not isinstance(value, (pd.Series, np.ndarray, list))
+
+
+def _constant(value):
+    """A constant argument such as a column number or a format, whether passed as is or lifted to one row."""
+    return value.iloc[0] if isinstance(value, pd.Series) else value
+
+
+def _lifted(function):
+    """Runs function on Series only: scalar arguments are broadcast to the rows of the Series
+    arguments, or lifted to one-row Series (and the result unwrapped) when there are none."""
+    def call(*args):
+        index = next((arg.index for arg in args if isinstance(arg, pd.Series)), None)
+        result = function(*[_broadcast(arg, index if index is not None else pd.RangeIndex(1)) if _scalar(arg)
+                            else arg for arg in args])
+        return result.iloc[0] if index is None and isinstance(result, pd.Series) else result
+    return call
+
+
+def _broadcast(value, index):
+    return value if isinstance(value, pd.Series) else pd.Series([value] * len(index), index=index)
+
+
+def _flatten(args):
+    """Arguments with column lists expanded, as Excel expands a range inside SUM or CONCAT."""
+    return [item for arg in args for item in (arg if isinstance(arg, list) else [arg])]
+
+
+# --- Operators ---
+
+def _operate(op, left, right):
+    return _lifted(lambda left, right: _apply(op, left, right))(left, right)
+
+
+def _apply(op, left, right):
+    if op in ("=", "<>", "<", ">", "<=", ">="):
+        if _is_text(left) or _is_text(right):
+            left, right = _text(left).str.lower(), _text(right).str.lower()
+        else:
+            left, right = _number(left), _number(right)
+        result = {"=": lambda: left == right, "<>": lambda: left != right, "<": lambda: left < right,
+                  ">": lambda: left > right, "<=": lambda: left <= right, ">=": lambda: left >= right}[op]()
+        return result.fillna(False).astype(bool)
+    if op == "&":
+        return _text(left) + _text(right)
+    if op in ("+", "-") and _is_date(left) and _is_date(right):
+        if op == "-":
+            return (left - right) / pd.Timedelta(days=1)
+    elif op in ("+", "-") and _is_date(left):
+        days = pd.to_timedelta(_number(right), unit="D")
+        return left + days if op == "+" else left - days
+    elif op == "+" and _is_date(right):
+        return right + pd.to_timedelta(_number(left), unit="D")
+    left, right = _number(left), _number(right)
+    result = {"+": lambda: left + right, "-": lambda: left - right, "*": lambda: left * right,
+              "/": lambda: left / right, "^": lambda: left ** right}[op]()
+    # #DIV/0! and other errors evaluate as blanks
+    return result.replace([np.inf, -np.inf], np.nan)
+
+
+def _where(condition, then, otherwise):
+    index = next((x.index for x in (condition, then, otherwise) if isinstance(x, pd.Series)), None)
+    if index is None:
+        return then if _truth(pd.Series([condition])).iloc[0] else otherwise
+    then, otherwise = _broadcast(then, index), _broadcast(otherwise, index)
+    if then.dtype != otherwise.dtype:
+        then, otherwise = then.astype(object), otherwise.astype(object)
+    return then.where(_truth(_broadcast(condition, index)), otherwise)
+
+
+# --- Functions ---
+
+def _if(condition, then, otherwise=False):
+    return _where(condition, then, otherwise)
+
+
+def _ifs(*pairs):
+    result = None
+    for condition, then in reversed(list(zip(pairs[::2], pairs[1::2]))):
+        result = _where(condition, then, result)
+    return result
+
+
+def _iferror(value, fallback):
+    if _scalar(value):
+        return fallback if pd.isna(value) else value
+    failed = value.isna() if not pd.api.types.is_numeric_dtype(value) else ~np.isfinite(value.astype(float))
+    return _where(~failed, value, fallback)
+
+
+@_lifted
+def _and(*args):
+    return pd.concat([_truth(arg) for arg in _flatten(args)], axis=1).all(axis=1)
+
+
+@_lifted
+def _or(*args):
+    return pd.concat([_truth(arg) for arg in _flatten(args)], axis=1).any(axis=1)
+
+
+def _values(x):
+    """Numeric view for aggregates, which skip blanks and text."""
+    return _number(x).where(x.notna()) if _is_date(x) else pd.to_numeric(x, errors="coerce").astype(float)
+
+
+def _aggregate(reducer):
+    def aggregate(*args):
+        values = []
+        for arg in _flatten(args):
+            if isinstance(arg, np.ndarray):
+                values.append(_values(pd.Series(arg.ravel())).agg(reducer))
+            else:
+                values.append(arg if _scalar(arg) else _values(arg))
+        if all(_scalar(value) for value in values):
+            return pd.Series(values, dtype=float).agg(reducer)
+        index = next(value.index for value in values if not _scalar(value))
+        return pd.concat([_broadcast(value, index) for value in values], axis=1).agg(reducer, axis=1)
+    return aggregate
+
+
+def _round(direction):
+    @_lifted
+    def rounding(value, digits=0):
+        number = _number(value)
+        scale = 10.0 ** (_number(digits).to_numpy() if isinstance(digits, pd.Series) else float(digits))
+        magnitude = np.abs(number) * scale
+        rounded = {"half": np.floor(magnitude + 0.5), "up": np.ceil(magnitude - 1e-9),
+                   "down": np.floor(magnitude + 1e-9)}[direction]
+        return np.sign(number) * rounded / scale
+    return rounding
+
+
+def _substring(text, start, length):
+    """Slices of each text; start (1-based) and length may be constants or per row."""
+    text = _text(text)
+    if _scalar(start) and _scalar(length):
+        return text.str.slice(int(start) - 1, int(start) - 1 + int(length))
+    starts, lengths = _broadcast(start, text.index).astype(int) - 1, _broadcast(length, text.index).astype(int)
+    return pd.Series([value[s:s + n] for value, s, n in zip(text, starts, lengths)], index=text.index, dtype=object)
+
+
+@_lifted
+def _left(text, count=1):
+    return _substring(text, 1, count)
+
+
+@_lifted
+def _right(text, count=1):
+    text = _text(text)
+    counts = _broadcast(count, text.index).astype(int)
+    return pd.Series([value[len(value) - n:] if n else "" for value, n in zip(text, counts)], index=text.index,
+                     dtype=object)
+
+
+@_lifted
+def _mid(text, start, count):
+    return _substring(text, start, count)
+
+
+@_lifted
+def _text_format(value, number_format):
+    number_format = str(_constant(number_format))
+    if _DATE_CODES.search(number_format.replace("#", "")) and not _NUMBER_FORMAT.match(number_format):
+        parts = {"yyyy": "%Y", "yy": "%y", "mmmm": "%B", "mmm": "%b", "mm": "%m", "dddd": "%A", "ddd": "%a",
+                 "dd": "%d"}
+        pieces = _DATE_CODES.split(number_format)
+
+        def render(date):
+            return "".join(part.replace("%", "%%") if number % 2 == 0
+                           else str(date.month) if part.lower() == "m" else str(date.day) if part.lower() == "d"
+                           else date.strftime(parts[part.lower()]) for number, part in enumerate(pieces))
+        return _per_value(_date(value), render)
+    match = _NUMBER_FORMAT.match(number_format)
+    if not match:
+        raise ValueError(f"unsupported TEXT format '{number_format}'")
+    number = _number(value) * (100 if match[3] else 1)
+    decimals = len(match[2]) - 1 if match[2] else 0
+    spec = f"{',' if match[1] else ''}.{decimals}f"
+    return _per_value(number, lambda x: format(x, spec) + match[3])
+
+
+@_lifted
+def _date_of(year, month, day):
+    months = (_number(year) - 1970) * 12 + _number(month) - 1
+    valid = months.notna() & _number(day).notna()
+    start = pd.Series(pd.NaT, index=months.index, dtype="datetime64[ns]")
+    start[valid] = months[valid].astype("int64").to_numpy().astype("datetime64[M]").astype("datetime64[ns]")
+    return start + pd.to_timedelta(_number(day) - 1, unit="D")
+
+
+def _add_months(dates, months):
+    """Dates moved by whole months, the day clamped to the target month's length, and that month's start."""
+    dates = _date(dates)
+    valid = dates.notna()
+    target = pd.Series(pd.NaT, index=dates.index, dtype="datetime64[ns]")
+    shifted = (dates[valid].to_numpy().astype("datetime64[M]")
+               + _number(_broadcast(months, dates.index))[valid].astype("int64").to_numpy())
+    target[valid] = shifted.astype("datetime64[ns]")
+    return dates, target
+
+
+@_lifted
+def _edate(dates, months):
+    dates, target = _add_months(dates, months)
+    days_in_month = target.dt.days_in_month
+    return target + pd.to_timedelta(np.minimum(dates.dt.day, days_in_month) - 1, unit="D")
+
+
+@_lifted
+def _eomonth(dates, months):
+    _, target = _add_months(dates, months)
+    return target + pd.to_timedelta(target.dt.days_in_month - 1, unit="D")
+
+
+@_lifted
+def _weekday(dates, return_type=1):
+    dates = _date(dates)
+    monday_based = dates.dt.dayofweek.astype(float)
+    return monday_based + 1 if int(_constant(return_type)) == 2 else (monday_based + 1) % 7 + 1
+
+
+@_lifted
+def _weeknum(dates, return_type=1):
+    dates = _date(dates)
+    january_first = pd.to_datetime(dates.dt.year.astype("Int64").astype(str) + "-01-01", errors="coerce")
+    offset = january_first.dt.dayofweek if int(_constant(return_type)) == 2 else (january_first.dt.dayofweek + 1) % 7
+    return ((dates.dt.dayofyear - 1 + offset) // 7 + 1).astype(float)
+
+
+def _lookup_key(values):
+    """Keys compared the way Excel's exact match does: text case-insensitively, numbers by value."""
+    if _is_date(values):
+        return values
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype(float)
+    if pd.api.types.is_string_dtype(values) and values.dtype != object:
+        return values.str.strip().str.lower().astype(object)
+    codes, uniques = pd.factorize(values)
+    keys = np.array([value.strip().lower() if isinstance(value, str) else
+                     float(value) if isinstance(value, (int, float)) else value for value in uniques] + [None],
+                    dtype=object)
+    return pd.Series(keys[codes], index=values.index)
+
+
+def _positions(keys, column, exact=True):
+    """0-based row in column matching each key, missing where none does."""
+    column = pd.Series(np.asarray(column, dtype=object).ravel())
+    if exact:
+        table = _lookup_key(column.infer_objects())
+        first = table.notna() & ~table.duplicated()
+        return _lookup_key(keys).map(pd.Series(np.flatnonzero(first).astype(float), index=table[first].to_numpy()))
+    bounds = _number(pd.to_numeric(column, errors="coerce").dropna())
+    found = np.searchsorted(bounds.to_numpy(), _number(keys).to_numpy(), side="right") - 1
+    return pd.Series(np.where(found >= 0, bounds.index.to_numpy()[np.maximum(found, 0)], np.nan), index=keys.index)
+
+
+def _take(values, positions):
+    """values at the 0-based positions; missing positions and positions outside values stay missing (#N/A, #REF!)."""
+    values = np.asarray(values, dtype=object).ravel()
+    taken = pd.Series(None, index=positions.index, dtype=object)
+    valid = positions.notna() & (positions >= 0) & (positions < len(values))
+    taken[valid] = values[positions[valid].astype(int).to_numpy()]
+    return taken.infer_objects()
+
+
+@_lifted
+def _vlookup(key, table, column, approximate=True):
+    exact = not _truth(pd.Series([_constant(approximate)])).iloc[0]
+    return _take(table[:, int(_constant(column)) - 1], _positions(key, table[:, 0], exact))
+
+
+@_lifted
+def _xlookup(key, lookup, result, if_not_found=None):
+    found = _take(result, _positions(key, lookup))
+    return found if if_not_found is None else _where(found.notna(), found, if_not_found)
+
+
+@_lifted
+def _match(key, lookup, match_type=1):
+    return _positions(key, lookup, exact=int(_constant(match_type)) == 0) + 1
+
+
+@_lifted
+def _index(table, row, column=1):
+    table = table if isinstance(table, np.ndarray) else np.asarray(table, dtype=object)
+    values = table.reshape(-1, 1) if table.ndim == 1 else table
+    if values.shape[0] == 1 and values.shape[1] > 1:
+        values = values.T
+    # Not _number: a blank or missing row (an unmatched MATCH) must stay missing rather than count as 0
+    column = pd.to_numeric(pd.Series([_constant(column)]), errors="coerce").iloc[0]
+    if pd.isna(column) or not 1 <= column <= values.shape[1]:
+        raise ValueError(f"INDEX column {_constant(column)} is outside the range")
+    return _take(values[:, int(column) - 1], pd.to_numeric(row, errors="coerce").astype(float) - 1)
+
+
+def _is_number(value):
+    if _scalar(value):
+        return isinstance(value, (int, float)) and not isinstance(value, bool) and not pd.isna(value)
+    if pd.api.types.is_numeric_dtype(value) and not pd.api.types.is_bool_dtype(value) or _is_date(value):
+        return value.notna()
+    return value.map(lambda v: isinstance(v, (int, float)) and not isinstance(v, bool) and not pd.isna(v))
+
+
+_FUNCTIONS = {
+    "IF": _if, "IFS": _ifs, "IFERROR": _iferror, "IFNA": _iferror,
+    "AND": _and, "OR": _or, "NOT": _lifted(lambda value: ~_truth(value)),
+    "ISBLANK": _lifted(lambda value: value.isna() | (_text(value) == "") if _is_text(value) else value.isna()),
+    "ISNUMBER": _is_number, "ISTEXT": _lifted(lambda value: value.map(lambda v: isinstance(v, str))),
+    "SUM": _aggregate("sum"), "MIN": _aggregate("min"), "MAX": _aggregate("max"),
+    "AVERAGE": _aggregate("mean"),
+    "ROUND": _round("half"), "ROUNDUP": _round("up"), "ROUNDDOWN": _round("down"),
+    "INT": _lifted(lambda value: np.floor(_number(value))), "ABS": _lifted(lambda value: _number(value).abs()),
+    "MOD": _lifted(lambda value, divisor: (_number(value) % _number(divisor)).replace([np.inf, -np.inf], np.nan)),
+    "VALUE": _lifted(lambda value: pd.to_numeric(value, errors="coerce").astype(float)),
+    "CONCATENATE": lambda *args: _concat(*args), "CONCAT": lambda *args: _concat(*args),
+    "LEFT": _left, "RIGHT": _right, "MID": _mid, "TEXT": _text_format,
+    "LEN": _lifted(lambda value: _text(value).str.len().astype(float)),
+    "UPPER": _lifted(lambda value: _text(value).str.upper()), "LOWER": _lifted(lambda value: _text(value).str.lower()),
+    "TRIM": _lifted(lambda value: _text(value).str.strip().str.replace(r" +", " ", regex=True)),
+    "SUBSTITUTE": _lifted(lambda value, old, new: _text(value).str.replace(str(old), str(new), regex=False)),
+    "TODAY": lambda: pd.Timestamp.today().normalize(),
+    "DATE": _date_of, "YEAR": _lifted(lambda value: _date(value).dt.year.astype(float)),
+    "MONTH": _lifted(lambda value: _date(value).dt.month.astype(float)),
+    "DAY": _lifted(lambda value: _date(value).dt.day.astype(float)),
+    "DAYS": _lifted(lambda end, start: (_date(end) - _date(start)) / pd.Timedelta(days=1)),
+    "EDATE": _edate, "EOMONTH": _eomonth, "WEEKDAY": _weekday, "WEEKNUM": _weeknum,
+    "VLOOKUP": _vlookup, "XLOOKUP": _xlookup, "MATCH": _match, "INDEX": _index,
+}
+
+
+def _concat(*args):
+    parts = _flatten(args)
+    index = next((part.index for part in parts if isinstance(part, pd.Series)), None)
+    if index is None:
+        return "".join(_text(pd.Series([part])).iloc[0] for part in parts)
+    text = pd.Series("", index=index, dtype=object)
+    for part in parts:
+        text = text + _text(_broadcast(part, index))
+    return text
+
+
+# --- Evaluation ---
+
+def _evaluate(node, frame):
+    kind = node[0]
+    if kind in ("value", "table"):
+        return node[1]
+    if kind == "col":
+        return frame[node[1]]
+    if kind == "cols":
+        return [frame[column] for column in node[1]]
+    if kind == "neg":
+        return _operate("-", 0.0, _evaluate(node[1], frame))
+    if kind == "op":
+        return _operate(node[1], _evaluate(node[2], frame), _evaluate(node[3], frame))
+    return _FUNCTIONS[node[1]](*[_evaluate(arg, frame) for arg in node[2]])
+
+
+def evaluate_formulas(derived, compiled):
+    """Evaluates the compiled template formulas over the derived frame, writing each column in place.
+
+    Each formula runs once over all rows as pandas column operations, in
+    dependency order, so a formula may read the result of another. Referenced
+    columns are typed once (dates, numbers, text). Excel errors such as #N/A
+    or #DIV/0! evaluate as blanks.
+
+    Args:
+        derived (pd.DataFrame): The derived template frame.
+        compiled (dict): {column: (tree, references)} from compile_formulas.
+
+    Returns:
+        dict: {column: reason} for the formulas that could not be evaluated; those columns are left as derived.
+    """
+    errors = {}
+    try:
+        order = formula_order(compiled)
+    except ValueError as e:
+        return {column: str(e) for column in compiled}
+    referenced = [column for column in dict.fromkeys(ref for _, refs in compiled.values() for ref in refs)
+                  if column not in compiled and column in derived.columns]
+    frame = typed_frame(derived[referenced])
+    for column in order:
+        tree, references = compiled[column]
+        try:
+            value = _broadcast(_evaluate(tree, frame), derived.index)
+        except (ValueError, TypeError, KeyError, IndexError) as e:
+            errors[column] = f"{type(e).__name__}: {e}"
+            continue
+        derived[column] = value.to_numpy()
+        frame[column] = value
+    return errors
+
+
+def formula_pieces(formula, row=FORMULA_ROW):
+    """The formula as pieces for writing it on every output row: text, and for each relative row
+    reference the offset from row, so row r gets the offset plus r."""
+    pieces = ["="]
+    for token in Tokenizer(formula).items:
+        if token.type != Token.OPERAND or token.subtype != Token.RANGE:
+            pieces.append(token.value)
+            continue
+        sheet, bang, ref = token.value.rpartition("!")
+        pieces.append(sheet + bang)
+        position = 0
+        for match in _CELL.finditer(ref):
+            if match[3]:
+                continue
+            pieces.extend([ref[position:match.start(4)], int(match[4]) - row])
+            position = match.end(4)
+        pieces.append(ref[position:])
+    merged = []
+    for piece in pieces:
+        if merged and isinstance(piece, str) and isinstance(merged[-1], str):
+            merged[-1] += piece
+        elif piece != "":
+            merged.append(piece)
+    return merged
@@ -2,19 +2,52 @@ import streamlit as st
 import pandas as pd
 import openpyxl
 import os
+import tempfile
+from validation import load_config, merge_config
+from explorer import ResultExplorer, load_results, results_cache_path, FILTER_COLUMNS, PAGE_SIZE
+
+CONFIG_FILE = "config/config.yaml"
+
+
+# --- Backend Functions ---
+def _save_upload(upload, directory):
+    path = os.path.join(directory, upload.name)
+    with open(path, "wb") as f:
+        f.write(upload.getbuffer())
+    return path
+
 
-# --- Backend Functions (Add your existing functions here) ---
 def process_files(sfid_file, sfdc_dump_file, template_file, output_file):
-    # Placeholder: Use your existing backend code here
-    # Save the updated template to 'output_file'
-    pass
+    """Runs the pipeline on the uploaded files and saves the updated template to output_file.
+
+    The Parquet copy of the output is always written, since the explorer reads it.
+
+    Returns:
+        str: None on success, otherwise the pipeline's error message.
+    """
+    import script
+    config = merge_config(load_config(CONFIG_FILE), {"exports": {"parquet_file": results_cache_path(output_file)}})
+    with tempfile.TemporaryDirectory() as upload_dir:
+        paths = [_save_upload(upload, upload_dir) for upload in (sfid_file, sfdc_dump_file, template_file)]
+        try:
+            script.run_pipeline(*paths, output_file, config, CONFIG_FILE)
+        except script.PipelineError as e:
+            return str(e)
+    return None
+
+
+@st.cache_resource(max_entries=4)
+def get_explorer(output_file, modified):
+    """Builds the explorer (and its search index) once per output file version."""
+    return ResultExplorer(load_results(output_file))
+
 
 # --- Frontend ---
 st.title("Weekly Template Generator")
 
 # Upload Input Files
-sfid_file = st.file_uploader("Upload SFID File (Excel)", type=["xlsx"])
-sfdc_dump_file = st.file_uploader("Upload SFDC Dump File (Excel)", type=["xlsx"])
+sfid_file = st.file_uploader("Upload SFID File (Excel, CSV or Parquet)", type=["xlsx", "csv", "gz", "parquet", "feather"])
+sfdc_dump_file = st.file_uploader("Upload SFDC Dump File (Excel, CSV or Parquet)", type=["xlsx", "csv", "gz", "parquet", "feather"])
 template_file = st.file_uploader("Upload Weekly Template File (Excel)", type=["xlsx"])
 
 # Set Output File Path
@@ -28,11 +61,37 @@ if st.button("Generate Template"):
     else:
         os.makedirs(output_dir, exist_ok=True)
         # Process the files using the backend function
-        process_files(sfid_file, sfdc_dump_file, template_file, output_file)
-        st.success(f"Template generated successfully! Download below:")
+        error = process_files(sfid_file, sfdc_dump_file, template_file, output_file)
+        if error:
+            st.error(error)
+        else:
+            st.session_state["output_file"] = output_file
+
+if st.session_state.get("output_file") and os.path.exists(st.session_state["output_file"]):
+    result_file = st.session_state["output_file"]
+    st.success(f"Template generated successfully! Download below:")
+    with open(result_file, "rb") as f:
         st.download_button(
             label="Download Updated Template",
-            data=open(output_file, "rb"),
+            data=f.read(),
             file_name="Updated_Template.xlsx",
             mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
         )
+
+    # --- Result Explorer ---
+    # Search, filters and paging run against the cached frame; only the visible page is sent to the browser
+    st.header("Explore Results")
+    explorer = get_explorer(result_file, os.path.getmtime(results_cache_path(result_file))
+                            if os.path.exists(results_cache_path(result_file)) else os.path.getmtime(result_file))
+    search = st.text_input("Search SFID or Account Name")
+    filter_cols = st.columns(len(FILTER_COLUMNS))
+    filters = {col: filter_cols[i].multiselect(col, explorer.options(col)) for i, col in enumerate(FILTER_COLUMNS)}
+    positions = explorer.query(search, filters)
+
+    page_size = st.selectbox("Rows per page", [25, PAGE_SIZE, 100, 250], index=1)
+    page_count = max(-(-len(positions) // page_size), 1)
+    page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1)
+    first = (page - 1) * page_size
+    st.caption(f"Rows {min(first + 1, len(positions))}-{min(first + page_size, len(positions))} "
+               f"of {len(positions)} matching ({len(explorer.df)} total)")
+    st.dataframe(explorer.page(positions, page, page_size))
@@ -0,0 +1,251 @@
+import os
+import gc
+import gzip
+import shutil
+import tempfile
+import importlib.util
+from datetime import datetime
+import pandas as pd
+from inputs import detect_format, input_files
+from derivations import derive_template
+from runlog import get_logger
+
+HAS_PSUTIL = importlib.util.find_spec("psutil") is not None
+
+# Rough in-memory size of a parsed input relative to its size on disk
+EXPANSION = {"xlsx": 8.0, "csv": 2.5, "csv.gz": 10.0, "parquet": 5.0, "feather": 1.5}
+# Average memory per derived cell (mostly Python strings in object columns)
+BYTES_PER_CELL = 90
+# Intermediate columns and the final frame assembly roughly double the derived size
+DERIVE_OVERHEAD = 2.0
+# Fraction of the budget a mode may plan to use; above it the governor steps down a mode
+HEADROOM = 0.8
+MIN_CHUNK_ROWS = 5_000
+MODES = ("memory", "chunked", "spill")
+UNITS = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+def parse_size(value):
+    """Parses a memory size such as "4G", "3500M" or 2048 (plain numbers are megabytes).
+
+    Returns:
+        int: The size in bytes, or None when value is empty.
+    """
+    if value in (None, "", 0):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value * UNITS["M"])
+    text = str(value).strip().upper().rstrip("B")
+    if text and text[-1] in UNITS:
+        return int(float(text[:-1]) * UNITS[text[-1]])
+    return int(float(text) * UNITS["M"])
+
+
+def current_rss():
+    """Returns the resident memory of this process in bytes."""
+    if HAS_PSUTIL:
+        import psutil
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # No /proc (macOS): fall back to the peak, which never underestimates
+        return peak_rss()
+
+
+def peak_rss():
+    """Returns the peak resident memory of this process so far, in bytes."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        import psutil
+        return psutil.Process().memory_info().peak_wset
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def count_rows(path):
+    """Counts the data rows of an input without parsing it into a frame.
+
+    xlsx reads the sheet's declared dimension, Parquet/Feather their metadata,
+    and CSV counts line breaks in blocks.
+
+    Returns:
+        int: The row count, or None if it cannot be determined cheaply.
+    """
+    file_format = detect_format(path)
+    if file_format == "xlsx":
+        import openpyxl
+        wb = openpyxl.load_workbook(path, read_only=True)
+        try:
+            return max((wb.worksheets[0].max_row or 1) - 1, 0)
+        finally:
+            wb.close()
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(path).metadata.num_rows
+    if file_format == "feather":
+        import pyarrow.ipc as ipc
+        with ipc.open_file(path) as reader:
+            return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+    lines = 0
+    with (gzip.open(path, "rb") if file_format == "csv.gz" else open(path, "rb")) as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            lines += block.count(b"\n")
+    return max(lines - 1, 0)
+
+
+def estimate_peak(inputs, n_columns):
+    """Estimates the peak memory of the load, match and derive stages before anything is read.
+
+    Only the derive is governed, so the estimate separates what every mode
+    holds from what a mode can bound. The parsed inputs are loaded, validated
+    and matched whole, and the writers get the whole derived frame; the
+    derive's intermediates are what chunking and spilling keep small.
+
+    Args:
+        inputs (list): The SFID and SFDC input paths (or glob patterns).
+        n_columns (int): Number of template columns to derive.
+
+    Returns:
+        dict: All estimates, in bytes unless noted: "inputs" (parsed inputs),
+            "rows" (longest input, a count), "frame" (the derived frame),
+            "derive" (derived frame plus intermediates), "peak" (one-pass run)
+            and "floor" (the least any mode needs: the larger of the inputs and
+            the derived frame, which spill mode never holds together).
+    """
+    input_bytes = 0
+    rows = 0
+    for pattern in inputs:
+        input_rows = 0
+        for path in input_files(pattern):
+            if not os.path.exists(path):
+                continue
+            input_bytes += os.path.getsize(path) * EXPANSION[detect_format(path)]
+            input_rows += count_rows(path) or 0
+        rows = max(rows, input_rows)
+    frame_bytes = rows * n_columns * BYTES_PER_CELL
+    rss = current_rss()
+    return {"inputs": int(input_bytes), "rows": rows, "frame": int(frame_bytes),
+            "derive": int(frame_bytes * DERIVE_OVERHEAD), "peak": int(rss + input_bytes + frame_bytes * DERIVE_OVERHEAD),
+            "floor": int(rss + max(input_bytes, frame_bytes))}
+
+
+class MemoryGovernor:
+    """Picks and, when needed, downgrades the execution mode of the derive under a memory budget.
+
+    Modes, from most to least memory:
+        memory   derive the whole frame in one pass
+        chunked  derive in row chunks sized to the remaining budget
+        spill    derive in row chunks and park finished chunks on disk until
+                 the inputs have been released
+
+    Only the derive stage is governed. Loading, validation, matching and type
+    normalization run on whole frames, and collect() reassembles the whole
+    derived frame for the writers, so no mode brings a run below the
+    estimate's floor; the governor warns when the budget is under it.
+    """
+
+    def __init__(self, budget, estimate=None):
+        self.budget = budget
+        self.mode = "memory"
+        self.spill_dir = None
+        self.samples = []
+        if budget and estimate:
+            rss = current_rss()
+            if estimate["peak"] <= budget * HEADROOM:
+                self.mode = "memory"
+            elif rss + estimate["inputs"] + estimate["frame"] <= budget * HEADROOM:
+                # Inputs and the finished chunks fit; intermediates are bounded by chunking
+                self.mode = "chunked"
+            else:
+                self.mode = "spill"
+            if estimate["floor"] > budget * HEADROOM:
+                get_logger().warning(
+                    f"Memory governor: loading and writing alone need about {estimate['floor'] / UNITS['M']:.0f} MB, "
+                    f"over the {budget / UNITS['M']:.0f} MB budget; only the derive stage can be bounded.",
+                    extra={"stage": "memory", "floor": estimate["floor"], "budget": budget})
+
+    def check(self, stage):
+        """Records the resident memory after a stage and steps down a mode when it nears the budget.
+
+        Returns:
+            int: The resident memory in bytes.
+        """
+        rss = current_rss()
+        self.samples.append((stage, rss))
+        if self.budget and rss > self.budget * HEADROOM and self.mode != "spill":
+            self.downgrade(f"{rss / UNITS['M']:.0f} MB in use after {stage}")
+        return rss
+
+    def downgrade(self, reason):
+        previous = self.mode
+        self.mode = MODES[MODES.index(self.mode) + 1]
+        get_logger().warning(f"Memory governor: {reason}, switching from {previous} to {self.mode} mode.",
+                             extra={"stage": "memory", "mode": self.mode, "previous_mode": previous})
+
+    def chunk_rows(self, n_columns):
+        """Rows per derive chunk that fit in what is left of the budget."""
+        if not self.budget:
+            return None
+        free = max(self.budget * HEADROOM - current_rss(), 0)
+        rows = int(free / (n_columns * BYTES_PER_CELL * DERIVE_OVERHEAD * 2))
+        return max(rows, MIN_CHUNK_ROWS)
+
+    def spill(self, df):
+        """Writes a finished chunk to the spill directory and returns its path."""
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix="spill_")
+        path = os.path.join(self.spill_dir, f"{len(os.listdir(self.spill_dir)):06d}.pkl")
+        df.to_pickle(path)
+        return path
+
+    def collect(self, parts):
+        """Concatenates derived chunks in order, reading spilled ones back and removing the spill files."""
+        frames = [pd.read_pickle(part) if isinstance(part, str) else part for part in parts]
+        if self.spill_dir is not None:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+            self.spill_dir = None
+        return pd.concat(frames, ignore_index=True)
+
+    def report(self):
+        return (f"Peak memory: {peak_rss() / UNITS['M']:.0f} MB of {self.budget / UNITS['M']:.0f} MB budget "
+                f"({self.mode} mode)")
+
+
+def derive_in_chunks(sfid_df, sfdc_dump_df, columns, governor, today=None, timings=None):
+    """Derives the template in row chunks, checking memory after each one.
+
+    In spill mode every finished chunk is written to disk straight away; a
+    downgrade to spill mode mid-run also spills the chunks already held. Pass
+    the returned parts to governor.collect() once the inputs are released.
+
+    Args:
+        sfid_df (pd.DataFrame): The SFID tracker frame.
+        sfdc_dump_df (pd.DataFrame): The SFDC dump frame.
+        columns (list): Template header, in output order.
+        governor (MemoryGovernor): The run's governor.
+        today (datetime, optional): Reference date shared by all chunks. Defaults to now.
+        timings (dict, optional): Receives the seconds spent per derived column over all chunks.
+
+    Returns:
+        list: Derived chunks in row order, each a DataFrame or a spill file path.
+    """
+    today = today or datetime.today()
+    length = max(len(sfid_df), len(sfdc_dump_df))
+    parts = []
+    start = 0
+    while start < length:
+        stop = min(start + (governor.chunk_rows(len(columns)) or length), length)
+        part = derive_template(sfid_df.iloc[start:stop], sfdc_dump_df.iloc[start:stop], columns, today,
+                               row_offset=start, sfid_length=len(sfid_df), timings=timings)
+        parts.append(governor.spill(part) if governor.mode == "spill" else part)
+        del part
+        if governor.mode != "spill":
+            governor.check(f"derive rows {start}-{stop}")
+            if governor.mode == "spill":
+                parts = [governor.spill(p) if isinstance(p, pd.DataFrame) else p for p in parts]
+                gc.collect()
+        start = stop
+    return parts
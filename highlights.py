@@ -0,0 +1,63 @@
+import numpy as np
+from openpyxl.styles import Font, PatternFill
+from exports import typed_frame
+from query import parse_predicate, predicate_mask
+
+# "conditional" adds one native conditional format per rule; "styles" writes the fill into the cells
+HIGHLIGHT_MODES = ("conditional", "styles")
+
+
+def highlight_rules(rule_configs, columns):
+    """Parses the `highlights.rules` config into rules the xlsx writers apply.
+
+    Each rule config has a name, a `where` list of predicates in query.py
+    syntax (all must hold; date columns take "today" and "today-<days>"), a
+    fill colour as RGB hex, and optionally font_color, bold and the `columns`
+    to colour (default: the whole row).
+
+    Args:
+        rule_configs (list): Rule dicts from the config.
+        columns (list): The output's columns, in template order.
+
+    Returns:
+        list: Dicts with name, predicates, columns (1-based positions), fill and font.
+
+    Raises:
+        ValueError: When a rule names a column the output does not have.
+    """
+    columns = list(columns)
+    rules = []
+    for number, rule in enumerate(rule_configs or [], start=1):
+        name = rule.get("name", f"Rule {number}")
+        predicates = [parse_predicate(item) if isinstance(item, str) else tuple(item) for item in rule.get("where", [])]
+        targets = rule.get("columns") or columns
+        unknown = [col for col, _, _ in predicates if col not in columns] + [col for col in targets if col not in columns]
+        if unknown:
+            raise ValueError(f"Highlight rule '{name}' refers to unknown column(s): {', '.join(unknown)}")
+        fill = rule.get("fill")
+        rules.append({
+            "name": name,
+            "predicates": predicates,
+            "columns": sorted(columns.index(col) + 1 for col in targets),
+            "fill": PatternFill(fill_type="solid", start_color=fill, end_color=fill) if fill else None,
+            "font": Font(color=rule.get("font_color"), bold=rule.get("bold", False))
+            if rule.get("font_color") or rule.get("bold") else None,
+        })
+    return rules
+
+
+def highlight_codes(df, rules):
+    """The rule highlighting each row, evaluated as one boolean mask per rule.
+
+    Only the columns the rules read are typed, once. When several rules match
+    a row the first one wins, so every row maps to a single style.
+
+    Returns:
+        np.ndarray: Per row, 0 for no highlight or the 1-based number of the winning rule.
+    """
+    codes = np.zeros(len(df), dtype=np.int16)
+    referenced = list(dict.fromkeys(col for rule in rules for col, _, _ in rule["predicates"]))
+    typed = typed_frame(df[referenced].reset_index(drop=True))
+    for number in range(len(rules), 0, -1):
+        codes[predicate_mask(typed, rules[number - 1]["predicates"]).to_numpy()] = number
+    return codes
@@ -0,0 +1,286 @@
+import os
+import glob
+import json
+import hashlib
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from archive import file_hash
+
+# Leading bytes that identify each supported file format
+XLSX_MAGIC = b"PK\x03\x04"
+GZIP_MAGIC = b"\x1f\x8b"
+PARQUET_MAGIC = b"PAR1"
+FEATHER_MAGIC = b"ARROW1"
+
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+HAS_CALAMINE = importlib.util.find_spec("python_calamine") is not None
+
+GLOB_CHARS = "*?["
+# sheet_name value that selects every worksheet of an xlsx input
+ALL_SHEETS = "*"
+
+
+def detect_format(path):
+    """Detects the input format from the file's leading bytes rather than its extension.
+
+    Returns:
+        str: One of "xlsx", "parquet", "feather", "csv.gz" or "csv".
+    """
+    with open(path, "rb") as f:
+        head = f.read(8)
+    if head.startswith(XLSX_MAGIC):
+        return "xlsx"
+    if head.startswith(PARQUET_MAGIC):
+        return "parquet"
+    if head.startswith(FEATHER_MAGIC):
+        return "feather"
+    if head.startswith(GZIP_MAGIC):
+        return "csv.gz"
+    return "csv"
+
+
+def _read_header(path, file_format, sheet_name=0):
+    """Reads only the column names, so a column subset can be resolved before the full parse."""
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+        return list(pq.read_schema(path).names)
+    if file_format == "feather":
+        import pyarrow.ipc as ipc
+        with ipc.open_file(path) as reader:
+            return list(reader.schema.names)
+    if file_format == "xlsx":
+        return list(pd.read_excel(path, sheet_name=sheet_name, nrows=0).columns)
+    return list(pd.read_csv(path, nrows=0, compression="gzip" if file_format == "csv.gz" else None).columns)
+
+
+def read_input(path, usecols=None, dtype=None, sheet_name=0):
+    """Reads an xlsx, CSV (optionally gzipped), Parquet or Feather input file.
+
+    CSV is parsed with the multithreaded pyarrow engine when pyarrow is
+    installed, and xlsx with the calamine engine when python-calamine is
+    installed. Only the requested columns are parsed; requested columns that
+    are missing from the file are skipped so validation can report them.
+
+    Args:
+        path (str): Path to the input file.
+        usecols (list, optional): Column names to load (after whitespace stripping). Defaults to all.
+        dtype (dict, optional): Column name to dtype mapping applied while parsing.
+        sheet_name (str or int, optional): Worksheet to read for xlsx inputs. Defaults to the first sheet.
+
+    Returns:
+        pd.DataFrame: The parsed frame with whitespace-stripped column names.
+    """
+    file_format = detect_format(path)
+
+    # Resolve the wanted columns and dtypes against the raw (unstripped) header names
+    raw_usecols = None
+    raw_dtype = None
+    if usecols or dtype:
+        header = {str(col).strip(): col for col in _read_header(path, file_format, sheet_name)}
+        if usecols:
+            wanted = set(usecols)
+            raw_usecols = [raw for name, raw in header.items() if name in wanted]
+        if dtype:
+            raw_dtype = {header[name]: kind for name, kind in dtype.items() if name in header}
+
+    if file_format == "xlsx":
+        df = pd.read_excel(path, sheet_name=sheet_name, usecols=raw_usecols, dtype=raw_dtype,
+                           engine="calamine" if HAS_CALAMINE else None)
+    elif file_format == "parquet":
+        df = pd.read_parquet(path, columns=raw_usecols)
+    elif file_format == "feather":
+        df = pd.read_feather(path, columns=raw_usecols)
+    else:
+        df = pd.read_csv(
+            path,
+            usecols=raw_usecols,
+            dtype=raw_dtype,
+            compression="gzip" if file_format == "csv.gz" else None,
+            engine="pyarrow" if HAS_PYARROW else "c",
+        )
+
+    df.columns = [str(col).strip() for col in df.columns]
+    if raw_dtype and file_format in ("parquet", "feather"):
+        df = df.astype({str(raw).strip(): kind for raw, kind in raw_dtype.items()})
+    return df
+
+
+def input_files(path):
+    """Expands a glob pattern into its matching files, sorted; a plain path comes back as-is."""
+    if any(char in path for char in GLOB_CHARS):
+        return sorted(glob.glob(path))
+    return [path]
+
+
+def input_parts(path, sheet_name=0):
+    """Lists the (file, sheet) parts an input covers.
+
+    Args:
+        path (str): A file path or a glob pattern such as "input/SFDC_dump_*.xlsx".
+        sheet_name (str, int or list, optional): One sheet, a list of sheets, or
+            ALL_SHEETS for every sheet. Only applies to xlsx files.
+
+    Returns:
+        list: (file, sheet) tuples in file order, then sheet order.
+    """
+    files = input_files(path)
+    if not files:
+        raise FileNotFoundError(f"No input files match '{path}'")
+    parts = []
+    for file in files:
+        if detect_format(file) != "xlsx":
+            parts.append((file, 0))
+        elif sheet_name == ALL_SHEETS:
+            import openpyxl
+            wb = openpyxl.load_workbook(file, read_only=True)
+            parts.extend((file, sheet) for sheet in wb.sheetnames)
+            wb.close()
+        elif isinstance(sheet_name, list):
+            parts.extend((file, sheet) for sheet in sheet_name)
+        else:
+            parts.append((file, sheet_name))
+    return parts
+
+
+def _read_part(task):
+    """Worker entry point: parses one part and returns it through shared memory as Arrow IPC when possible.
+
+    Returns:
+        tuple or pd.DataFrame: (block name, size) of the shared block, or the frame itself
+            when pyarrow is missing or the frame has columns Arrow cannot type.
+    """
+    path, options = task
+    df = read_input(path, **options)
+    if HAS_PYARROW:
+        from parallel import frame_to_shared
+        try:
+            shm, size = frame_to_shared(df)
+        except Exception:
+            return df
+        shm.close()
+        return shm.name, size
+    return df
+
+
+def _check_headers(columns, labels):
+    """Raises ValueError unless every part has the first part's columns (order may differ)."""
+    expected = set(columns[0])
+    for part_columns, label in zip(columns[1:], labels[1:]):
+        if set(part_columns) != expected:
+            missing = [col for col in columns[0] if col not in part_columns]
+            extra = [col for col in part_columns if col not in expected]
+            raise ValueError(f"Header of {label} does not match {labels[0]}: missing {missing}, extra {extra}")
+
+
+def _collect_parts(results, labels):
+    """Checks headers and concatenates the parts, as Arrow tables when every part came back through shared memory."""
+    from parallel import take_shared_frame, take_shared_table
+    if not all(isinstance(result, tuple) for result in results):
+        frames = [take_shared_frame(*result) if isinstance(result, tuple) else result for result in results]
+        _check_headers([list(frame.columns) for frame in frames], labels)
+        order = list(frames[0].columns)
+        return pd.concat([frame[order] for frame in frames], ignore_index=True)
+
+    import pyarrow as pa
+    tables = [take_shared_table(name, size) for name, size in results]
+    _check_headers([table.column_names for table in tables], labels)
+    order = tables[0].column_names
+    # Arrow stitches the parts as chunks of one table without copying the data
+    combined = pa.concat_tables([table.select(order) for table in tables], promote_options="permissive")
+    return combined.to_pandas()
+
+
+def read_input_parts(path, usecols=None, dtype=None, sheet_name=0, max_workers=None):
+    """Reads an input that may be split across several files (a glob) and/or sheets.
+
+    A single part is read directly. Several parts are parsed concurrently in
+    worker processes, so the load takes about as long as the largest part.
+    Every part must have the same columns after whitespace stripping; they
+    are then concatenated in file, then sheet, order.
+
+    Args:
+        path (str): A file path or glob pattern.
+        usecols (list, optional): Column names to load. Defaults to all.
+        dtype (dict, optional): Column name to dtype mapping applied while parsing.
+        sheet_name (str, int or list, optional): Sheet, list of sheets, or ALL_SHEETS.
+        max_workers (int, optional): Worker processes. Defaults to one per part, up to the CPU count.
+
+    Returns:
+        pd.DataFrame: All parts, one after another, with a fresh RangeIndex.
+
+    Raises:
+        FileNotFoundError: When the pattern matches no file.
+        ValueError: When the parts' headers disagree.
+    """
+    parts = input_parts(path, sheet_name)
+    if len(parts) == 1:
+        file, sheet = parts[0]
+        return read_input(file, usecols, dtype, sheet)
+    tasks = [(file, {"usecols": usecols, "dtype": dtype, "sheet_name": sheet}) for file, sheet in parts]
+    labels = [f"'{file}'" + (f" sheet '{sheet}'" if detect_format(file) == "xlsx" else "") for file, sheet in parts]
+    if HAS_PYARROW:
+        # Workers must share this process's resource tracker, or their blocks are
+        # unlinked when they exit, before the parts are collected
+        from multiprocessing import resource_tracker
+        resource_tracker.ensure_running()
+    with ProcessPoolExecutor(max_workers=max_workers or min(len(parts), os.cpu_count() or 1)) as executor:
+        results = list(executor.map(_read_part, tasks))
+    return _collect_parts(results, labels)
+
+
+def read_input_cached(path, cache_dir, **options):
+    """Reads an input through a parsed-frame cache keyed by file content and reader options.
+
+    The first reader of a file parses it and pickles the frame into cache_dir;
+    later readers with the same content and options, in this or any other
+    process, load the pickle instead of parsing xlsx or CSV again.
+
+    Args:
+        path (str): Path to the input file.
+        cache_dir (str): Directory holding the cached frames.
+        **options: Keyword arguments for read_input_parts (usecols, dtype, sheet_name, max_workers).
+
+    Returns:
+        pd.DataFrame: The parsed frame, as read_input_parts returns it.
+    """
+    files = input_files(path)
+    if not files:
+        raise FileNotFoundError(f"No input files match '{path}'")
+    payload = json.dumps({"files": [file_hash(file) for file in files], "options": options}, sort_keys=True,
+                         default=str)
+    cached = os.path.join(cache_dir, hashlib.sha256(payload.encode()).hexdigest() + ".pkl")
+    if os.path.exists(cached):
+        return pd.read_pickle(cached)
+    df = read_input_parts(path, **options)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write under a unique name and rename, so concurrent jobs never see a partial pickle
+    tmp = f"{cached}.{os.getpid()}.tmp"
+    df.to_pickle(tmp)
+    os.replace(tmp, cached)
+    return df
+
+
+def normalize_types(df, dtypes):
+    """Coerces date and numeric columns so every input format yields the same frame.
+
+    Excel already returns datetimes and numbers, while CSV returns text; after
+    this pass both look identical. Values that fail to parse become missing
+    (validation has already counted them).
+
+    Args:
+        df (pd.DataFrame): The frame to normalize in place.
+        dtypes (dict): Column name to "date" / "numeric" mapping from the validation config.
+
+    Returns:
+        pd.DataFrame: The same frame, for chaining.
+    """
+    for col, kind in (dtypes or {}).items():
+        if col not in df.columns:
+            continue
+        if kind == "date":
+            # Readers disagree on datetime resolution, so settle on nanoseconds
+            df[col] = pd.to_datetime(df[col], errors="coerce").astype("datetime64[ns]")
+        elif kind == "numeric" and not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df
@@ -0,0 +1,236 @@
+import numpy as np
+import pandas as pd
+
+SFID_KEY = "SFID"
+SFDC_KEY = "Opportunity ID"
+ACCOUNT_COLUMN = "Account Name"
+OPPORTUNITY_COLUMN = "Opportunity Name"
+MATCH_COLUMNS = ["SFID Row", "SFDC Row", "Match Type", "Confidence"]
+
+DEFAULT_MIN_CONFIDENCE = 0.6
+DEFAULT_ACCOUNT_WEIGHT = 0.5
+DEFAULT_MAX_BLOCK_SIZE = 500
+DEFAULT_NGRAM_SIZE = 3
+# Candidate pairs scored per batch, bounding the expanded (pair, n-gram) arrays
+PAIR_BATCH = 200_000
+
+# Tokens that carry no information about which account a row belongs to
+STOP_TOKENS = {
+    "and", "the", "of", "inc", "ltd", "llc", "plc", "corp", "corporation", "co", "company",
+    "group", "limited", "holdings", "sa", "ag", "gmbh", "pvt", "private",
+}
+
+
+def normalize_names(series):
+    """Lowercases and strips punctuation/whitespace from a name column in one vectorized pass."""
+    return (
+        series.fillna("").astype(str).str.lower()
+        .str.replace(r"[^a-z0-9]+", " ", regex=True)
+        .str.strip()
+    )
+
+
+def normalize_keys(series):
+    """Normalizes an ID column for exact matching; empty strings become NA."""
+    keys = series.astype("string").str.strip().str.upper()
+    return keys.mask(keys == "")
+
+
+def _block_tokens(names):
+    """Explodes normalized names into (row, token) pairs used as blocking keys."""
+    tokens = names.str.split().explode().dropna()
+    tokens = tokens[(tokens.str.len() > 1) & ~tokens.isin(STOP_TOKENS)]
+    return tokens.rename("Token").reset_index().drop_duplicates()
+
+
+def _gram_sets(texts, n):
+    """The character n-grams of each distinct text, as rows of a sparse set matrix.
+
+    Returns:
+        tuple: (keys, starts, sizes, n_grams). keys holds text * n_grams + gram,
+            sorted, so text t's grams are keys[starts[t]:starts[t] + sizes[t]].
+            Empty texts have no grams.
+    """
+    padded = " " + pd.Series(texts, dtype=object).astype(str) + " "
+    lengths = padded.str.len().to_numpy()
+    # One vectorized slice per offset; a text shorter than n is its own single gram
+    pieces = [pd.DataFrame({"Text": np.arange(len(padded)), "Gram": padded.str[:n].to_numpy(dtype=object)})]
+    for offset in range(1, max(int(lengths.max()) - n + 1, 1)):
+        fits = lengths >= offset + n
+        pieces.append(pd.DataFrame({"Text": np.flatnonzero(fits),
+                                    "Gram": padded[fits].str[offset:offset + n].to_numpy(dtype=object)}))
+    grams = pd.concat(pieces, ignore_index=True)
+    grams = grams[lengths[grams["Text"].to_numpy()] > 2]
+    gram_codes, gram_values = pd.factorize(grams["Gram"])
+    n_grams = max(len(gram_values), 1)
+    keys = np.unique(grams["Text"].to_numpy(dtype=np.int64) * n_grams + gram_codes)
+    sizes = np.bincount(keys // n_grams, minlength=len(texts))
+    return keys, np.cumsum(sizes) - sizes, sizes, n_grams
+
+
+def _similarity(left_names, right_names, left_rows, right_rows, n):
+    """Character n-gram Jaccard similarity of the name pairs (left_names[left_rows[i]], right_names[right_rows[i]]).
+
+    Each distinct name's n-grams are one row of a sparse set matrix, and each
+    distinct pair of names is scored once: its intersection is counted by
+    probing the right name's row with the left name's grams, one searchsorted
+    per batch of pairs. Pairs are ordered by right name so the probes arrive
+    nearly sorted.
+    """
+    scores = np.zeros(len(left_rows))
+    if not len(left_rows):
+        return scores
+    codes, texts = pd.factorize(pd.concat([left_names, right_names], ignore_index=True))
+    left_codes = pd.Series(codes[:len(left_names)], index=left_names.index)[left_rows].to_numpy()
+    right_codes = pd.Series(codes[len(left_names):], index=right_names.index)[right_rows].to_numpy()
+    keys, starts, sizes, n_grams = _gram_sets(np.asarray(texts, dtype=object), n)
+    grams = keys % n_grams
+    pair_keys, inverse = np.unique(right_codes.astype(np.int64) * len(texts) + left_codes, return_inverse=True)
+    distinct = np.zeros(len(pair_keys))
+    for first in range(0, len(pair_keys), PAIR_BATCH):
+        batch = pair_keys[first:first + PAIR_BATCH]
+        a, b = batch % len(texts), batch // len(texts)
+        counts = sizes[a]
+        pair = np.repeat(np.arange(len(a)), counts)
+        # Position of every left gram: its row start plus its offset within the row
+        position = np.repeat(starts[a] - (np.cumsum(counts) - counts), counts) + np.arange(counts.sum())
+        probe = b[pair] * n_grams + grams[position]
+        found = keys[np.minimum(np.searchsorted(keys, probe), len(keys) - 1)] == probe
+        common = np.bincount(pair, weights=found, minlength=len(a))
+        union = counts + sizes[b] - common
+        distinct[first:first + len(a)] = np.divide(common, union, out=np.zeros(len(a)),
+                                                   where=(counts > 0) & (sizes[b] > 0))
+    scores[:] = distinct[inverse.ravel()]
+    return scores
+
+
+def match_by_key(sfid_df, sfdc_dump_df):
+    """Matches SFID rows to SFDC rows where SFID equals Opportunity ID.
+
+    Returns:
+        pd.DataFrame: One row per matched pair with MATCH_COLUMNS.
+    """
+    if SFID_KEY not in sfid_df.columns or SFDC_KEY not in sfdc_dump_df.columns:
+        return pd.DataFrame(columns=MATCH_COLUMNS)
+    left = pd.DataFrame({"SFID Row": range(len(sfid_df)), "Key": normalize_keys(sfid_df[SFID_KEY]).values}).dropna()
+    right = pd.DataFrame({"SFDC Row": range(len(sfdc_dump_df)), "Key": normalize_keys(sfdc_dump_df[SFDC_KEY]).values})
+    right = right.dropna().drop_duplicates("Key")
+    pairs = left.merge(right, on="Key").drop_duplicates("SFDC Row")
+    pairs["Match Type"] = "key"
+    pairs["Confidence"] = 1.0
+    return pairs[MATCH_COLUMNS]
+
+
+def match_fuzzy(sfid_df, sfdc_dump_df, sfid_rows, sfdc_rows, config):
+    """Matches leftover rows on Account Name plus Opportunity Name.
+
+    Candidates are restricted to SFDC rows sharing at least one account-name
+    token with the SFID row (blocking), so only pairs within the same block are
+    scored instead of the full cross product. Tokens whose block exceeds
+    max_block_size are too common to discriminate and are ignored.
+
+    Args:
+        sfid_df (pd.DataFrame): The SFID tracker frame.
+        sfdc_dump_df (pd.DataFrame): The SFDC dump frame.
+        sfid_rows (array-like): Positions of SFID rows still unmatched.
+        sfdc_rows (array-like): Positions of SFDC rows still available.
+        config (dict): The `matching` section of config.yaml.
+
+    Returns:
+        pd.DataFrame: One row per accepted pair with MATCH_COLUMNS.
+    """
+    if ACCOUNT_COLUMN not in sfid_df.columns or ACCOUNT_COLUMN not in sfdc_dump_df.columns:
+        return pd.DataFrame(columns=MATCH_COLUMNS)
+    min_confidence = config.get("min_confidence", DEFAULT_MIN_CONFIDENCE)
+    account_weight = config.get("account_weight", DEFAULT_ACCOUNT_WEIGHT)
+    max_block_size = config.get("max_block_size", DEFAULT_MAX_BLOCK_SIZE)
+    ngram_size = config.get("ngram_size", DEFAULT_NGRAM_SIZE)
+
+    def names(df, rows, column):
+        if column not in df.columns:
+            return pd.Series("", index=rows)
+        return pd.Series(normalize_names(df[column].iloc[rows]).values, index=rows)
+
+    sfid_accounts = names(sfid_df, sfid_rows, ACCOUNT_COLUMN)
+    sfdc_accounts = names(sfdc_dump_df, sfdc_rows, ACCOUNT_COLUMN)
+    sfid_opps = names(sfid_df, sfid_rows, OPPORTUNITY_COLUMN)
+    sfdc_opps = names(sfdc_dump_df, sfdc_rows, OPPORTUNITY_COLUMN)
+
+    # Build the token index over the SFDC side and drop blocks that are too large
+    sfdc_index = _block_tokens(sfdc_accounts).rename(columns={"index": "SFDC Row"})
+    block_sizes = sfdc_index["Token"].map(sfdc_index["Token"].value_counts())
+    sfdc_index = sfdc_index[block_sizes <= max_block_size]
+    sfid_tokens = _block_tokens(sfid_accounts).rename(columns={"index": "SFID Row"})
+
+    pairs = sfid_tokens.merge(sfdc_index, on="Token")[["SFID Row", "SFDC Row"]].drop_duplicates()
+    if pairs.empty:
+        return pd.DataFrame(columns=MATCH_COLUMNS)
+
+    account_score = _similarity(sfid_accounts, sfdc_accounts, pairs["SFID Row"], pairs["SFDC Row"], ngram_size)
+    opp_score = _similarity(sfid_opps, sfdc_opps, pairs["SFID Row"], pairs["SFDC Row"], ngram_size)
+    pairs["Confidence"] = (
+        account_weight * pd.Series(account_score, index=pairs.index)
+        + (1 - account_weight) * pd.Series(opp_score, index=pairs.index)
+    ).round(4)
+    pairs = pairs[pairs["Confidence"] >= min_confidence]
+
+    # Greedy one-to-one assignment: best scores claim their rows first
+    pairs = pairs.sort_values("Confidence", ascending=False, kind="stable")
+    pairs = pairs.drop_duplicates("SFDC Row").drop_duplicates("SFID Row")
+    pairs["Match Type"] = "fuzzy"
+    return pairs[MATCH_COLUMNS]
+
+
+def match_records(sfid_df, sfdc_dump_df, config=None):
+    """Ties SFID tracker rows to SFDC rows, by key first and fuzzily as a fallback.
+
+    Args:
+        sfid_df (pd.DataFrame): The SFID tracker frame.
+        sfdc_dump_df (pd.DataFrame): The SFDC dump frame.
+        config (dict, optional): The `matching` section of config.yaml.
+
+    Returns:
+        pd.DataFrame: MATCH_COLUMNS covering every SFID row (Match Type "key",
+        "fuzzy" or "unmatched") followed by SFDC rows left over ("sfdc_only").
+    """
+    config = config or {}
+    key_matches = match_by_key(sfid_df, sfdc_dump_df)
+
+    sfid_left = pd.Index(range(len(sfid_df))).difference(key_matches["SFID Row"])
+    sfdc_left = pd.Index(range(len(sfdc_dump_df))).difference(key_matches["SFDC Row"])
+    fuzzy_matches = match_fuzzy(sfid_df, sfdc_dump_df, sfid_left, sfdc_left, config)
+
+    matches = pd.concat([key_matches, fuzzy_matches], ignore_index=True)
+    unmatched = pd.DataFrame({"SFID Row": sfid_left.difference(matches["SFID Row"])})
+    unmatched["Match Type"] = "unmatched"
+    sfdc_only = pd.DataFrame({"SFDC Row": sfdc_left.difference(matches["SFDC Row"])})
+    sfdc_only["Match Type"] = "sfdc_only"
+
+    result = pd.concat([matches, unmatched], ignore_index=True).sort_values("SFID Row", kind="stable")
+    result = pd.concat([result, sfdc_only], ignore_index=True)
+    result["SFID Row"] = result["SFID Row"].astype("Int64")
+    result["SFDC Row"] = result["SFDC Row"].astype("Int64")
+    result["Confidence"] = result["Confidence"].astype(float)
+    return result[MATCH_COLUMNS].reset_index(drop=True)
+
+
+def align_frames(sfid_df, sfdc_dump_df, matches):
+    """Reorders both inputs so that matched rows share the same position.
+
+    Unmatched positions are filled with empty rows, so the positional
+    combine step treats them as missing values on that side.
+
+    Returns:
+        tuple: (aligned_sfid_df, aligned_sfdc_dump_df), both with len(matches) rows.
+    """
+    # Position -1 is not in either frame, so reindex turns it into an all-missing row
+    sfid_rows = matches["SFID Row"].fillna(-1).astype(int).values
+    sfdc_rows = matches["SFDC Row"].fillna(-1).astype(int).values
+    aligned_sfid = sfid_df.reset_index(drop=True).reindex(sfid_rows).reset_index(drop=True)
+    aligned_sfdc = sfdc_dump_df.reset_index(drop=True).reindex(sfdc_rows).reset_index(drop=True)
+    return aligned_sfid, aligned_sfdc
+
+
+def summarize_matches(matches):
+    """Counts rows per match type for the run summary."""
+    return matches["Match Type"].value_counts().to_dict()
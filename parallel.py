@@ -0,0 +1,204 @@
+import os
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import shared_memory
+import pandas as pd
+from derivations import derive_template, required_inputs
+from plugins import load_plugins, loaded_dirs
+
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+# Below this many rows per worker, process start-up costs more than it saves
+MIN_PARTITION_ROWS = 50_000
+
+
+# Blocks a worker has mapped, kept open for the life of the worker so that
+# frames built zero-copy on top of them stay valid
+_ATTACHED = {}
+
+
+def _attach(name):
+    """Attaches to an existing shared-memory block without taking ownership of it."""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13 has no track argument
+        return shared_memory.SharedMemory(name=name)
+
+
+def frame_to_shared(df):
+    """Serializes a frame as an Arrow IPC file into a new shared-memory block.
+
+    Returns:
+        tuple: (SharedMemory, size in bytes). The caller owns the block and must unlink it.
+    """
+    import pyarrow as pa
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    # Measure the IPC size first, then serialize straight into the shared block
+    counter = pa.MockOutputStream()
+    with pa.ipc.new_file(counter, table.schema) as writer:
+        writer.write_table(table)
+    size = counter.size()
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    with pa.ipc.new_file(pa.FixedSizeBufferWriter(pa.py_buffer(shm.buf)), table.schema) as writer:
+        writer.write_table(table)
+    return shm, size
+
+
+def frame_from_shared(name, size, start=0, length=None):
+    """Reads rows [start, start + length) of a frame stored by frame_to_shared, without copying.
+
+    The block stays mapped for the life of the process (see _ATTACHED), so this
+    is meant for worker processes.
+    """
+    import pyarrow as pa
+    if name not in _ATTACHED:
+        _ATTACHED[name] = _attach(name)
+    table = pa.ipc.open_file(pa.py_buffer(_ATTACHED[name].buf[:size])).read_all()
+    if length is not None:
+        table = table.slice(start, length)
+    return table.to_pandas()
+
+
+def take_shared_table(name, size):
+    """Copies an Arrow table out of a shared block once, then releases and unlinks the block."""
+    import pyarrow as pa
+    shm = _attach(name)
+    try:
+        data = bytes(shm.buf[:size])
+    finally:
+        shm.close()
+        shm.unlink()
+    return pa.ipc.open_file(pa.BufferReader(data)).read_all()
+
+
+def take_shared_frame(name, size):
+    """Copies a frame out of a shared block once, then releases and unlinks the block."""
+    return take_shared_table(name, size).to_pandas()
+
+
+def _load_plugins(plugin_dirs):
+    # Spawned workers start with only the built-in derivations registered
+    for directory in plugin_dirs:
+        load_plugins(directory)
+
+
+def _derive_partition(task):
+    """Worker entry point: derives one row partition and hands the result back through shared memory.
+
+    Returns:
+        tuple: ((block name, size) of the shared block, or the frame itself when Arrow
+            cannot type one of its columns, timings).
+    """
+    import pyarrow as pa
+    (sfid_ref, sfdc_ref, start, stop, columns, today, plugin_dirs) = task
+    _load_plugins(plugin_dirs)
+    (sfid_name, sfid_size, sfid_length), (sfdc_name, sfdc_size, sfdc_length) = sfid_ref, sfdc_ref
+    sfid_part = frame_from_shared(sfid_name, sfid_size, start, max(min(stop, sfid_length) - start, 0))
+    sfdc_part = frame_from_shared(sfdc_name, sfdc_size, start, max(min(stop, sfdc_length) - start, 0))
+    timings = {}
+    result = derive_template(sfid_part, sfdc_part, columns, today, row_offset=start, sfid_length=sfid_length,
+                             timings=timings)
+    result = result.reset_index(drop=True)
+    try:
+        shm, size = frame_to_shared(result)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return result, timings
+    shm.close()
+    return (shm.name, size), timings
+
+
+def _derive_partition_pickled(task):
+    """Fallback worker used when pyarrow is unavailable: partitions travel as pickled frames."""
+    sfid_part, sfdc_part, start, sfid_length, columns, today, plugin_dirs = task
+    _load_plugins(plugin_dirs)
+    timings = {}
+    result = derive_template(sfid_part, sfdc_part, columns, today, row_offset=start, sfid_length=sfid_length,
+                             timings=timings)
+    return result, timings
+
+
+def _add_timings(timings, partial):
+    if timings is not None:
+        for column, seconds in partial.items():
+            timings[column] = timings.get(column, 0.0) + seconds
+
+
+def _partitions(length, workers):
+    size = -(-length // workers)
+    return [(start, min(start + size, length)) for start in range(0, length, size)]
+
+
+def derive_parallel(sfid_df, sfdc_dump_df, columns, workers=None, today=None, min_partition_rows=MIN_PARTITION_ROWS,
+                    timings=None):
+    """Derives the template on a process pool, one contiguous row partition per worker.
+
+    Only the input columns the requested template columns need are shipped.
+    With pyarrow installed both inputs are placed once in shared memory as
+    Arrow buffers that every worker maps and slices, and each worker returns
+    its partition through a shared block as well. Partitions are stitched
+    back in row order. Inputs with a column Arrow cannot type, such as an
+    object column mixing numbers and text, travel as pickled partitions instead.
+
+    Args:
+        sfid_df (pd.DataFrame): The SFID tracker frame.
+        sfdc_dump_df (pd.DataFrame): The SFDC dump frame.
+        columns (list): Template header, in output order.
+        workers (int, optional): Worker process count. Defaults to the CPU count.
+        today (datetime, optional): Reference date shared by all partitions. Defaults to now.
+        min_partition_rows (int, optional): Smallest partition worth a worker process.
+        timings (dict, optional): Receives the seconds spent per derived column, summed over the workers.
+
+    Returns:
+        pd.DataFrame: The same frame derive_template would return.
+    """
+    workers = workers or os.cpu_count() or 1
+    today = today or datetime.today()
+    length = max(len(sfid_df), len(sfdc_dump_df))
+    workers = min(workers, max(length // min_partition_rows, 1))
+    if workers <= 1:
+        return derive_template(sfid_df, sfdc_dump_df, columns, today, timings=timings)
+
+    needed = required_inputs(columns)
+    sfid_in = sfid_df[[col for col in needed["sfid"] if col in sfid_df.columns]].reset_index(drop=True)
+    sfdc_in = sfdc_dump_df[[col for col in needed["sfdc"] if col in sfdc_dump_df.columns]].reset_index(drop=True)
+    partitions = _partitions(length, workers)
+
+    blocks = []
+    if HAS_PYARROW:
+        import pyarrow as pa
+        try:
+            for frame in (sfid_in, sfdc_in):
+                blocks.append(frame_to_shared(frame))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            for shm, _ in blocks:
+                shm.close()
+                shm.unlink()
+            blocks = []
+
+    if not blocks:
+        tasks = [(sfid_in.iloc[start:stop], sfdc_in.iloc[start:stop], start, len(sfid_in), columns, today,
+                  loaded_dirs()) for start, stop in partitions]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_derive_partition_pickled, tasks))
+        for _, partial in results:
+            _add_timings(timings, partial)
+        return pd.concat([result for result, _ in results], ignore_index=True).reindex(columns=columns)
+
+    try:
+        (sfid_shm, sfid_size), (sfdc_shm, sfdc_size) = blocks
+        sfid_ref = (sfid_shm.name, sfid_size, len(sfid_in))
+        sfdc_ref = (sfdc_shm.name, sfdc_size, len(sfdc_in))
+        tasks = [(sfid_ref, sfdc_ref, start, stop, columns, today, loaded_dirs()) for start, stop in partitions]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_derive_partition, tasks))
+        for _, partial in results:
+            _add_timings(timings, partial)
+        derived = pd.concat([take_shared_frame(*part) if isinstance(part, tuple) else part for part, _ in results],
+                            ignore_index=True)
+    finally:
+        for shm, _ in blocks:
+            shm.close()
+            shm.unlink()
+    return derived.reindex(columns=columns)
@@ -0,0 +1,200 @@
+import zlib
+from datetime import datetime
+import pandas as pd
+
+# Landscape A4 in points
+PAGE_WIDTH = 842
+PAGE_HEIGHT = 595
+MARGIN = 28
+FONT_SIZE = 7
+ROW_HEIGHT = 9
+# Average Helvetica glyph width as a fraction of the font size, used to truncate text
+CHAR_WIDTH = 0.5
+MIN_COLUMN_CHARS = 4
+MAX_COLUMN_CHARS = 40
+# Rows are formatted in blocks of this many pages, bounding memory while amortizing pandas overhead
+PAGES_PER_BLOCK = 50
+
+DEFAULT_COLUMNS = [
+    "Account Name", "SFID", "Opportunity Name", "Group SBU", "Stage", "Est. Deal Value",
+    "Close Date", "Proposed Sub. Date", "Bid Director", "Opp. Status", "Large Deal", "Cl. FY", "Cl. QTR",
+]
+DEFAULT_SUMMARY_BY = ["Opp. Status", "Bid Director"]
+DEFAULT_VALUE_COLUMN = "Est. Deal Value"
+
+
+def _escape(text):
+    """Escapes a string for a PDF literal and maps it onto WinAnsi (Latin-1) bytes."""
+    text = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return text.encode("latin-1", errors="replace").decode("latin-1")
+
+
+def format_cells(df):
+    """Formats a page worth of rows as display strings, one vectorized pass per column."""
+    cells = {}
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_datetime64_any_dtype(series):
+            text = series.dt.strftime("%d/%m/%Y")
+        elif pd.api.types.is_float_dtype(series):
+            text = series.map("{:,.2f}".format)
+        elif pd.api.types.is_numeric_dtype(series):
+            text = series.map("{:,}".format)
+        else:
+            text = series.astype("string")
+        cells[col] = text.mask(series.isna(), "").astype(str).str.replace(r"\s+", " ", regex=True)
+    return pd.DataFrame(cells, index=df.index)
+
+
+class PdfWriter:
+    """Minimal streaming PDF writer for text tables.
+
+    Every page is written to disk as soon as it is rendered; only the byte
+    offsets of finished objects are kept, so memory stays flat however many
+    pages the report has.
+    """
+
+    # Object numbers reserved for the objects written last or shared by all pages
+    CATALOG, PAGES, FONT = 1, 2, 3
+
+    def __init__(self, output_file, compress=True):
+        self.file = open(output_file, "wb")
+        self.compress = compress
+        self.offsets = {}
+        self.page_ids = []
+        self.next_id = 4
+        self.file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._write_object(self.FONT, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+                                      b"/Encoding /WinAnsiEncoding >>")
+
+    def _write_object(self, obj_id, body):
+        self.offsets[obj_id] = self.file.tell()
+        self.file.write(f"{obj_id} 0 obj\n".encode() + body + b"\nendobj\n")
+
+    def add_page(self, operations):
+        """Writes one page from a list of content-stream operator strings."""
+        content = "\n".join(operations).encode("latin-1")
+        if self.compress:
+            content = zlib.compress(content)
+            header = f"<< /Length {len(content)} /Filter /FlateDecode >>".encode()
+        else:
+            header = f"<< /Length {len(content)} >>".encode()
+        content_id, page_id = self.next_id, self.next_id + 1
+        self.next_id += 2
+        self._write_object(content_id, header + b"\nstream\n" + content + b"\nendstream")
+        self._write_object(page_id, (
+            f"<< /Type /Page /Parent {self.PAGES} 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 {self.FONT} 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode())
+        self.page_ids.append(page_id)
+
+    def close(self):
+        kids = " ".join(f"{page_id} 0 R" for page_id in self.page_ids)
+        self._write_object(self.PAGES, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode())
+        self._write_object(self.CATALOG, f"<< /Type /Catalog /Pages {self.PAGES} 0 R >>".encode())
+        xref_offset = self.file.tell()
+        size = self.next_id
+        self.file.write(f"xref\n0 {size}\n0000000000 65535 f \n".encode())
+        for obj_id in range(1, size):
+            self.file.write(f"{self.offsets.get(obj_id, 0):010d} 00000 n \n".encode())
+        self.file.write(f"trailer\n<< /Size {size} /Root {self.CATALOG} 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+        self.file.close()
+
+
+def _text(x, y, text, size=FONT_SIZE):
+    return f"BT /F1 {size} Tf {x:.1f} {y:.1f} Td ({_escape(text)}) Tj ET"
+
+
+def _column_layout(df, columns):
+    """Splits the usable page width between columns in proportion to their typical text length."""
+    sample = format_cells(df[columns].head(200)) if len(df) else pd.DataFrame(columns=columns)
+    chars = []
+    for col in columns:
+        typical = sample[col].str.len().quantile(0.9) if len(sample) else 0
+        chars.append(min(max(len(str(col)), typical, MIN_COLUMN_CHARS), MAX_COLUMN_CHARS))
+    scale = (PAGE_WIDTH - 2 * MARGIN) / sum(chars)
+    widths = [c * scale for c in chars]
+    max_chars = [max(int(w / (FONT_SIZE * CHAR_WIDTH)) - 1, 1) for w in widths]
+    positions = [MARGIN + sum(widths[:i]) for i in range(len(widths))]
+    return positions, max_chars
+
+
+def _table_page(title, page_number, columns, positions, max_chars, rows):
+    """Builds the content-stream operators for one table page."""
+    top = PAGE_HEIGHT - MARGIN
+    ops = [
+        _text(MARGIN, top, title, size=10),
+        _text(PAGE_WIDTH - MARGIN - 40, top, f"Page {page_number}"),
+    ]
+    y = top - 2 * ROW_HEIGHT
+    for col, x, limit in zip(columns, positions, max_chars):
+        ops.append(_text(x, y, str(col)[:limit]))
+    ops.append(f"0.5 w {MARGIN} {y - 3:.1f} m {PAGE_WIDTH - MARGIN} {y - 3:.1f} l S")
+    for row in rows:
+        y -= ROW_HEIGHT
+        for value, x, limit in zip(row, positions, max_chars):
+            if value:
+                ops.append(_text(x, y, value[:limit]))
+    return ops
+
+
+def summary_tables(df, summary_by, value_column):
+    """Builds the count/value rollups printed ahead of the table."""
+    tables = []
+    for col in summary_by:
+        if col not in df.columns:
+            continue
+        values = pd.to_numeric(df[value_column], errors="coerce") if value_column in df.columns else None
+        grouped = pd.DataFrame({col: df[col].astype("string").fillna("(blank)")})
+        grouped["Opportunities"] = 1
+        grouped["Value"] = values if values is not None else 0.0
+        rollup = grouped.groupby(col, sort=True).agg({"Opportunities": "sum", "Value": "sum"}).reset_index()
+        tables.append(rollup)
+    return tables
+
+
+def render_pdf(df, output_file, columns=None, summary_by=None, value_column=DEFAULT_VALUE_COLUMN,
+               title="Weekly Template", compress=True):
+    """Renders the derived template (or a column subset) and summary rollups to PDF.
+
+    Args:
+        df (pd.DataFrame): The derived template frame.
+        output_file (str): Path of the PDF to write.
+        columns (list, optional): Columns to print. Defaults to DEFAULT_COLUMNS present in df.
+        summary_by (list, optional): Columns to roll up ahead of the table. Defaults to DEFAULT_SUMMARY_BY.
+        value_column (str, optional): Column summed in the rollups. Defaults to DEFAULT_VALUE_COLUMN.
+        title (str, optional): Title printed on each page.
+        compress (bool, optional): Deflate page content streams. Defaults to True.
+
+    Returns:
+        int: The number of pages written.
+    """
+    columns = [col for col in (columns or DEFAULT_COLUMNS) if col in df.columns] or list(df.columns)
+    summary_by = DEFAULT_SUMMARY_BY if summary_by is None else summary_by
+    title = f"{title} - generated {datetime.now():%d/%m/%Y %H:%M} - {len(df)} rows"
+    rows_per_page = int((PAGE_HEIGHT - 2 * MARGIN) / ROW_HEIGHT) - 3
+    writer = PdfWriter(output_file, compress=compress)
+    page_number = 0
+    try:
+        for rollup in summary_tables(df, summary_by, value_column):
+            rollup_columns = list(rollup.columns)
+            positions, max_chars = _column_layout(rollup, rollup_columns)
+            cells = format_cells(rollup)
+            for start in range(0, len(cells), rows_per_page):
+                page_number += 1
+                rows = cells.iloc[start:start + rows_per_page].itertuples(index=False, name=None)
+                writer.add_page(_table_page(f"{title} - by {rollup_columns[0]}", page_number, rollup_columns,
+                                            positions, max_chars, rows))
+
+        # Stream the table: format a bounded block of rows at a time and write it page by page
+        positions, max_chars = _column_layout(df, columns)
+        block_rows = rows_per_page * PAGES_PER_BLOCK
+        for block_start in range(0, max(len(df), 1), block_rows):
+            cells = format_cells(df[columns].iloc[block_start:block_start + block_rows])
+            for start in range(0, max(len(cells), 1), rows_per_page):
+                page_number += 1
+                rows = cells.iloc[start:start + rows_per_page].itertuples(index=False, name=None)
+                writer.add_page(_table_page(title, page_number, columns, positions, max_chars, rows))
+    finally:
+        writer.close()
+    return page_number
@@ -0,0 +1,92 @@
+import os
+import sys
+import glob
+import importlib.util
+from derivations import DERIVATIONS
+from runlog import get_logger
+
+PLUGIN_DIR = "plugins"
+
+# Derived column -> plugin file that registered it
+PLUGINS = {}
+
+_loaded = []
+# Derived column -> the derivation a plugin replaced (None for a new column), for unload_plugins
+_replaced = {}
+
+
+def plugin_files(directory=PLUGIN_DIR):
+    """The plugin modules in directory, in load order; files starting with "_" are skipped."""
+    return [path for path in sorted(glob.glob(os.path.join(directory, "*.py")))
+            if not os.path.basename(path).startswith("_")]
+
+
+def load_plugins(directory=PLUGIN_DIR):
+    """Imports every plugin module in directory, registering the columns they derive.
+
+    A plugin is a .py file that registers one or more columns with
+    derivations.derivation, declaring the template columns (requires) and
+    input columns (inputs) it reads; resolve_columns then orders plugin and
+    built-in columns together by those declarations. Files whose names start
+    with "_" are skipped. Loading a directory a second time does nothing, so
+    worker processes can call this freely.
+
+    Args:
+        directory (str, optional): Plugin directory. Defaults to "plugins".
+
+    Returns:
+        list: The columns registered by the directory's plugins.
+
+    Raises:
+        ValueError: When a plugin module fails to import.
+    """
+    directory = os.path.abspath(directory)
+    if directory in _loaded or not os.path.isdir(directory):
+        return [column for column, path in PLUGINS.items() if os.path.dirname(path) == directory]
+    columns = []
+    for path in plugin_files(directory):
+        stem = os.path.splitext(os.path.basename(path))[0]
+        before = dict(DERIVATIONS)
+        name = f"pipeline_plugins.{stem}"
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        try:
+            spec.loader.exec_module(module)
+        except Exception as e:
+            del sys.modules[name]
+            raise ValueError(f"Plugin '{path}' failed to load: {e!r}") from e
+        for column, entry in DERIVATIONS.items():
+            if before.get(column) is entry:
+                continue
+            if column in before:
+                get_logger().warning(f"Warning: Plugin '{stem}' replaces the derivation of '{column}'.",
+                                     extra={"stage": "plugins", "plugin": stem, "column": column})
+            PLUGINS[column] = path
+            _replaced.setdefault(column, before.get(column))
+            columns.append(column)
+    _loaded.append(directory)
+    return columns
+
+
+def unload_plugins():
+    """Removes every plugin column and restores the derivations plugins replaced.
+
+    The watcher calls this before each run, so the next load_plugins picks up
+    edited, added and removed plugin files.
+    """
+    for column, entry in _replaced.items():
+        if entry is None:
+            DERIVATIONS.pop(column, None)
+        else:
+            DERIVATIONS[column] = entry
+    for name in [name for name in sys.modules if name.startswith("pipeline_plugins.")]:
+        del sys.modules[name]
+    _replaced.clear()
+    PLUGINS.clear()
+    del _loaded[:]
+
+
+def loaded_dirs():
+    """The plugin directories loaded in this process, for worker processes to load in turn."""
+    return tuple(_loaded)
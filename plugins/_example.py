@@ -0,0 +1,27 @@
+# Example derivation plugin. Files starting with "_" are not loaded: copy this file to
+# plugins/<your_team>.py and replace the logic with your own.
+#
+# A plugin registers each column it fills with @derivation, declaring the template
+# columns it reads from the context (requires) and the raw input columns it reads as
+# (side, column) pairs (inputs). The function receives whole columns and must return
+# the whole output column at once: a Series on ctx.index or an array of ctx.length values.
+import numpy as np
+from derivations import derivation
+
+TCV_BANDS = [0, 1_000_000, 5_000_000, 20_000_000]
+TCV_LABELS = np.array(["--", "< 1M", "1M - 5M", "5M - 20M", "20M+"], dtype=object)
+
+
+@derivation("TCV Brk. Up", requires=["Est Deal Value in USD"])
+def _tcv_break_up(ctx):
+    value = ctx["Est Deal Value in USD"].astype(float).to_numpy()
+    bands = np.searchsorted(TCV_BANDS, value, side="right")
+    return np.where(np.isnan(value) | (value <= 0), TCV_LABELS[0], TCV_LABELS[bands])
+
+
+@derivation("Direct/ Related", inputs=[("sfdc", "Type")])
+def _direct_related(ctx):
+    deal_type = ctx.source("sfdc", "Type")
+    if deal_type is None:
+        return ctx.constant(None)
+    return np.where(deal_type.eq("New Business").fillna(False), "Direct", "Related")
@@ -0,0 +1,249 @@
+import os
+import re
+import sys
+import glob
+import time
+import argparse
+import importlib.util
+import pandas as pd
+from validation import load_config
+from explorer import results_cache_path
+from exports import unified_schema
+from inputs import GLOB_CHARS
+
+HAS_PYARROW = importlib.util.find_spec("pyarrow") is not None
+
+CONFIG_FILE = "config/config.yaml"
+VALUE_COLUMN = "Est Deal Value in USD"
+# Every template output carries these; side outputs (Workload, Forecast) in the same directory do not
+TEMPLATE_KEY_COLUMNS = ("SFID", "Opp. Status")
+_COMPARISON = re.compile(r"^\s*(?P<column>.+?)\s*(?P<op>==|!=|>=|<=|=|>|<)\s*(?P<value>.*?)\s*$")
+# Greedy, so a column name containing " in " (Created in Week) still parses
+_MEMBERSHIP = re.compile(r"^\s*(?P<column>.+)\s+(?P<op>in)\s+(?P<value>.*?)\s*$")
+# Date values relative to the run day, e.g. "today" or "today-90" (days)
+_RELATIVE_DATE = re.compile(r"^today\s*(?:(?P<sign>[+-])\s*(?P<days>\d+))?$", re.IGNORECASE)
+
+
+def parse_predicate(text):
+    """Parses 'Column op value' into a (column, op, value) predicate.
+
+    Operators are ==, =, !=, >=, <=, >, < and 'in' with a comma-separated list,
+    e.g. "Opp. Status == OPEN" or "Group SBU in GM APAC,GM ASIA". Date columns
+    also take "today" and "today-<days>".
+    """
+    match = _COMPARISON.match(text) or _MEMBERSHIP.match(text)
+    if not match:
+        raise ValueError(f"Cannot parse predicate '{text}'; expected 'Column op value'")
+    op = "==" if match["op"] == "=" else match["op"]
+    value = match["value"]
+    return match["column"], op, [item.strip() for item in value.split(",")] if op == "in" else value
+
+
+def _parquet_columns(path):
+    if HAS_PYARROW:
+        import pyarrow.parquet as pq
+        return pq.read_schema(path).names
+    return list(pd.read_parquet(path).columns)
+
+
+def _filled_columns(path):
+    """Columns of a Parquet file holding at least one value, from its row-group null counts."""
+    import pyarrow.parquet as pq
+    metadata = pq.ParquetFile(path).metadata
+    nulls = {}
+    for group in range(metadata.num_row_groups):
+        for index in range(metadata.num_columns):
+            column = metadata.row_group(group).column(index)
+            statistics = column.statistics
+            # Without statistics the column is assumed to hold values
+            count = statistics.null_count if statistics is not None and statistics.has_null_count else 0
+            nulls[column.path_in_schema] = nulls.get(column.path_in_schema, 0) + count
+    return {name for name, count in nulls.items() if count < metadata.num_rows}
+
+
+def _dataset_schema(files):
+    """One schema over outputs typed per run, where a column empty in one week may be string
+    there and double in another."""
+    import pyarrow.parquet as pq
+    return unified_schema([pq.read_schema(file) for file in files], [_filled_columns(file) for file in files])
+
+
+def source_files(source):
+    """The Parquet files behind a source: a file, a directory of run outputs, a glob, or an
+    xlsx output whose Parquet copy sits next to it.
+
+    A directory is searched recursively, keeping only template outputs: files without
+    the template key columns, such as the workload and forecast tables, are skipped.
+    """
+    if os.path.isdir(source):
+        files = sorted(glob.glob(os.path.join(source, "**", "*.parquet"), recursive=True))
+        return [file for file in files if set(TEMPLATE_KEY_COLUMNS) <= set(_parquet_columns(file))]
+    if any(char in source for char in GLOB_CHARS):
+        return sorted(glob.glob(source))
+    if not source.endswith(".parquet"):
+        source = results_cache_path(source)
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"No columnar output found at '{source}'")
+    return [source]
+
+
+def _typed_value(value, kind):
+    """Casts a predicate value given as text to the column's kind ("datetime", "numeric" or "string")."""
+    if isinstance(value, list):
+        return [_typed_value(item, kind) for item in value]
+    if kind == "datetime":
+        relative = _RELATIVE_DATE.match(str(value).strip())
+        if relative:
+            days = int(relative["days"] or 0) * (-1 if relative["sign"] == "-" else 1)
+            return pd.Timestamp.today().normalize() + pd.Timedelta(days=days)
+        return pd.Timestamp(value)
+    if kind == "numeric":
+        return float(value)
+    return value
+
+
+def _arrow_kind(field_type):
+    import pyarrow as pa
+    if pa.types.is_timestamp(field_type) or pa.types.is_date(field_type):
+        return "datetime"
+    if pa.types.is_integer(field_type) or pa.types.is_floating(field_type) or pa.types.is_decimal(field_type):
+        return "numeric"
+    return "string"
+
+
+def _pandas_kind(series):
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "datetime"
+    if pd.api.types.is_numeric_dtype(series):
+        return "numeric"
+    return "string"
+
+
+def _arrow_filter(predicates, schema):
+    import pyarrow.compute as pc
+    expression = None
+    for column, op, value in predicates:
+        if schema.get_field_index(column) < 0:
+            raise ValueError(f"Unknown column '{column}'")
+        field = pc.field(column)
+        value = _typed_value(value, _arrow_kind(schema.field(column).type))
+        condition = {
+            "==": lambda: field == value, "!=": lambda: field != value, ">=": lambda: field >= value,
+            "<=": lambda: field <= value, ">": lambda: field > value, "<": lambda: field < value,
+            "in": lambda: field.isin(value),
+        }[op]()
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def predicate_mask(df, predicates):
+    """Rows of df where every (column, op, value) predicate holds, as a boolean Series."""
+    mask = pd.Series(True, index=df.index)
+    for column, op, value in predicates:
+        if column not in df.columns:
+            raise ValueError(f"Unknown column '{column}'")
+        series = df[column]
+        value = _typed_value(value, _pandas_kind(series))
+        mask &= {
+            "==": lambda: series == value, "!=": lambda: series != value, ">=": lambda: series >= value,
+            "<=": lambda: series <= value, ">": lambda: series > value, "<": lambda: series < value,
+            "in": lambda: series.isin(value),
+        }[op]().fillna(False).astype(bool)
+    return mask
+
+
+def query_results(source, columns=None, where=None, limit=None):
+    """Reads a filtered extract of the cached pipeline outputs.
+
+    With pyarrow, the predicates and the column selection are pushed down to the
+    Parquet scan: row groups whose statistics rule out a match are skipped and
+    unselected columns are never decoded. Without it the files are read in full
+    and filtered in pandas, with the same result.
+
+    Args:
+        source (str): Parquet file, directory or glob of Parquet files, or an xlsx output path.
+        columns (list, optional): Columns to return. Defaults to all.
+        where (list, optional): Predicates, as (column, op, value) tuples or strings for parse_predicate;
+            all must hold. Values are cast to each column's type.
+        limit (int, optional): Return at most this many rows.
+
+    Returns:
+        pd.DataFrame: The matching rows.
+    """
+    predicates = [parse_predicate(item) if isinstance(item, str) else tuple(item) for item in where or []]
+    files = source_files(source)
+    if not files:
+        raise FileNotFoundError(f"No Parquet files match '{source}'")
+    if HAS_PYARROW:
+        import pyarrow.dataset as ds
+        dataset = ds.dataset(files, format="parquet", schema=_dataset_schema(files))
+        expression = _arrow_filter(predicates, dataset.schema) if predicates else None
+        if limit is not None:
+            table = dataset.head(limit, columns=columns, filter=expression)
+        else:
+            table = dataset.to_table(columns=columns, filter=expression)
+        return table.to_pandas()
+    df = pd.concat([pd.read_parquet(file) for file in files], ignore_index=True)
+    df = df[predicate_mask(df, predicates)]
+    if columns:
+        df = df[columns]
+    return (df.head(limit) if limit is not None else df).reset_index(drop=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cut a filtered extract from the cached pipeline outputs.")
+    parser.add_argument("--source", help="Parquet output, directory or glob of outputs (default: the configured "
+                                         "parquet_file)")
+    parser.add_argument("--columns", nargs="+", help="Columns to return (default: all)")
+    parser.add_argument("--where", nargs="+", default=[], metavar="PREDICATE",
+                        help="e.g. \"Opp. Status == OPEN\" \"Group SBU in GM APAC,GM ASIA\"")
+    parser.add_argument("--status", help="Opp. Status, e.g. OPEN")
+    parser.add_argument("--sbu", nargs="+", help="Group SBU values")
+    parser.add_argument("--fy", help="Cl. FY, e.g. FY25")
+    parser.add_argument("--qtr", help="Cl. QTR, e.g. Q2")
+    parser.add_argument("--min-value", type=float, help=f"Lowest {VALUE_COLUMN}")
+    parser.add_argument("--max-value", type=float, help=f"Highest {VALUE_COLUMN}")
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--output", help="Write the extract to this .xlsx, .csv or .parquet file")
+    args = parser.parse_args(argv)
+
+    where = [parse_predicate(item) for item in args.where]
+    for column, op, value in (("Opp. Status", "==", args.status), ("Group SBU", "in", args.sbu),
+                              ("Cl. FY", "==", args.fy), ("Cl. QTR", "==", args.qtr),
+                              (VALUE_COLUMN, ">=", args.min_value), (VALUE_COLUMN, "<=", args.max_value)):
+        if value is not None:
+            where.append((column, op, value))
+    if args.source:
+        source = args.source
+    else:
+        config = load_config(CONFIG_FILE)
+        source = ((config.get("exports", {}) or {}).get("parquet_file")
+                  or results_cache_path(config["file_paths"]["output_file"]))
+
+    errors = (FileNotFoundError, ValueError)
+    if HAS_PYARROW:
+        import pyarrow as pa
+        errors += (pa.ArrowException,)
+    started = time.perf_counter()
+    try:
+        df = query_results(source, args.columns, where, args.limit)
+    except errors as e:
+        print(f"Error: {e}")
+        return 1
+    print(f"{len(df)} matching rows in {time.perf_counter() - started:.3f}s")
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        if args.output.endswith(".parquet"):
+            df.to_parquet(args.output, index=False)
+        elif args.output.endswith(".csv"):
+            df.to_csv(args.output, index=False)
+        else:
+            df.to_excel(args.output, index=False)
+        print(f"Extract written: {args.output}")
+    else:
+        print(df.head(20).to_string())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
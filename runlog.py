@@ -0,0 +1,130 @@
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+from datetime import datetime
+
+LOGGER_NAME = "pipeline"
+LOG_FILE = "logs/pipeline.jsonl"
+
+# Attributes every LogRecord has; anything else on a record is a structured field
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object: time, level, message plus its structured fields."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "pid": record.process,
+            "message": record.getMessage(),
+        }
+        entry.update({name: value for name, value in vars(record).items() if name not in _RECORD_ATTRIBUTES})
+        if record.exc_info or record.exc_text:
+            entry["exception"] = record.exc_text or self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class ConsoleHandler(logging.StreamHandler):
+    """Prints the plain message to whatever sys.stdout is at the time, so captured output
+    (batch job logs, redirect_stdout) still sees it."""
+
+    def __init__(self):
+        super().__init__(sys.stdout)
+        self.setFormatter(logging.Formatter("%(message)s"))
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+def setup_logging(log_file=LOG_FILE, level="INFO", console=True):
+    """Configures the pipeline logger once per process.
+
+    Console lines stay as they were; every record is also written as a JSON
+    line to log_file by a background thread, fed through a queue, so the
+    pipeline never waits on log file I/O.
+
+    Args:
+        log_file (str, optional): JSON-lines log path; None disables it.
+        level (str, optional): Minimum level recorded. Defaults to INFO.
+        console (bool, optional): Also print messages to stdout.
+
+    Returns:
+        logging.Logger: The pipeline logger.
+    """
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    if logger.handlers:
+        return logger
+    logger.setLevel(level)
+    logger.propagate = False
+    if console:
+        logger.addHandler(ConsoleHandler())
+    if log_file:
+        os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+        file_handler = logging.FileHandler(log_file, encoding="utf-8")
+        file_handler.setFormatter(JsonFormatter())
+        log_queue = queue.SimpleQueue()
+        logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        _listener = logging.handlers.QueueListener(log_queue, file_handler)
+        _listener.start()
+        atexit.unregister(stop_logging)
+        atexit.register(stop_logging)
+    return logger
+
+
+def stop_logging():
+    """Drains the queue, closes the JSON-lines log and detaches the handlers.
+
+    Pool worker processes skip atexit, so batch jobs call this themselves;
+    the next setup_logging() call in the same process starts afresh.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    logger = logging.getLogger(LOGGER_NAME)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+
+
+def get_logger():
+    return logging.getLogger(LOGGER_NAME)
+
+
+class RunLogger:
+    """Front end to the pipeline logger that stamps every record with the run's own fields.
+
+    Per-call keyword arguments become additional JSON fields, e.g.
+    log.info("Rows derived", stage="derive", rows=1200).
+    """
+
+    def __init__(self, logger=None, **fields):
+        self.logger = logger or get_logger()
+        self.fields = fields
+
+    def log(self, level, message, **fields):
+        self.logger.log(level, message, extra={**self.fields, **fields})
+
+    def info(self, message, **fields):
+        self.log(logging.INFO, message, **fields)
+
+    def warning(self, message, **fields):
+        self.log(logging.WARNING, message, **fields)
+
+    def error(self, message, **fields):
+        self.log(logging.ERROR, message, **fields)
@@ -1,8 +1,29 @@
 import pandas as pd
 import openpyxl
-from openpyxl.utils.dataframe import dataframe_to_rows
-from datetime import datetime, timedelta
 import os
+import gc
+import sys
+import logging
+import time
+import argparse
+from inputs import read_input_parts, read_input_cached, input_files, normalize_types
+from validation import load_config, merge_config, validate_inputs, write_quality_report, check_rows
+from runlog import setup_logging, RunLogger, LOG_FILE
+from matching import match_records, align_frames, summarize_matches
+from legacy import build_template_data
+from derivations import derive_template
+from parallel import derive_parallel
+from exports import build_writers, export_frame, table_writers, xlsx_output_files, xlsx_parts, EXCEL_MAX_ROWS
+from archive import RunArchive, run_key, ARCHIVE_DIR
+from templates import load_layouts, derive_columns
+from governor import MemoryGovernor, estimate_peak, derive_in_chunks, parse_size, UNITS
+from consolidate import consolidate_dumps, KEY_COLUMN
+from currency import load_fx_rates, normalize_deal_values, FX_FILE
+from workload import workload_rollup
+from forecast import forecast_bookings
+from highlights import highlight_rules, highlight_codes, HIGHLIGHT_MODES
+from formulas import template_formulas, compile_formulas, evaluate_formulas, formula_pieces, FORMULA_MODES
+from plugins import load_plugins, plugin_files, PLUGINS, PLUGIN_DIR
 
 # --- Configuration ---
 SFID_FILE = "input/SFID_file.xlsx"
@@ -10,466 +31,390 @@ SFDC_DUMP_FILE = "input/SFDC_dump.xlsx"
 TEMPLATE_FILE = "input/Weekly_Template.xlsx"
 OUTPUT_FILE = "output/Updated_Template.xlsx"
 TEMPLATE_SHEET_NAME = "SFDC"
-LARGE_DEAL_THRESHOLD = 20000000
-FISCAL_OFFSET = 3  # Month offset for fiscal year
-
-# --- Helper Functions ---
-def calculate_opportunity_status_from_template(proposal_status, stage, created_date_str):
-    if proposal_status in ["No-Go", "On-Hold", "Deferred"]:
-        return "No-BID"
-    if stage == "7 - Contract Award":
-        return "WON"
-    if stage == "Lost":
-        return "LOST"
-    if stage in ["1 - Opportunity", "2 - Qualification", "3 - Pursuit", "4 - Proposal", "5 - Closing", "6 - Verbal"]:
-        return "OPEN"
-    try:
-        created_date = pd.to_datetime(created_date_str)
-        if pd.isnull(created_date) or (pd.Timestamp.today() - created_date).days > 90:
-            return "CLOSED"
-    except (TypeError, ValueError):
-        return "OPEN" #Default to open if date parsing fails
-
-
-def calculate_large_deal_from_value(amount):
-    if pd.isna(amount):
-        return "--"
-    if amount >= LARGE_DEAL_THRESHOLD:
-        return "Yes"
-    elif amount > 0:
-        return "No"
-    return "--"
-
-def get_last_monday(date_value):
-    if pd.isnull(date_value):
-        return None
-    date_obj = pd.to_datetime(date_value).date()
-    start_of_week = date_obj - timedelta(days=date_obj.weekday())
-    return start_of_week
-
-def calculate_fiscal_year_short(date_value, fiscal_offset=FISCAL_OFFSET):
-    if pd.isnull(date_value):
-        return None
-    date = pd.to_datetime(date_value)
-    year = date.year
-    month = date.month
-    if month > fiscal_offset:
-        return f"FY{year % 100}"
-    else:
-        return f"FY{(year - 1) % 100}"
-
-def calculate_quarter(date_value):
-    if pd.isnull(date_value):
-        return None
-    month = pd.to_datetime(date_value).month
-    if 4 <= month <= 6:
-        return "Q1"
-    elif 7 <= month <= 9:
-        return "Q2"
-    elif 10 <= month <= 12:
-        return "Q3"
-    elif 1 <= month <= 3:
-        return "Q4"
-    return None
-
-def calculate_week_from_date(date_value):
-    if pd.isnull(date_value):
-        return None
-    return pd.to_datetime(date_value).isocalendar()[1]
-
-def calculate_bid_director(group_sbu):
-    """
-    Determine the Bid Director based on the Group SBU value.
+CONFIG_FILE = "config/config.yaml"
+
+
+class PipelineError(Exception):
+    """A run could not complete; the message says why and has already been logged."""
+
+
+def run_pipeline(sfid_file, sfdc_dump_file, template_file, output_file, config,
+                 config_file=CONFIG_FILE, input_cache_dir=None, run_settings=None):
+    """Runs the whole pipeline for one set of inputs, template and output.
+
+    Args:
+        sfid_file (str): Path to the SFID tracker.
+        sfdc_dump_file (str): Path to the SFDC dump.
+        template_file (str): Path to the weekly template workbook.
+        output_file (str): Path of the updated xlsx template.
+        config (dict): The pipeline configuration (already merged with any overrides).
+        config_file (str, optional): Path of the YAML config, archived with the run.
+        input_cache_dir (str, optional): Parsed-input cache shared between runs; inputs
+            are parsed directly when omitted.
+        run_settings (dict, optional): Extra settings that change the outputs (such as
+            batch overrides); they become part of the archive reuse key.
+
+    Returns:
+        dict: "status" ("ok" or "restored"), "rows" written and "seconds" taken.
+
+    Raises:
+        PipelineError: When inputs are missing or invalid or an output cannot be written.
     """
-    if group_sbu in ["GM APAC", "GM ASIA", "GM ANZ"]:
-        return "Piyush J"
-    elif group_sbu in ["GM EME", "GM MIDDLE EAST", "GM CONTINENTAL EUROPE", "GM UNITED KINGDOM"]:
-        return "Samrat B"
-    elif group_sbu in ["BET NA TELCO", "BET NA EMERGING", "BET NA BFS US", "BET NA CANADA", "Platinum ac-Citi", "Platinum ac-JPMC"]:
-        return "Nadeem A"
-    elif group_sbu in ["HIL LIFE SCIENCES", "HIL HEALTHCARE", "HIL INSURANCE"]:
-        return "Anish R"
-    elif group_sbu in ["TIME ALPHABET", "TIME IME", "TIME TECHNOLOGY"]:
-        return "Vineeth V"
+    started = time.perf_counter()
+    # Console messages as before, plus one JSON line per event in the structured log
+    logging_config = config.get("logging", {}) or {}
+    log = RunLogger(setup_logging(logging_config.get("file", LOG_FILE), logging_config.get("level", "INFO")),
+                    run=output_file)
+
+    def fail(message, **fields):
+        log.error(message, **fields)
+        raise PipelineError(message)
+
+    # --- Step 1: Load Input Files ---
+    # Inputs may be xlsx, CSV (optionally gzipped), Parquet or Feather; the format is
+    # detected from the file contents and column names come back stripped. An input split
+    # across files (a glob) or sheets is read part by part in worker processes
+    input_config = config.get("inputs", {}) or {}
+
+    # Identical inputs, template, config and code on the same day reuse the archived outputs
+    archive_config = config.get("archive", {}) or {}
+    run_inputs = {"template": template_file, "config": config_file}
+    # An input may be a glob over several files; every matching file is part of the run key
+    for role, path in (("sfid", sfid_file), ("sfdc", sfdc_dump_file)):
+        files = input_files(path)
+        run_inputs.update({role: files[0]} if len(files) == 1 else
+                          {f"{role}_{number}": file for number, file in enumerate(files, start=1)})
+    for entry in config.get("templates") or []:
+        run_inputs[f"template_{entry['name']}"] = entry["template_file"]
+    # Plugins change the derived columns, so an edited plugin must not restore old outputs
+    for path in plugin_files((config.get("plugins", {}) or {}).get("dir", PLUGIN_DIR)):
+        run_inputs[f"plugin_{os.path.splitext(os.path.basename(path))[0]}"] = path
+    archive = None
+    if archive_config.get("enabled", False):
+        archive = RunArchive(archive_config.get("dir", ARCHIVE_DIR))
+        key, input_hashes = run_key(run_inputs, extra=dict(run_settings or {}, output_file=output_file))
+        previous = archive.find_run(key) if archive_config.get("reuse_outputs", True) else None
+        if previous:
+            for path in archive.restore_outputs(previous):
+                log.info(f"Restored unchanged output from run {previous['run_id']}: {path}",
+                         stage="archive", run_id=previous["run_id"], path=path)
+            return {"status": "restored", "rows": previous.get("rows"), "seconds": time.perf_counter() - started}
+
+    # Under a memory budget, estimate the peak from file sizes and row counts before loading
+    # and pick in-memory, chunked or spill-to-disk execution for the derive stage (the only
+    # stage governed; loading, matching and the writers always work on whole frames)
+    governor = None
+    budget = parse_size((config.get("memory", {}) or {}).get("budget"))
+    if budget:
+        estimate = estimate_peak([sfid_file, sfdc_dump_file], len(config.get("template_columns") or {}) or 70)
+        governor = MemoryGovernor(budget, estimate)
+        log.info(f"Memory governor: estimated peak {estimate['peak'] / UNITS['M']:.0f} MB for {estimate['rows']} rows "
+                 f"against a {budget / UNITS['M']:.0f} MB budget, using {governor.mode} mode.",
+                 stage="memory", estimate=estimate, budget=budget, mode=governor.mode)
+    def read(path, options):
+        if input_cache_dir:
+            return read_input_cached(path, input_cache_dir, **options)
+        return read_input_parts(path, **options)
+
+    # With consolidation on, files matched by the SFDC glob are overlapping dumps rather
+    # than parts of one export: only the latest record per Opportunity ID is kept
+    consolidation_config = config.get("consolidation", {}) or {}
+    try:
+        sfid_df = read(sfid_file, input_config.get("sfid", {}) or {})
+        dump_files = input_files(sfdc_dump_file)
+        if consolidation_config.get("enabled", False) and len(dump_files) > 1:
+            streaming = consolidation_config.get("streaming", "auto")
+            if streaming == "auto":
+                streaming = governor is not None and governor.mode == "spill"
+            sfdc_dump_df, consolidation_df = consolidate_dumps(
+                dump_files, lambda path: read(path, input_config.get("sfdc", {}) or {}),
+                consolidation_config.get("key", KEY_COLUMN), consolidation_config.get("modified_column"),
+                consolidation_config.get("order", "mtime"), bool(streaming))
+            for dump in consolidation_df.to_dict("records"):
+                log.info(f"Consolidation: dump {dump['Dump']} '{dump['File']}' contributed {dump['Kept']} of "
+                         f"{dump['Rows']} rows ({dump['Superseded']} superseded, {dump['Missing Key']} without a key)",
+                         stage="consolidation", dump=dump["Dump"], file=dump["File"], rows=dump["Rows"],
+                         kept=dump["Kept"], superseded=dump["Superseded"])
+            if consolidation_config.get("report_file"):
+                os.makedirs(os.path.dirname(consolidation_config["report_file"]) or ".", exist_ok=True)
+                consolidation_df.to_excel(consolidation_config["report_file"], index=False)
+        else:
+            sfdc_dump_df = read(sfdc_dump_file, input_config.get("sfdc", {}) or {})
+    except FileNotFoundError as e:
+        fail(f"Error: Could not find input files. Please ensure they are in the 'input' directory. Error: {e}",
+             stage="load")
+    except Exception as e:
+        # A corrupt or half-written input, or dumps that cannot be consolidated
+        fail(f"Error: Could not load the input files. Error: {e!r}", stage="load")
+    log.info(f"Inputs loaded: {len(sfid_df)} SFID rows, {len(sfdc_dump_df)} SFDC rows", stage="load",
+             sfid_rows=len(sfid_df), sfdc_rows=len(sfdc_dump_df), seconds=round(time.perf_counter() - started, 3))
+    if governor is not None:
+        governor.check("loading inputs")
+
+    # --- Step 1b: Validate Inputs ---
+    # Column-wise schema checks run before any join or xlsx writing begins
+    validation_config = config.get("validation", {}) or {}
+    issues_df, profile_df = validate_inputs(sfid_df, sfdc_dump_df, config)
+    if validation_config.get("quality_report_file"):
+        write_quality_report(issues_df, profile_df, validation_config["quality_report_file"])
+    errors_df = issues_df[issues_df["Severity"] == "error"]
+    for issue in issues_df.itertuples(index=False):
+        log.log(logging.ERROR if issue.Severity == "error" else logging.WARNING,
+                f"{issue.Severity.upper()}: [{issue.Input}] {issue.Column} - {issue.Check} ({issue.Count}) {issue.Detail}",
+                stage="validation", input=issue.Input, column=issue.Column, check=issue.Check,
+                severity=issue.Severity, count=issue.Count)
+    if len(errors_df) and validation_config.get("fail_on_error", True):
+        fail(f"Error: Input validation failed with {len(errors_df)} error(s). Please fix the input files and rerun.",
+             stage="validation", errors=len(errors_df))
+
+    # Coerce the validated date/numeric columns so CSV and xlsx inputs yield the same frame
+    normalize_types(sfid_df, (validation_config.get("sfid", {}) or {}).get("dtypes"))
+    normalize_types(sfdc_dump_df, (validation_config.get("sfdc", {}) or {}).get("dtypes"))
+
+    # --- Step 1c: Normalize Deal Values ---
+    # Every deal value becomes absolute USD: SFDC amounts are converted from their own currency
+    # at the rate effective on the Close Date (one merge against the cached FX table), and the
+    # tracker's $ Value (M) is scaled from millions, so Large Deal compares like with like
+    values_config = config.get("deal_values", {}) or {}
+    if values_config.get("enabled", True):
+        try:
+            rates = load_fx_rates(values_config.get("fx_file", FX_FILE), input_cache_dir)
+        except ValueError as e:
+            fail(f"Error: {e}", stage="deal_values")
+        if rates is None:
+            log.warning(f"Warning: FX table '{values_config.get('fx_file', FX_FILE)}' not found; only USD amounts "
+                        f"are converted.", stage="deal_values")
+        unconverted = normalize_deal_values(sfid_df, sfdc_dump_df, rates, values_config.get("date_column", "Close Date"))
+        if unconverted:
+            log.warning(f"Warning: {unconverted} SFDC amount(s) left without a USD value, no FX rate for their currency.",
+                        stage="deal_values", count=unconverted)
+
+    # --- Step 1d: Match Records ---
+    # Tie SFID rows to SFDC rows by SFID/Opportunity ID, falling back to fuzzy
+    # Account Name + Opportunity Name matching, then align both frames by position
+    matching_config = config.get("matching", {}) or {}
+    if matching_config.get("enabled", False):
+        matches_df = match_records(sfid_df, sfdc_dump_df, matching_config)
+        summary = summarize_matches(matches_df)
+        log.info(f"Record matching: {summary}", stage="matching", matches=summary)
+        if matching_config.get("report_file"):
+            os.makedirs(os.path.dirname(matching_config["report_file"]) or ".", exist_ok=True)
+            matches_df.to_excel(matching_config["report_file"], index=False)
+        sfid_df, sfdc_dump_df = align_frames(sfid_df, sfdc_dump_df, matches_df)
+        if governor is not None:
+            governor.check("matching")
+
+    # Team derivation plugins register their columns before the header is checked against them
+    try:
+        plugin_columns = load_plugins((config.get("plugins", {}) or {}).get("dir", PLUGIN_DIR))
+    except ValueError as e:
+        fail(f"Error: {e}", stage="plugins")
+    if plugin_columns:
+        log.info(f"Plugins loaded: {', '.join(plugin_columns)}", stage="plugins", columns=plugin_columns)
+
+    # --- Step 2: Read Template Header ---
+    # The header decides which derived columns are needed at all
+    try:
+        template_wb = openpyxl.load_workbook(template_file)
+        template_ws = template_wb[TEMPLATE_SHEET_NAME]
+    except FileNotFoundError:
+        fail(f"Error: Could not find template file '{template_file}'. Please ensure it exists in the 'input' directory.",
+             stage="template")
+    header_row = [cell.value for cell in template_ws[1]]
+    # Formula columns are defined by the formulas in the template's first data row
+    formula_config = config.get("formulas", {}) or {}
+    formulas = template_formulas(template_ws, header_row) if formula_config.get("enabled", False) else {}
+
+    # Extra report layouts registered under `templates` render from the same derive pass,
+    # so the derive covers the union of every layout's columns
+    layouts = load_layouts(config.get("templates"))
+    for layout in layouts:
+        for col in layout.unknown_columns():
+            log.warning(f"Warning: Template '{layout.name}' column '{col}' is not a derived column and will be left empty.",
+                        stage="template", layout=layout.name, column=col)
+    columns = derive_columns(header_row, layouts)
+
+    # --- Step 3: Derive Template Columns ---
+    # The vectorized engine computes only the header's columns and their dependencies;
+    # the legacy engine is the original row-by-row loop
+    derive_config = config.get("derive", {}) or {}
+    timings = {}
+    if derive_config.get("engine", "vectorized") == "legacy":
+        df = pd.DataFrame(build_template_data(sfid_df, sfdc_dump_df))
+        df = df.reindex(columns=columns)  # Reorder columns to match template
+    elif governor is not None and governor.mode != "memory":
+        # Row chunks sized to the remaining budget; in spill mode the chunks wait on
+        # disk and are only read back once the input frames have been released
+        parts = derive_in_chunks(sfid_df, sfdc_dump_df, columns, governor, timings=timings)
+        del sfid_df, sfdc_dump_df
+        gc.collect()
+        df = governor.collect(parts)
+    elif derive_config.get("workers", 1) != 1:
+        # Partitioned across worker processes; workers: 0 means one per CPU
+        df = derive_parallel(sfid_df, sfdc_dump_df, columns, derive_config["workers"] or None, timings=timings)
     else:
-        return "-"
-
-# --- Step 1: Load Input Files ---
-try:
-    sfid_df = pd.read_excel(SFID_FILE)
-    sfdc_dump_df = pd.read_excel(SFDC_DUMP_FILE)
-except FileNotFoundError as e:
-    print(f"Error: Could not find input files. Please ensure they are in the 'input' directory. Error: {e}")
-    exit()
-
-# Normalize Columns - added error handling for inconsistent column names
-try:
-    sfid_df.columns = [str(col).strip() for col in sfid_df.columns]
-    sfdc_dump_df.columns = [str(col).strip() for col in sfdc_dump_df.columns]
-except KeyError as e:
-    print(f"Error: Inconsistent column names in input files. Please check your Excel files. Error: {e}")
-    exit()
-
-
-# --- Step 2: Combine Data ---
-# No merging, instead iterate over the two dataframes based on index
-template_data = []
-template_dict = {
-    "Account Name": "",
-    "SFID": "",
-    "Opportunity ID": "",
-    "Created Date": None,
-    "Opportunity Name": "",
-    "Opportunity Description": "",
-    "Group SBU": None,
-    "Created By": None,
-    "Stage": None,
-    "Est Deal Value in USD": None,
-    "Opp Type": None,
-    "Vertical Practice": None,
-    "Tech. Practice": None,
-    "Service Offering": None,
-    "Engagement Type": None,
-    "Probability": None,
-    "Close Date": None,
-    "Next Steps": None,
-    "Loss Stage": None,
-    "Lost Reason": None,
-    "Age": None,
-    "BOLT": None,
-    "Doc. Recvd. Date": None,
-    "Category": None,
-    "Partner Details": None,
-    "Proposed Sub. Date": None,
-    "Domain Practice": None,
-    "Tech Practice": None,
-    "Solution SPOCs": None,
-    "Delivery SPOC": None,
-    "Proposal Owner": None,
-    "Allocation% Proposal Owner 1": None,
-    "Proposal Owner 2": None,
-    "Allocation% Proposal Owner 2": None,
-    "Proposal Writer": None,
-    "Allocation% Proposal Writer 1": None,
-    "Proposal Writer 2": None,
-    "Allocation% Proposal Writer 2": None,
-    "Orals SPOC": None,
-    "Bid Director": None,
-    "Proposal Updates": None,
-    "Proposal Status": None,
-    "Actual Sub. Date": None,
-    "Commercial Value": None,
-    "DSC": None,
-    "Opportunity Stage": None,
-    "Post Sub. Activity": None,
-    "PSA Activity Status": None,
-    "PSA Activity Cls. Date": None,
-    "PSA Activity Update": None,
-    "Est. Deal Value": None,
-    "Large Deal": None,
-    "SBU Mapping": None,
-    "Created in Week": None,
-    "Submitted in Week": None,
-    "Closing in Week": None,
-    "PSA Comp. in Week": None,
-    "Sub. Dt. Mapping": None,
-    "Cl. Dt. Mapping": None,
-    "PSA Comp. Dt. Mapping": None,
-    "Opp. Status": None,
-    "Sb. FY": None,
-    "Sb. Qtr.": None,
-    "Cl. FY": None,
-    "Cl. QTR": None,
-    "TCV Brk. Up": None,
-    "BFS/ETS": None,
-    "Direct/ Related": None,
-    "OB Related Status": None,
-    "TCV Related Status": None,
-}
-
-
-for i in range(max(len(sfid_df), len(sfdc_dump_df))):
-    template_row = template_dict.copy()
-    # Get data from both dataframes based on index
-    sfid_row = sfid_df.iloc[i] if i < len(sfid_df) else pd.Series()
-    sfdc_row = sfdc_dump_df.iloc[i] if i < len(sfdc_dump_df) else pd.Series()
-
-    for col, default in template_dict.items():
-         if col == "Account Name":
-            if "Account Name" in sfid_row and pd.notna(sfid_row.get("Account Name")):
-                 value = sfid_row["Account Name"]
-            elif "Account Name" in sfdc_row and pd.notna(sfdc_row.get("Account Name")):
-                 value = sfdc_row["Account Name"]
-            else:
-                value = default
-         elif col == "SFID":
-              if "SFID" in sfid_row and pd.notna(sfid_row.get("SFID")):
-                  value = sfid_row["SFID"]
-              elif "Opportunity ID" in sfdc_row and pd.notna(sfdc_row.get("Opportunity ID")):
-                 value = sfdc_row["Opportunity ID"]
-              else:
-                   value = default
-         elif col == "Created Date":
-             if "Created Date" in sfid_row and pd.notna(sfid_row.get("Created Date")):
-                  value = sfid_row["Created Date"]
-             elif "Created Date" in sfdc_row and pd.notna(sfdc_row.get("Created Date")):
-                   value = sfdc_row["Created Date"]
-             else:
-                  value = default
-
-         elif col == "Opportunity Name" and "Opportunity Name" in sfid_row:
-             value = sfid_row.get("Opportunity Name")
-
-         elif col == "Opportunity Description":
-              if "Opportunity Description" in sfid_row and pd.notna(sfid_row.get("Opportunity Description")):
-                   value = sfid_row["Opportunity Description"]
-              elif "Description" in sfdc_row and pd.notna(sfdc_row.get("Description")):
-                   value = sfdc_row["Description"]
-              else:
-                    value = default
-
-         elif col == "Group SBU":
-            if "Group SBU" in sfdc_row and pd.notna(sfdc_row.get("Group SBU")):
-                value = sfdc_row["Group SBU"]
-            else:
-                 value = default
-         elif col == "Created By":
-            if "Opportunity Owner" in sfdc_row and pd.notna(sfdc_row.get("Opportunity Owner")):
-                 value = sfdc_row["Opportunity Owner"]
-            else:
-                 value = default
-         elif col == "Stage":
-              if "Deal Stage" in sfid_row and pd.notna(sfid_row.get("Deal Stage")):
-                   value = sfid_row["Deal Stage"]
-              elif "Stage" in sfdc_row and pd.notna(sfdc_row.get("Stage")):
-                   value = sfdc_row["Stage"]
-              else:
-                    value = default
-
-         elif col == "Est Deal Value in USD":
-           if "Amount (converted)" in sfdc_row and pd.notna(sfdc_row.get("Amount (converted)")):
-                 value = sfdc_row["Amount (converted)"]
-           elif "$ Value (M)" in sfid_row and pd.notna(sfid_row.get("$ Value (M)")):
-                 value = sfid_row["$ Value (M)"]
-           else:
-                 value = default
-
-         elif col == "Opp Type":
-               if "Type" in sfdc_row and pd.notna(sfdc_row.get("Type")):
-                   value = sfdc_row["Type"]
-               else:
-                    value = default
-         elif col == "Vertical Practice":
-              if "Vertical Practice" in sfdc_row and pd.notna(sfdc_row.get("Vertical Practice")):
-                   value = sfdc_row["Vertical Practice"]
-              else:
-                    value = default
-         elif col == "Tech. Practice":
-              if "Partner Details" in sfid_row and pd.notna(sfid_row.get("Partner Details")):
-                 value = sfid_row["Partner Details"]
-              else:
-                 value = default
-         elif col == "Service Offering":
-              if "Service Offering" in sfdc_row and pd.notna(sfdc_row.get("Service Offering")):
-                   value = sfdc_row["Service Offering"]
-              else:
-                   value = default
-         elif col == "Engagement Type":
-              if "Project Type" in sfdc_row and pd.notna(sfdc_row.get("Project Type")):
-                   value = sfdc_row["Project Type"]
-              else:
-                    value = default
-
-         elif col == "Probability":
-             if "Probability (%)" in sfdc_row and pd.notna(sfdc_row.get("Probability (%)")):
-                   value = sfdc_row["Probability (%)"]
-             else:
-                    value = default
-
-         elif col == "Close Date":
-            if "Close Date" in sfid_row and pd.notna(sfid_row.get("Close Date")):
-               value = sfid_row["Close Date"]
-            elif "Close Date" in sfdc_row and pd.notna(sfdc_row.get("Close Date")):
-                 value = sfdc_row["Close Date"]
-            else:
-                value = default
-
-         elif col == "Next Steps":
-             if "Next Step" in sfdc_row and pd.notna(sfdc_row.get("Next Step")):
-                 value = sfdc_row["Next Step"]
-             else:
-                   value = default
-         elif col == "Loss Stage":
-            if "Loss Stage" in sfdc_row and pd.notna(sfdc_row.get("Loss Stage")) :
-               value = sfdc_row["Loss Stage"]
-            else:
-                  value = default
-         elif col == "Lost Reason":
-               if "Lost Reason" in sfdc_row and pd.notna(sfdc_row.get("Lost Reason")):
-                     value = sfdc_row["Lost Reason"]
-               else:
-                     value = default
-         elif col == "Age":
-            if "Age" in sfdc_row and pd.notna(sfdc_row.get("Age")):
-               value = sfdc_row["Age"]
-            else:
-                 value = default
-         elif col == "BOLT":
-              if "BOLT Details" in sfdc_row and pd.notna(sfdc_row.get("BOLT Details")):
-                    value = sfdc_row["BOLT Details"]
-              else:
-                    value = default
-         elif col == "Category":
-              if "Activity Type" in sfid_row and pd.notna(sfid_row.get("Activity Type")):
-                    value = sfid_row["Activity Type"]
-              else:
-                  value = default
-         elif col == "Partner Details":
-                if "Partner Details" in sfid_row and pd.notna(sfid_row.get("Partner Details")):
-                     value = sfid_row["Partner Details"]
-                else:
-                     value = default
-         elif col == "Proposed Sub. Date":
-              if "Due Date" in sfid_row and pd.notna(sfid_row.get("Due Date")):
-                     value = sfid_row["Due Date"]
-              else:
-                  value = default
-         elif col == "Solution SPOCs":
-             if "Solution SPOCs" in sfid_row and pd.notna(sfid_row.get("Solution SPOCs")):
-                   value = sfid_row["Solution SPOCs"]
-             else:
-                  value = default
-
-         elif col == "Delivery SPOC":
-              if "Delivery Lead" in sfid_row and pd.notna(sfid_row.get("Delivery Lead")):
-                    value = sfid_row["Delivery Lead"]
-              else:
-                    value = default
-
-         elif col == "Proposal Owner":
-             if "Bid Manager" in sfid_row and pd.notna(sfid_row.get("Bid Manager")):
-                   value = sfid_row["Bid Manager"]
-             else:
-                   value = default
-         elif col == "Proposal Writer":
-                if "Proposal Writer" in sfid_row and pd.notna(sfid_row.get("Proposal Writer")):
-                      value = sfid_row["Proposal Writer"]
-                else:
-                     value = default
-
-         elif col == "Orals SPOC":
-              if "Orals SPOC" in sfid_row and pd.notna(sfid_row.get("Orals SPOC")):
-                    value = sfid_row["Orals SPOC"]
-              else:
-                    value = default
-
-         elif col == "Bid Director":
-            value = calculate_bid_director(template_row.get("Group SBU"))
-         elif col == "Proposal Updates":
-                if "Status/ Next Steps" in sfid_row and pd.notna(sfid_row.get("Status/ Next Steps")):
-                     value = sfid_row["Status/ Next Steps"]
-                else:
-                    value = default
-         elif col == "Proposal Status":
-            if "Deal Status" in sfid_row and pd.notna(sfid_row.get("Deal Status")):
-                  value = sfid_row["Deal Status"]
-            else:
-                value = default
-
-         elif col == "Actual Sub. Date":
-                if "Due Date" in sfid_row and pd.notna(sfid_row.get("Due Date")):
-                     value = sfid_row["Due Date"]
-                else:
-                     value = default
-         elif col == "Commercial Value":
-           if "Amount (converted)" in sfdc_row and pd.notna(sfdc_row.get("Amount (converted)")):
-                 value = sfdc_row["Amount (converted)"]
-           elif "$ Value (M)" in sfid_row and pd.notna(sfid_row.get("$ Value (M)")):
-                 value = sfid_row["$ Value (M)"]
-           else:
-                 value = default
-         elif col == "DSC":
-              if "DSC Status" in sfid_row and pd.notna(sfid_row.get("DSC Status")):
-                    value = sfid_row["DSC Status"]
-              else:
-                    value = default
-         elif col == "Opportunity Stage":
-             if "Stage" in sfdc_row and pd.notna(sfdc_row.get("Stage")):
-                   value = sfdc_row["Stage"]
-             else:
-                   value = default
-         elif col == "Est. Deal Value":
-            if "Amount (converted)" in sfdc_row and pd.notna(sfdc_row.get("Amount (converted)")):
-                 value = sfdc_row["Amount (converted)"]
+        df = derive_template(sfid_df, sfdc_dump_df, columns, timings=timings)
+    if governor is not None:
+        governor.check("derive")
+    derived = df
+
+    # One timing entry per plugin column, so a slow plugin shows up in every run's log
+    for column in [col for col in timings if col in PLUGINS]:
+        log.info(f"Plugin column '{column}' ({os.path.basename(PLUGINS[column])}): {timings[column]:.3f}s",
+                 stage="plugins", column=column, plugin=PLUGINS[column], seconds=round(timings[column], 4))
+
+    # Row-level problems are counted per rule as vectorized masks and logged once for the stage
+    row_issues = check_rows(derived, sample_size=logging_config.get("sample_size", 5))
+    for issue in row_issues.itertuples(index=False):
+        log.warning(f"Warning: {issue.Count} row(s) with {issue.Rule}, e.g. {', '.join(map(str, issue.Sample))}",
+                    stage="derive", rule=issue.Rule, count=issue.Count, sample=issue.Sample)
+    log.info(f"Derived {len(derived)} rows x {len(columns)} columns", stage="derive", rows=len(derived),
+             columns=len(columns), row_issues=int(row_issues["Count"].sum()),
+             timings={col: round(seconds, 4) for col, seconds in timings.items()})
+
+    # --- Step 3a: Evaluate Template Formulas ---
+    # The template's formula columns are computed here as whole-column pandas operations, so the
+    # output opens without an Excel recalculation; formulas outside the supported subset stay formulas
+    xlsx_formulas = {}
+    if formulas:
+        formulas_started = time.perf_counter()
+        mode = formula_config.get("mode", "values")
+        if mode not in FORMULA_MODES:
+            fail(f"Error: Unknown formulas mode '{mode}'; expected one of {', '.join(FORMULA_MODES)}",
+                 stage="formulas")
+        compiled, formula_errors = compile_formulas(formulas, header_row, template_wb, TEMPLATE_SHEET_NAME)
+        formula_errors.update(evaluate_formulas(derived, compiled))
+        for column, error in formula_errors.items():
+            log.warning(f"Warning: Template formula for '{column}' is left to Excel ({error}): {formulas[column]}",
+                        stage="formulas", column=column, formula=formulas[column])
+        log.info(f"Formulas: {len(formulas) - len(formula_errors)} of {len(formulas)} template formula column(s) "
+                 f"evaluated in {time.perf_counter() - formulas_started:.2f}s", stage="formulas",
+                 evaluated=[column for column in formulas if column not in formula_errors])
+        kept = formulas if mode == "formulas" else {column: formulas[column] for column in formula_errors}
+        xlsx_formulas = {column: formula_pieces(formula) for column, formula in kept.items()}
+    if layouts:
+        df = derived.reindex(columns=header_row)
+
+    # --- Step 3b: Proposal-Team Workload ---
+    # Owner/writer allocation pairs and SPOC columns reshaped to one row per person and
+    # opportunity, then summed per person and week of Proposed Sub. Date
+    workload_config = config.get("workload", {}) or {}
+    workload_df = None
+    if workload_config.get("enabled", False):
+        workload_df = workload_rollup(derived, workload_config.get("capacity", 3.0),
+                                      statuses=workload_config.get("statuses", ["OPEN"]),
+                                      default_allocation=workload_config.get("default_allocation", 1.0))
+        overloaded = int((workload_df["Overloaded"] == "Yes").sum())
+        log.info(f"Workload: {workload_df['Person'].nunique()} people over {workload_df['Week'].nunique()} weeks, "
+                 f"{overloaded} overloaded person-week(s)", stage="workload", people=workload_df["Person"].nunique(),
+                 overloaded=overloaded)
+
+    # --- Step 3c: Bookings Forecast ---
+    # Win/loss of every open deal simulated across thousands of seeded scenarios as chunked
+    # NumPy matrix operations; P10/P50/P90 bookings per quarter, SBU and Bid Director
+    forecast_config = config.get("forecast", {}) or {}
+    forecast_df = None
+    if forecast_config.get("enabled", False):
+        forecast_started = time.perf_counter()
+        scenarios = forecast_config.get("scenarios", 10_000)
+        forecast_df = forecast_bookings(derived, scenarios, forecast_config.get("seed"),
+                                        statuses=forecast_config.get("statuses", ["OPEN"]),
+                                        value_column=forecast_config.get("value_column", "Est Deal Value in USD"),
+                                        max_workers=forecast_config.get("max_workers"))
+        quarters = forecast_df[forecast_df["Level"] == forecast_df["Level"].iloc[0]] if len(forecast_df) else forecast_df
+        log.info(f"Forecast: {int(quarters['Deals'].sum())} open deal(s) over {len(quarters)} quarter(s), "
+                 f"{scenarios} scenarios in {time.perf_counter() - forecast_started:.2f}s", stage="forecast",
+                 deals=int(quarters["Deals"].sum()), scenarios=scenarios, seed=forecast_config.get("seed"))
+
+    # --- Step 4: Write Outputs ---
+    try:
+        # Create output directory if it doesn't exist
+        os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+
+        # Write the xlsx template and any configured CSV/Parquet/PDF copies concurrently
+        export_config = config.get("exports", {}) or {}
+
+        # Highlight rules are evaluated as one mask per rule; the xlsx writer turns each rule's
+        # rows into a single conditional format (or one shared cell style)
+        highlight_config = config.get("highlights", {}) or {}
+        highlights = None
+        if highlight_config.get("enabled", False) and highlight_config.get("rules"):
+            mode = highlight_config.get("mode", "conditional")
+            if mode not in HIGHLIGHT_MODES:
+                fail(f"Error: Unknown highlights mode '{mode}'; expected one of {', '.join(HIGHLIGHT_MODES)}",
+                     stage="export")
+            rules = highlight_rules(highlight_config["rules"], df.columns)
+            codes = highlight_codes(df, rules)
+            highlights = (codes, rules, mode)
+            counts = {rule["name"]: int((codes == number).sum()) for number, rule in enumerate(rules, start=1)}
+            log.info("Highlights: " + ", ".join(f"{name} {count}" for name, count in counts.items()),
+                     stage="export", highlights=counts)
+
+        writers = build_writers(export_config, output_file, template_wb, TEMPLATE_SHEET_NAME, highlights,
+                                xlsx_formulas)
+        writers.update({layout.output_file: layout.writer(derived) for layout in layouts})
+        if workload_df is not None:
+            writers.update(table_writers(workload_df, "Workload", workload_config.get("report_file"),
+                                         workload_config.get("parquet_file")))
+        if forecast_df is not None:
+            writers.update(table_writers(forecast_df, "Forecast", forecast_config.get("report_file"),
+                                         forecast_config.get("parquet_file")))
+
+        # Past Excel's row limit the xlsx spills into extra sheets or is split into several workbooks
+        overflow = export_config.get("xlsx_overflow", "sheets")
+        row_limit = export_config.get("xlsx_row_limit", EXCEL_MAX_ROWS)
+        xlsx_files = xlsx_output_files(output_file, len(df), overflow, row_limit)
+        if len(df) > row_limit - 1:
+            count = len(xlsx_parts(len(df), row_limit))
+            log.info(f"{len(df)} rows exceed the xlsx row limit; writing {count} "
+                     f"{'workbooks' if overflow == 'workbooks' else 'sheets'}", stage="export", overflow=overflow,
+                     parts=count)
+        failed = []
+        for path, seconds, error in export_frame(df, writers, export_config.get("max_workers")):
+            if error is not None:
+                log.error(f"Error: Could not write '{path}'. Error: {error}", stage="export", path=path)
+                failed.append(path)
             else:
-                 value = None
-
-         elif col == "SBU Mapping":
-              if "Group SBU" in sfdc_row and pd.notna(sfdc_row.get("Group SBU")):
-                  value = sfdc_row["Group SBU"]
-              else:
-                    value = default
-         else:
-                value = default #Use default value if it is not in either of the dataframes
-         template_row[col] = value
-
-     #Specific calculations and logic
-    template_row["Doc. Recvd. Date"] = get_last_monday(datetime.today())
-
-    #Convert to float if present
-    if template_row.get("Est Deal Value") is not None:
-       try:
-           template_row["Est Deal Value"] = float(template_row["Est Deal Value"])
-       except (ValueError, TypeError):
-          template_row["Est Deal Value"] = None
-
-
-    template_row["Est Deal Value in USD"] = template_row.get("Est Deal Value")
-    template_row["Commercial Value"] = template_row.get("Est Deal Value")
-    template_row["Large Deal"] = calculate_large_deal_from_value(template_row.get("Est Deal Value"))
-    template_row["Created in Week"] = calculate_week_from_date(template_row.get("Created Date"))
-    template_row["Submitted in Week"] = calculate_week_from_date(template_row.get("Proposed Sub. Date"))
-    template_row["Closing in Week"] = calculate_week_from_date(template_row.get("Close Date"))
-    template_row["Opp. Status"] = calculate_opportunity_status_from_template(template_row.get("Proposal Status"), template_row.get("Stage"), template_row.get("Created Date"))
-    template_row["Sb. FY"] = calculate_fiscal_year_short(template_row.get("Proposed Sub. Date"))
-    template_row["Sb. Qtr."] = calculate_quarter(template_row.get("Proposed Sub. Date"))
-    template_row["Cl. FY"] = calculate_fiscal_year_short(template_row.get("Close Date"))
-    template_row["Cl. QTR"] = calculate_quarter(template_row.get("Close Date"))
-    template_data.append(template_row)
-
-# --- Step 4: Load and Update Template ---
-try:
-    # Create output directory if it doesn't exist
-    os.makedirs("output", exist_ok=True)
-    template_wb = openpyxl.load_workbook(TEMPLATE_FILE)
-    template_ws = template_wb[TEMPLATE_SHEET_NAME]
-
-    # Get header row to ensure column alignment
-    header_row = [cell.value for cell in template_ws[1]]
-    
-    # Clear existing data (excluding header)
-    if template_ws.max_row > 1:
-        template_ws.delete_rows(2, template_ws.max_row - 1)
-
-    # Convert template_data to DataFrame with correct column order
-    df = pd.DataFrame(template_data)
-    df = df.reindex(columns=header_row)  # Reorder columns to match template
-
-    # Append data rows
-    for row in dataframe_to_rows(df, index=False, header=False):
-        template_ws.append(row)
-
-    # Apply date formatting for specific columns
-    for row in template_ws.iter_rows(min_row=2, max_row=template_ws.max_row):
-        for cell in row:
-            if isinstance(cell.value, pd.Timestamp):  # Check if cell contains a date
-                cell.value = cell.value.strftime("%d/%m/%Y")  # Convert to dd/mm/yyyy format
-                
-    template_wb.save(OUTPUT_FILE)
-    print(f"Template updated successfully: {OUTPUT_FILE}")
-    
-except FileNotFoundError:
-    print(f"Error: Could not find template file '{TEMPLATE_FILE}'. Please ensure it exists in the 'input' directory.")
-except Exception as e:
-    print(f"An error occurred: {e}")
-    exit()  
\ No newline at end of file
+                log.info(f"Template updated successfully: {path} ({seconds:.2f}s)", stage="export", path=path,
+                         seconds=round(seconds, 3))
+        if failed:
+            raise PipelineError(f"Error: Could not write {', '.join(failed)}")
+
+    except PipelineError:
+        raise
+    except Exception as e:
+        fail(f"An error occurred: {e}", stage="export")
+
+    # --- Step 5: Archive Run ---
+    if archive is not None:
+        run_outputs = {os.path.basename(path): path for path in list(writers) + xlsx_files}
+        for report_config in (validation_config, matching_config):
+            for setting in ("quality_report_file", "report_file"):
+                if report_config.get(setting):
+                    run_outputs[os.path.basename(report_config[setting])] = report_config[setting]
+        manifest = archive.archive_run(run_inputs, run_outputs, key, input_hashes, extra={"rows": len(df)})
+        log.info(f"Run archived: {manifest['run_id']}", stage="archive", run_id=manifest["run_id"])
+
+    if governor is not None:
+        log.info(governor.report(), stage="memory", samples=governor.samples)
+    seconds = time.perf_counter() - started
+    log.info(f"Run finished: {len(df)} rows in {seconds:.2f}s", stage="done", rows=len(df), seconds=round(seconds, 3))
+    return {"status": "ok", "rows": len(df), "seconds": seconds}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Update the weekly template from the SFID tracker and SFDC dump.")
+    parser.add_argument("--memory-budget", help="Memory the run may use, e.g. 4G or 3500M (overrides memory.budget)")
+    args = parser.parse_args(argv)
+    config = load_config(CONFIG_FILE)
+    if args.memory_budget:
+        config = merge_config(config, {"memory": {"budget": args.memory_budget}})
+    try:
+        run_pipeline(SFID_FILE, SFDC_DUMP_FILE, TEMPLATE_FILE, OUTPUT_FILE, config)
+    except PipelineError:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
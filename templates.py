@@ -0,0 +1,80 @@
+import os
+import openpyxl
+from derivations import DERIVATIONS
+from exports import write_xlsx
+from runlog import get_logger
+
+DEFAULT_SHEET_NAME = "SFDC"
+
+
+class TemplateLayout:
+    """One report layout: a template workbook, its sheet, and the derived column behind each header cell.
+
+    Attributes:
+        name (str): Registry name of the layout.
+        template_file (str): Path of the template workbook.
+        sheet_name (str): Sheet holding the header row and receiving the data.
+        output_file (str): Path the filled-in workbook is saved to.
+        header (list): Header labels, in sheet order.
+        columns (list): The derived column feeding each header label, in the same order.
+        workbook (openpyxl.Workbook): The loaded template workbook.
+    """
+
+    def __init__(self, name, template_file, output_file, sheet_name=DEFAULT_SHEET_NAME, aliases=None):
+        self.name = name
+        self.template_file = template_file
+        self.output_file = output_file
+        self.sheet_name = sheet_name
+        self.workbook = openpyxl.load_workbook(template_file)
+        self.header = [cell.value for cell in self.workbook[sheet_name][1]]
+        # Header labels are derived column names unless the layout renames them
+        self.columns = [(aliases or {}).get(label, label) for label in self.header]
+
+    def unknown_columns(self, known=None):
+        """Header columns that no derivation produces; they are written empty."""
+        known = set(DERIVATIONS) if known is None else set(known)
+        return [col for col in self.columns if col is not None and col not in known]
+
+    def frame(self, derived):
+        """Selects and orders this layout's columns from the shared derived frame."""
+        df = derived.reindex(columns=self.columns)
+        df.columns = self.header
+        return df
+
+    def writer(self, derived):
+        """An export_frame writer entry that renders this layout from the shared derived frame.
+
+        The writer ignores the frame export_frame passes in (the main template's
+        columns) and writes its own selection of the full derived frame instead.
+        """
+        frame = self.frame(derived)
+        return lambda _: write_xlsx(frame, self.output_file, self.workbook, self.sheet_name), False
+
+
+def load_layouts(templates_config):
+    """Loads the extra report layouts registered in the `templates` config section.
+
+    Each entry has a name, template_file and output_file, and optionally a
+    sheet_name (default "SFDC") and a `columns` map from header label to
+    derived column for templates that label a column differently.
+
+    Returns:
+        list: TemplateLayout objects; entries whose template file is missing are skipped with a warning.
+    """
+    layouts = []
+    for entry in templates_config or []:
+        if not os.path.exists(entry["template_file"]):
+            get_logger().warning(f"Warning: Template '{entry['name']}' skipped, could not find '{entry['template_file']}'.",
+                                 extra={"stage": "template", "layout": entry["name"]})
+            continue
+        layouts.append(TemplateLayout(entry["name"], entry["template_file"], entry["output_file"],
+                                      entry.get("sheet_name", DEFAULT_SHEET_NAME), entry.get("columns")))
+    return layouts
+
+
+def derive_columns(header_row, layouts):
+    """The union of the main header and every layout's columns, main header first, so one derive pass serves all."""
+    columns = list(header_row)
+    for layout in layouts:
+        columns.extend(col for col in layout.columns if col is not None and col not in columns)
+    return columns
@@ -0,0 +1,48 @@
+import os
+from archive import RunArchive, run_key
+
+
+def _write(path, text):
+    path.write_text(text)
+    return str(path)
+
+
+def test_identical_files_are_stored_once(tmp_path):
+    archive = RunArchive(str(tmp_path / "store"))
+    first = archive.store_file(_write(tmp_path / "a.csv", "same"))
+    second = archive.store_file(_write(tmp_path / "b.csv", "same"))
+    assert first["hash"] == second["hash"]
+    objects = [name for _, _, names in os.walk(tmp_path / "store" / "objects") for name in names]
+    assert objects == [first["hash"]]
+
+
+def test_store_leaves_another_jobs_temp_file_alone(tmp_path):
+    archive = RunArchive(str(tmp_path / "store"))
+    source = _write(tmp_path / "dump.csv", "rows")
+    digest = run_key({"dump": source})[1]["dump"]
+    target = archive._object_path(digest, False)
+    os.makedirs(os.path.dirname(target))
+    # A parallel batch job halfway through copying the same dump
+    with open(target + ".tmp", "w") as f:
+        f.write("ro")
+
+    entry = archive.store_file(source)
+    assert open(target).read() == "rows"
+    assert open(target + ".tmp").read() == "ro"
+    assert archive.store_file(source) == entry
+
+
+def test_unchanged_run_key_finds_and_restores_outputs(tmp_path):
+    archive = RunArchive(str(tmp_path / "store"))
+    inputs = {"sfid": _write(tmp_path / "sfid.csv", "1"), "config": _write(tmp_path / "config.yaml", "a: 1")}
+    output = _write(tmp_path / "out.csv", "result")
+    key, hashes = run_key(inputs)
+    manifest = archive.archive_run(inputs, {"output": output}, key, hashes)
+    os.remove(output)
+
+    assert archive.find_run(run_key(inputs)[0])["run_id"] == manifest["run_id"]
+    assert archive.restore_outputs(manifest) == [output]
+    assert open(output).read() == "result"
+
+    _write(tmp_path / "sfid.csv", "2")
+    assert archive.find_run(run_key(inputs)[0]) is None
@@ -0,0 +1,16 @@
+import os
+import pandas as pd
+from consolidate import consolidate_dumps
+
+
+def test_streaming_unifies_a_column_empty_in_one_dump(tmp_path):
+    frames = {
+        str(tmp_path / "old.csv"): pd.DataFrame({"Opportunity ID": ["1", "2"], "Loss Stage": [float("nan")] * 2}),
+        str(tmp_path / "new.csv"): pd.DataFrame({"Opportunity ID": ["2", "3"], "Loss Stage": ["Lost", "Won"]}),
+    }
+    for number, (path, df) in enumerate(frames.items(), start=1):
+        df.to_csv(path, index=False)
+        os.utime(path, (number, number))
+    merged, _ = consolidate_dumps(list(frames), frames.get, "Opportunity ID", None, "mtime", True)
+    stages = dict(zip(merged["Opportunity ID"], merged["Loss Stage"]))
+    assert pd.isna(stages["1"]) and stages["2"] == "Lost" and stages["3"] == "Won"
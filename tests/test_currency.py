@@ -0,0 +1,44 @@
+import pandas as pd
+import pytest
+from currency import load_fx_rates, normalize_deal_values, to_base_currency, NORMALIZED_COLUMN
+
+
+@pytest.fixture
+def rates(tmp_path):
+    path = tmp_path / "fx_rates.csv"
+    path.write_text("Currency,Effective Date,USD Rate\n"
+                    "EUR,2024-01-01,1.10\n"
+                    "eur ,2024-07-01,1.20\n"
+                    "GBP,2024-01-01,1.25\n")
+    return load_fx_rates(str(path))
+
+
+def test_rate_effective_on_the_date(rates):
+    dates = pd.Series(pd.to_datetime(["2024-03-15", "2024-07-01", "2024-09-30", "2023-06-01", None]))
+    usd = to_base_currency(pd.Series([100.0] * 5), pd.Series(["EUR"] * 5), dates, rates)
+    # Before the first rate the earliest applies; undated amounts take the latest
+    assert usd.round(6).tolist() == [110.0, 120.0, 120.0, 110.0, 120.0]
+
+
+def test_currency_without_a_rate_stays_missing(rates):
+    usd = to_base_currency(pd.Series([100.0, 100.0, 100.0]), pd.Series(["JPY", None, "usd"]),
+                           pd.Series(pd.to_datetime(["2024-03-01"] * 3)), rates)
+    assert pd.isna(usd[0])
+    assert usd[1:].tolist() == [100.0, 100.0]
+
+
+def test_sfdc_amount_falls_back_to_amount(rates):
+    sfdc = pd.DataFrame({
+        "Amount (converted)": [200.0, None, None],
+        "Amount (converted) Currency": ["USD", None, None],
+        "Amount": [999.0, 50.0, 10.0],
+        "Amount Currency": ["USD", "GBP", "JPY"],
+        "Close Date": pd.to_datetime(["2024-03-01"] * 3),
+    })
+    sfid = pd.DataFrame({"$ Value (M)": [1.5, None, "n/a"]})
+    unconverted = normalize_deal_values(sfid, sfdc, rates)
+    assert sfdc[NORMALIZED_COLUMN].tolist()[:2] == [200.0, 62.5]
+    assert pd.isna(sfdc[NORMALIZED_COLUMN][2]) and unconverted == 1
+    # The tracker's $ Value (M) is in millions
+    assert sfid[NORMALIZED_COLUMN][0] == 1_500_000
+    assert sfid[NORMALIZED_COLUMN][1:].isna().all()
@@ -0,0 +1,35 @@
+from datetime import datetime
+import pandas as pd
+import pytest
+from derivations import DERIVATIONS, derive_template, required_inputs, resolve_columns
+
+
+def test_dependencies_come_first():
+    order = resolve_columns(["Large Deal", "Bid Director"])
+    assert order.index("Est Deal Value") < order.index("Large Deal")
+    assert order.index("Group SBU") < order.index("Bid Director")
+    assert "Commercial Value" not in order
+
+
+def test_unknown_columns_are_skipped():
+    assert resolve_columns(["Not A Column", "SFID"]) == ["SFID"]
+
+
+def test_cycle_is_reported(monkeypatch):
+    monkeypatch.setitem(DERIVATIONS, "Loop A", (lambda ctx: None, ("Loop B",), ()))
+    monkeypatch.setitem(DERIVATIONS, "Loop B", (lambda ctx: None, ("Loop A",), ()))
+    with pytest.raises(ValueError, match="Circular derivation dependency"):
+        resolve_columns(["Loop A"])
+
+
+def test_only_requested_columns_are_derived(monkeypatch):
+    def explode(ctx):
+        raise AssertionError("an unrequested column was derived")
+
+    monkeypatch.setitem(DERIVATIONS, "Unrequested", (explode, (), ()))
+    sfid = pd.DataFrame({"SFID": ["S1"], "Account Name": ["Acme"]})
+    sfdc = pd.DataFrame({"Opportunity ID": ["O1"], "Group SBU": ["GM APAC"]})
+    derived = derive_template(sfid, sfdc, ["Bid Director", "SFID"], datetime(2024, 6, 3))
+    assert list(derived.columns) == ["Bid Director", "SFID"]
+    assert derived.iloc[0].tolist() == ["Piyush J", "S1"]
+    assert required_inputs(["Bid Director"]) == {"sfid": [], "sfdc": ["Group SBU"]}
@@ -0,0 +1,19 @@
+from concurrent.futures import ThreadPoolExecutor
+import openpyxl
+import pandas as pd
+from exports import write_xlsx_overflow
+
+
+def test_overflow_workbooks_from_an_export_thread(tmp_path):
+    template = openpyxl.Workbook()
+    template.active.title = "SFDC"
+    template.active.append(["SFID", "Value"])
+    df = pd.DataFrame({"SFID": [f"S{n}" for n in range(7)], "Value": range(7)})
+    output = str(tmp_path / "out.xlsx")
+    # export_frame runs every writer on a thread pool
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        files = executor.submit(write_xlsx_overflow, df, output, template, "SFDC", "workbooks", 3, 2).result()
+    # The row limit counts the header row, so each workbook takes two data rows
+    assert len(files) == 4
+    rows = [row for path in files for row in openpyxl.load_workbook(path)["SFDC"].iter_rows(min_row=2, values_only=True)]
+    assert [row[0] for row in rows] == df["SFID"].tolist()
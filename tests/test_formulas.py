@@ -0,0 +1,33 @@
+import openpyxl
+import pandas as pd
+from formulas import compile_formulas, evaluate_formulas
+
+HEADER = ["Key", "Name"]
+
+
+def _lookup_workbook():
+    wb = openpyxl.Workbook()
+    wb.active.title = "SFDC"
+    lookup = wb.create_sheet("Lookup")
+    for row in [("Key", "Name"), ("A", "alpha"), ("B", "beta"), ("C", "gamma")]:
+        lookup.append(row)
+    return wb
+
+
+def _evaluate(formula, keys):
+    derived = pd.DataFrame({"Key": keys, "Name": None})
+    compiled, errors = compile_formulas({"Name": formula}, HEADER, _lookup_workbook(), "SFDC")
+    errors.update(evaluate_formulas(derived, compiled))
+    assert not errors
+    return derived["Name"].tolist()
+
+
+def test_index_match_miss_stays_missing():
+    names = _evaluate("=INDEX(Lookup!$B$2:$B$4,MATCH(A2,Lookup!$A$2:$A$4,0))", ["b", "Z", None])
+    assert names[0] == "beta"
+    assert all(pd.isna(name) for name in names[1:])
+
+
+def test_iferror_catches_index_match_miss():
+    names = _evaluate('=IFERROR(INDEX(Lookup!$B$2:$B$4,MATCH(A2,Lookup!$A$2:$A$4,0)),"none")', ["C", "Z", None])
+    assert names == ["gamma", "none", "none"]
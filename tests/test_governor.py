@@ -0,0 +1,55 @@
+import logging
+from datetime import datetime
+import pandas as pd
+import pytest
+import governor
+from governor import MemoryGovernor, derive_in_chunks, parse_size, UNITS
+from derivations import derive_template
+
+MB = UNITS["M"]
+
+
+def _estimate(inputs, frame, rss=0):
+    return {"inputs": inputs * MB, "rows": 1000, "frame": frame * MB, "derive": 2 * frame * MB,
+            "peak": (rss + inputs + 2 * frame) * MB, "floor": (rss + max(inputs, frame)) * MB}
+
+
+@pytest.fixture(autouse=True)
+def no_rss(monkeypatch):
+    monkeypatch.setattr(governor, "current_rss", lambda: 0)
+
+
+@pytest.mark.parametrize("inputs, frame, mode", [(100, 100, "memory"), (300, 400, "chunked"), (300, 600, "spill")])
+def test_mode_follows_the_estimate(inputs, frame, mode):
+    assert MemoryGovernor(1000 * MB, _estimate(inputs, frame)).mode == mode
+
+
+def test_warns_when_the_budget_is_below_the_floor(caplog):
+    with caplog.at_level(logging.WARNING):
+        assert MemoryGovernor(500 * MB, _estimate(900, 100)).mode == "spill"
+    assert "only the derive stage can be bounded" in caplog.text
+
+
+def test_check_steps_down_a_mode(monkeypatch):
+    memory_governor = MemoryGovernor(1000 * MB, _estimate(100, 100))
+    monkeypatch.setattr(governor, "current_rss", lambda: 900 * MB)
+    memory_governor.check("matching")
+    assert memory_governor.mode == "chunked"
+
+
+def test_parse_size():
+    assert parse_size("4G") == 4 * UNITS["G"] and parse_size("3500M") == 3500 * MB and parse_size(2048) == 2048 * MB
+    assert parse_size(None) is None
+
+
+def test_spilled_chunks_collect_to_the_one_pass_frame(monkeypatch):
+    columns = ["SFID", "Account Name", "Opportunity Name"]
+    sfid = pd.DataFrame({"SFID": [f"S{n}" for n in range(10)], "Account Name": [f"A{n}" for n in range(10)]})
+    sfdc = pd.DataFrame({"Opportunity ID": [f"O{n}" for n in range(7)], "Opportunity Name": [f"N{n}" for n in range(7)]})
+    today = datetime(2024, 6, 3)
+    memory_governor = MemoryGovernor(1000 * MB, _estimate(300, 600))
+    monkeypatch.setattr(memory_governor, "chunk_rows", lambda n_columns: 3)
+    parts = derive_in_chunks(sfid, sfdc, columns, memory_governor, today)
+    assert all(isinstance(part, str) for part in parts)
+    pd.testing.assert_frame_equal(memory_governor.collect(parts),
+                                  derive_template(sfid, sfdc, columns, today).reset_index(drop=True))
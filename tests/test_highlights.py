@@ -0,0 +1,60 @@
+from datetime import date, timedelta
+import pandas as pd
+import pytest
+from highlights import highlight_codes, highlight_rules
+
+COLUMNS = ["SFID", "Opp. Status", "Large Deal", "Age", "Proposed Sub. Date"]
+
+
+def _frame():
+    today = date.today()
+    return pd.DataFrame({
+        "SFID": ["S1", "S2", "S3", "S4"],
+        "Opp. Status": ["OPEN", "OPEN", "WON", "OPEN"],
+        "Large Deal": ["Yes", "No", "Yes", "No"],
+        "Age": [10, 200, 300, 20],
+        "Proposed Sub. Date": [today - timedelta(days=5), today + timedelta(days=5),
+                               today - timedelta(days=5), None],
+    }, dtype=object)
+
+
+def test_rules_parse_targets_and_styles():
+    [rule] = highlight_rules([{"name": "Large", "where": ["Large Deal == Yes"], "fill": "FFF2CC",
+                               "bold": True, "columns": ["Large Deal", "SFID"]}], COLUMNS)
+    assert rule["predicates"] == [("Large Deal", "==", "Yes")]
+    assert rule["columns"] == [1, 3]
+    assert rule["fill"].start_color.rgb.endswith("FFF2CC")
+    assert rule["font"].bold
+
+
+def test_whole_row_is_the_default_target():
+    [rule] = highlight_rules([{"where": ["Age > 1"], "fill": "E7E6E6"}], COLUMNS)
+    assert rule["name"] == "Rule 1"
+    assert rule["columns"] == [1, 2, 3, 4, 5]
+    assert rule["font"] is None
+
+
+@pytest.mark.parametrize("config", [
+    {"name": "Bad where", "where": ["Region == EU"]},
+    {"name": "Bad target", "where": ["Age > 1"], "columns": ["Region"]},
+])
+def test_unknown_columns_are_rejected(config):
+    with pytest.raises(ValueError, match="Region"):
+        highlight_rules([config], COLUMNS)
+
+
+def test_first_matching_rule_wins():
+    rules = highlight_rules([
+        {"name": "Overdue", "where": ["Opp. Status == OPEN", "Proposed Sub. Date < today"], "fill": "F8CBAD"},
+        {"name": "Large", "where": ["Large Deal == Yes"], "fill": "FFF2CC"},
+        {"name": "Stale", "where": ["Age > 180"], "fill": "E7E6E6"},
+    ], COLUMNS)
+    # S1 is overdue and large, S2 stale, S3 large (closed, so not overdue) and stale, S4 nothing
+    assert highlight_codes(_frame(), rules).tolist() == [1, 3, 2, 0]
+
+
+def test_relative_dates_on_a_shifted_index():
+    rules = highlight_rules([{"name": "Recent", "where": ["Proposed Sub. Date >= today-7"], "fill": "F8CBAD"}],
+                            COLUMNS)
+    df = _frame().set_axis([10, 11, 12, 13])
+    assert highlight_codes(df, rules).tolist() == [1, 1, 1, 0]
@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+from matching import match_records, _similarity
+
+
+def _jaccard(a, b, n=3):
+    grams = [{f" {text} "[i:i + n] for i in range(max(len(text) + 3 - n, 1))} for text in (a, b)]
+    return len(grams[0] & grams[1]) / len(grams[0] | grams[1]) if a and b else 0.0
+
+
+def test_similarity_matches_set_jaccard():
+    left = pd.Series(["acme corp", "", "ab", "global tech"], index=[10, 11, 12, 13])
+    right = pd.Series(["acme", "global tech", "b"], index=[0, 1, 2])
+    left_rows, right_rows = [10, 10, 11, 12, 13, 13], [0, 1, 0, 2, 1, 1]
+    expected = [_jaccard(left[a], right[b]) for a, b in zip(left_rows, right_rows)]
+    np.testing.assert_allclose(_similarity(left, right, left_rows, right_rows, 3), expected)
+
+
+def test_key_then_fuzzy_matching():
+    sfid = pd.DataFrame({"SFID": ["X1", None, None], "Account Name": ["Acme", "Globex Corp", "Initech"],
+                         "Opportunity Name": ["Cloud", "ERP rollout", "Unrelated"]})
+    sfdc = pd.DataFrame({"Opportunity ID": ["Y9", "x1 ", "Z3"], "Account Name": ["Globex Corp.", "Acme", "Hooli"],
+                         "Opportunity Name": ["ERP roll-out", "Cloud", "Search"]})
+    matches = match_records(sfid, sfdc).set_index("Match Type")
+    assert matches.loc["key", ["SFID Row", "SFDC Row"]].tolist() == [0, 1]
+    assert matches.loc["fuzzy", ["SFID Row", "SFDC Row"]].tolist() == [1, 0]
+    assert matches.loc["unmatched", "SFID Row"] == 2 and matches.loc["sfdc_only", "SFDC Row"] == 2
@@ -0,0 +1,27 @@
+from datetime import datetime
+import pandas as pd
+from derivations import derive_template
+from parallel import derive_parallel
+
+COLUMNS = ["Account Name", "SFID", "Opportunity Name"]
+TODAY = datetime(2024, 6, 3)
+
+
+def test_mixed_object_columns_match_the_serial_derive():
+    # normalize_types leaves unconfigured columns alone, so numbers and text can share one
+    sfid = pd.DataFrame({"SFID": ["S1", "S2", "S3", "S4"], "Account Name": [1, "x", None, 2.5]})
+    sfdc = pd.DataFrame({"Opportunity ID": ["O1", "O2", "O3"], "Opportunity Name": ["a", 7, None],
+                         "Account Name": ["p", "q", "r"]})
+    expected = derive_template(sfid, sfdc, COLUMNS, TODAY)
+    derived = derive_parallel(sfid, sfdc, COLUMNS, workers=2, today=TODAY, min_partition_rows=1)
+    pd.testing.assert_frame_equal(derived, expected.reset_index(drop=True).reindex(columns=COLUMNS))
+
+
+def test_shared_memory_partitions_come_back_in_row_order():
+    sfid = pd.DataFrame({"SFID": [f"S{n}" for n in range(7)], "Account Name": [f"A{n}" for n in range(7)]})
+    sfdc = pd.DataFrame({"Opportunity ID": [f"O{n}" for n in range(9)], "Opportunity Name": [f"N{n}" for n in range(9)],
+                         "Account Name": [f"B{n}" for n in range(9)]})
+    expected = derive_template(sfid, sfdc, COLUMNS, TODAY)
+    derived = derive_parallel(sfid, sfdc, COLUMNS, workers=3, today=TODAY, min_partition_rows=1)
+    # Text comes back from Arrow as the string dtype rather than object
+    pd.testing.assert_frame_equal(derived, expected.reset_index(drop=True).reindex(columns=COLUMNS), check_dtype=False)
@@ -0,0 +1,27 @@
+import pandas as pd
+from exports import typed_frame
+from query import query_results
+
+
+def test_directory_source_skips_side_outputs(tmp_path):
+    for run, status in (("a", "CLOSED"), ("b", "OPEN")):
+        (tmp_path / run).mkdir()
+        pd.DataFrame({"SFID": [f"{run}1", f"{run}2"], "Opp. Status": [status, "OPEN"]}).to_parquet(
+            tmp_path / run / "Updated_Template.parquet", index=False)
+    pd.DataFrame({"Week": ["2024-W01"], "Person": ["A"], "Load": [1.0]}).to_parquet(tmp_path / "Workload.parquet")
+    pd.DataFrame({"Level": ["Total"], "Expected": [2.0]}).to_parquet(tmp_path / "Forecast.parquet")
+
+    df = query_results(str(tmp_path), where=["Opp. Status == CLOSED"])
+    assert sorted(df["SFID"]) == ["a1"]
+
+
+def test_directory_source_unifies_per_run_types(tmp_path):
+    # A value column left empty all week is written as string, and as double once it has values
+    for run, values in (("a", [None, None]), ("b", [2_000_000.0, 5.0])):
+        (tmp_path / run).mkdir()
+        typed_frame(pd.DataFrame({"SFID": [f"{run}1", f"{run}2"], "Opp. Status": ["OPEN", "OPEN"],
+                                  "Est Deal Value in USD": pd.Series(values, dtype=object)})).to_parquet(
+            tmp_path / run / "Updated_Template.parquet", index=False)
+
+    df = query_results(str(tmp_path), where=["Est Deal Value in USD >= 1000000"])
+    assert df["SFID"].tolist() == ["b1"]
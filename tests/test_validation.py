@@ -0,0 +1,80 @@
+import pandas as pd
+from validation import (check_date_ranges, check_dtypes, check_duplicate_keys, check_missing_columns,
+                        check_null_rates, check_rows, validate_inputs)
+
+
+def test_missing_required_is_error_and_mapped_is_warning():
+    df = pd.DataFrame({"SFID": ["S1"]})
+    issues = check_missing_columns(df, "SFID", ["SFID", "Account Name"], ["Account Name", "Region"])
+    found = {(issue["Column"], issue["Severity"]) for issue in issues}
+    assert found == {("Account Name", "error"), ("Region", "warning")}
+
+
+def test_unparsable_values_are_counted():
+    df = pd.DataFrame({"Close Date": ["2024-01-05", "not a date", None],
+                       "Amount": ["10", "ten", "12.5"]})
+    parsed = {}
+    issues = {issue["Check"]: issue for issue in
+              check_dtypes(df, "SFDC", {"Close Date": "date", "Amount": "numeric"}, parsed)}
+    assert issues["unparsable_date"]["Count"] == 1
+    assert issues["unparsable_numeric"]["Count"] == 1
+    assert "ten" in issues["unparsable_numeric"]["Detail"]
+    assert "Close Date" in parsed
+
+
+def test_numeric_stored_as_text_is_a_warning():
+    df = pd.DataFrame({"Amount": ["10", "20", None]})
+    [issue] = check_dtypes(df, "SFDC", {"Amount": "numeric"})
+    assert (issue["Check"], issue["Severity"], issue["Count"]) == ("numeric_as_text", "warning", 2)
+    assert check_dtypes(pd.DataFrame({"Amount": [10, 20]}), "SFDC", {"Amount": "numeric"}) == []
+
+
+def test_null_rate_above_limit():
+    df = pd.DataFrame({"Region": [None, None, "EU"], "Owner": ["a", "b", None]})
+    [issue] = check_null_rates(df, "SFID", ["Region", "Owner", "Absent"], 0.5)
+    assert (issue["Column"], issue["Count"]) == ("Region", 2)
+
+
+def test_duplicate_keys_ignore_empty_values():
+    df = pd.DataFrame({"SFID": ["S1", "S2", "S1", None, None]})
+    [issue] = check_duplicate_keys(df, "SFID", "SFID")
+    assert issue["Count"] == 2
+    assert issue["Detail"] == "e.g. S1"
+    assert check_duplicate_keys(df, "SFID", None) == []
+
+
+def test_dates_outside_range():
+    df = pd.DataFrame({"Close Date": ["1990-01-01", "2024-06-01", "2099-01-01"]})
+    [issue] = check_date_ranges(df, "SFDC", ["Close Date"], pd.Timestamp("2000-01-01"), pd.Timestamp("2030-01-01"))
+    assert issue["Count"] == 2
+
+
+def test_validate_inputs_builds_issues_and_profile():
+    sfid = pd.DataFrame({"SFID": ["S1", "S1"], "Account Name": ["Acme", None]})
+    sfdc = pd.DataFrame({"Opportunity ID": ["S1"], "Close Date": ["garbage"]})
+    config = {
+        "sfid_columns": {"sfid": "SFID", "account": "Account Name"},
+        "sfdc_columns": {"id": "Opportunity ID", "close": "Close Date"},
+        "validation": {
+            "sfid": {"required": ["SFID"], "key": "SFID"},
+            "sfdc": {"dtypes": {"Close Date": "date"}},
+        },
+    }
+    issues, profile = validate_inputs(sfid, sfdc, config)
+    assert set(zip(issues["Input"], issues["Check"])) == {("SFID", "duplicate_key"), ("SFDC", "unparsable_date")}
+    assert len(profile) == 4
+
+
+def test_row_rules_report_counts_and_samples():
+    df = pd.DataFrame({
+        "SFID": ["S1", "S2", "S3", ""],
+        "Created Date": ["2024-02-01", "2024-01-01", "2024-01-01", "2024-01-01"],
+        "Close Date": ["2024-01-01", "2024-03-01", "2024-03-01", "2024-03-01"],
+        "Probability": [50, 150, None, 10],
+    })
+    report = check_rows(df).set_index("Rule")
+    assert report.loc["missing SFID", "Count"] == 1
+    assert report.loc["Close Date before Created Date", "Sample"] == ["S1"]
+    assert report.loc["Probability outside 0-100", "Sample"] == ["S2"]
+    # Rules whose columns are absent are skipped rather than failing
+    assert "negative Est. Deal Value" not in report.index
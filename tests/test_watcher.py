@@ -0,0 +1,26 @@
+import script
+import watcher
+
+
+def test_run_passes_the_cache_and_survives_unexpected_errors(monkeypatch, tmp_path):
+    calls = []
+
+    def run_pipeline(*args):
+        calls.append(args)
+        raise RuntimeError("worksheet vanished")
+
+    monkeypatch.setattr(script, "run_pipeline", run_pipeline)
+    monkeypatch.setattr(script, "CONFIG_FILE", str(tmp_path / "config.yaml"))
+    (tmp_path / "config.yaml").write_text("file_paths: {}\n")
+    watcher.run_pipeline(str(tmp_path / "cache"))
+    assert calls and calls[0][-1] == str(tmp_path / "cache")
+
+
+def test_split_inputs_are_watched_part_by_part(tmp_path):
+    for name in ("dump_1.csv", "dump_2.csv"):
+        (tmp_path / name).write_text("a\n1\n")
+    pattern = str(tmp_path / "dump_*.csv")
+    input_watcher = watcher.InputWatcher([pattern])
+    assert watcher.inputs_present([pattern])
+    (tmp_path / "dump_3.csv").write_text("a\n2\n")
+    assert len(input_watcher.snapshot()) == 3 and input_watcher.snapshot() != input_watcher.last_snapshot
@@ -0,0 +1,295 @@
+import os
+import pandas as pd
+import yaml
+
+CONFIG_FILE = "config/config.yaml"
+DEFAULT_MAX_NULL_RATE = 0.5
+ISSUE_COLUMNS = ["Input", "Column", "Check", "Severity", "Count", "Detail"]
+
+
+def load_config(config_file=CONFIG_FILE):
+    """Loads the YAML pipeline configuration.
+
+    Args:
+        config_file (str, optional): Path to the YAML config. Defaults to CONFIG_FILE.
+
+    Returns:
+        dict: The parsed configuration, or an empty dict if the file does not exist.
+    """
+    if not os.path.exists(config_file):
+        return {}
+    with open(config_file) as f:
+        return yaml.safe_load(f) or {}
+
+
+def merge_config(base, overrides):
+    """Returns a copy of base with overrides merged in, recursing into nested sections.
+
+    Args:
+        base (dict): The loaded configuration.
+        overrides (dict): Settings to change; a None value clears the setting.
+
+    Returns:
+        dict: The merged configuration. Neither argument is modified.
+    """
+    merged = dict(base or {})
+    for name, value in (overrides or {}).items():
+        if isinstance(value, dict) and isinstance(merged.get(name), dict):
+            merged[name] = merge_config(merged[name], value)
+        else:
+            merged[name] = value
+    return merged
+
+
+def _issue(input_name, column, check, severity, count, detail=""):
+    return {
+        "Input": input_name,
+        "Column": column,
+        "Check": check,
+        "Severity": severity,
+        "Count": int(count),
+        "Detail": detail,
+    }
+
+
+def check_missing_columns(df, input_name, required, mapped):
+    """Reports required and mapped columns that are absent from the frame."""
+    issues = []
+    present = set(df.columns)
+    for col in required:
+        if col not in present:
+            issues.append(_issue(input_name, col, "missing_column", "error", 1, "required column not found"))
+    for col in mapped:
+        if col not in present and col not in required:
+            issues.append(_issue(input_name, col, "missing_column", "warning", 1, "mapped column not found"))
+    return issues
+
+
+def check_dtypes(df, input_name, dtypes, parsed_dates=None):
+    """Checks that date and numeric columns hold parsable values.
+
+    Each column is coerced in one vectorized call; values that were present
+    before coercion but null afterwards are the ones that failed to parse.
+    Coerced date columns are stored in parsed_dates so later checks reuse them.
+    """
+    issues = []
+    if parsed_dates is None:
+        parsed_dates = {}
+    for col, kind in dtypes.items():
+        if col not in df.columns:
+            continue
+        series = df[col]
+        if kind == "date":
+            if pd.api.types.is_datetime64_any_dtype(series):
+                parsed_dates[col] = series
+                continue
+            parsed = pd.to_datetime(series, errors="coerce")
+            parsed_dates[col] = parsed
+        elif kind == "numeric":
+            if pd.api.types.is_numeric_dtype(series):
+                continue
+            parsed = pd.to_numeric(series, errors="coerce")
+        else:
+            continue
+        bad = series.notna() & parsed.isna()
+        bad_count = int(bad.sum())
+        if bad_count:
+            sample = ", ".join(str(v) for v in series[bad].head(3))
+            issues.append(_issue(input_name, col, f"unparsable_{kind}", "error", bad_count, f"e.g. {sample}"))
+        elif kind == "numeric":
+            issues.append(_issue(input_name, col, "numeric_as_text", "warning", int(series.notna().sum()),
+                                 f"stored as {series.dtype}"))
+    return issues
+
+
+def check_null_rates(df, input_name, columns, max_null_rate, null_counts=None):
+    """Flags columns whose share of empty values exceeds max_null_rate."""
+    issues = []
+    columns = [col for col in columns if col in df.columns]
+    if not columns or df.empty:
+        return issues
+    if null_counts is None:
+        null_counts = df[columns].isna().sum()
+    null_rates = null_counts[columns] / len(df)
+    for col, rate in null_rates[null_rates > max_null_rate].items():
+        issues.append(_issue(input_name, col, "null_rate", "warning", null_counts[col],
+                             f"{rate:.1%} empty (limit {max_null_rate:.0%})"))
+    return issues
+
+
+def check_duplicate_keys(df, input_name, key):
+    """Reports rows that share a non-empty key value."""
+    if not key or key not in df.columns:
+        return []
+    keys = df[key].dropna()
+    dup_mask = keys.duplicated(keep=False)
+    dup_count = int(dup_mask.sum())
+    if not dup_count:
+        return []
+    sample = ", ".join(str(v) for v in keys[dup_mask].drop_duplicates().head(5))
+    return [_issue(input_name, key, "duplicate_key", "error", dup_count, f"e.g. {sample}")]
+
+
+def check_date_ranges(df, input_name, columns, min_date, max_date, parsed_dates=None):
+    """Flags dates that fall outside [min_date, max_date]."""
+    issues = []
+    parsed_dates = parsed_dates or {}
+    for col in columns:
+        if col not in df.columns:
+            continue
+        dates = parsed_dates.get(col)
+        if dates is None:
+            dates = pd.to_datetime(df[col], errors="coerce")
+        out_of_range = (dates < min_date) | (dates > max_date)
+        count = int(out_of_range.sum())
+        if count:
+            issues.append(_issue(input_name, col, "date_range", "warning", count,
+                                 f"outside {min_date.date()} .. {max_date.date()}"))
+    return issues
+
+
+def profile_frame(df, input_name, null_counts=None):
+    """Builds a per-column quality profile (dtype, null rate, distinct count, min/max)."""
+    if df.empty:
+        return pd.DataFrame(columns=["Input", "Column", "Dtype", "Rows", "Null Rate", "Distinct", "Min", "Max"])
+    if null_counts is None:
+        null_counts = df.isna().sum()
+    null_rates = null_counts / len(df)
+    distinct = df.nunique(dropna=True)
+    profile = pd.DataFrame({
+        "Input": input_name,
+        "Column": df.columns,
+        "Dtype": [str(dtype) for dtype in df.dtypes],
+        "Rows": len(df),
+        "Null Rate": null_rates.values.round(4),
+        "Distinct": distinct.values,
+    })
+    mins, maxs = [], []
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_datetime64_any_dtype(series):
+            mins.append(series.min())
+            maxs.append(series.max())
+        else:
+            mins.append(None)
+            maxs.append(None)
+    profile["Min"] = mins
+    profile["Max"] = maxs
+    return profile
+
+
+def validate_frame(df, input_name, rules, mapped_columns, max_null_rate, min_date, max_date, null_counts=None):
+    """Runs every configured check against one input frame.
+
+    Returns:
+        list: Issue dicts with ISSUE_COLUMNS keys.
+    """
+    dtypes = rules.get("dtypes", {}) or {}
+    date_columns = [col for col, kind in dtypes.items() if kind == "date"]
+    parsed_dates = {}
+    issues = []
+    issues += check_missing_columns(df, input_name, rules.get("required", []) or [], mapped_columns)
+    issues += check_dtypes(df, input_name, dtypes, parsed_dates)
+    issues += check_null_rates(df, input_name, mapped_columns, rules.get("max_null_rate", max_null_rate), null_counts)
+    issues += check_duplicate_keys(df, input_name, rules.get("key"))
+    issues += check_date_ranges(df, input_name, date_columns, min_date, max_date, parsed_dates)
+    return issues
+
+
+def validate_inputs(sfid_df, sfdc_dump_df, config):
+    """Validates both inputs against the configured schema.
+
+    Args:
+        sfid_df (pd.DataFrame): The SFID tracker frame (column names already stripped).
+        sfdc_dump_df (pd.DataFrame): The SFDC dump frame (column names already stripped).
+        config (dict): The parsed config.yaml.
+
+    Returns:
+        tuple: (issues_df, profile_df) with one row per issue and one row per input column.
+    """
+    settings = config.get("validation", {}) or {}
+    max_null_rate = settings.get("max_null_rate", DEFAULT_MAX_NULL_RATE)
+    date_range = settings.get("date_range", {}) or {}
+    min_date = pd.Timestamp(date_range.get("min", "2000-01-01"))
+    max_date = pd.Timestamp.today().normalize() + pd.DateOffset(years=date_range.get("max_years_ahead", 5))
+
+    # Null counts are the most expensive pass over text columns, so compute them once per frame
+    sfid_nulls = sfid_df.isna().sum()
+    sfdc_nulls = sfdc_dump_df.isna().sum()
+
+    issues = []
+    issues += validate_frame(sfid_df, "SFID", settings.get("sfid", {}) or {},
+                             list(dict.fromkeys((config.get("sfid_columns") or {}).values())),
+                             max_null_rate, min_date, max_date, sfid_nulls)
+    issues += validate_frame(sfdc_dump_df, "SFDC", settings.get("sfdc", {}) or {},
+                             list(dict.fromkeys((config.get("sfdc_columns") or {}).values())),
+                             max_null_rate, min_date, max_date, sfdc_nulls)
+
+    issues_df = pd.DataFrame(issues, columns=ISSUE_COLUMNS)
+    profile_df = pd.concat([profile_frame(sfid_df, "SFID", sfid_nulls), profile_frame(sfdc_dump_df, "SFDC", sfdc_nulls)],
+                           ignore_index=True)
+    return issues_df, profile_df
+
+
+ROW_ISSUE_COLUMNS = ["Rule", "Count", "Sample"]
+
+
+def _unparseable_dates(df, col):
+    return df[col].notna() & pd.to_datetime(df[col], errors="coerce").isna()
+
+
+def _blank(series):
+    return series.isna() | (series.astype(object).fillna("").astype(str).str.strip() == "")
+
+
+# Row rules over the derived frame: (rule, columns it needs, function returning a boolean mask)
+ROW_RULES = [
+    ("missing SFID", ["SFID"], lambda df: _blank(df["SFID"])),
+    ("unparseable Created Date", ["Created Date"], lambda df: _unparseable_dates(df, "Created Date")),
+    ("unparseable Close Date", ["Close Date"], lambda df: _unparseable_dates(df, "Close Date")),
+    ("unparseable Proposed Sub. Date", ["Proposed Sub. Date"], lambda df: _unparseable_dates(df, "Proposed Sub. Date")),
+    ("Close Date before Created Date", ["Close Date", "Created Date"],
+     lambda df: pd.to_datetime(df["Close Date"], errors="coerce") < pd.to_datetime(df["Created Date"], errors="coerce")),
+    ("Group SBU without a Bid Director", ["Group SBU", "Bid Director"],
+     lambda df: ~_blank(df["Group SBU"]) & (df["Bid Director"] == "-")),
+    ("no Opp. Status rule matched", ["Opp. Status"], lambda df: df["Opp. Status"].isna()),
+    ("negative Est. Deal Value", ["Est. Deal Value"],
+     lambda df: pd.to_numeric(df["Est. Deal Value"], errors="coerce") < 0),
+    ("Probability outside 0-100", ["Probability"],
+     lambda df: ~pd.to_numeric(df["Probability"], errors="coerce").between(0, 100) & df["Probability"].notna()),
+]
+
+
+def check_rows(df, rules=ROW_RULES, key="SFID", sample_size=5):
+    """Evaluates row-level rules over a frame, one vectorized mask per rule.
+
+    Rules whose columns are absent are skipped. Nothing is raised or printed
+    per row; each rule yields a count and a sample of the offending keys.
+
+    Args:
+        df (pd.DataFrame): The frame to check (normally the derived template).
+        rules (list, optional): (rule, columns, mask function) triples. Defaults to ROW_RULES.
+        key (str, optional): Column identifying a row in the samples. Defaults to "SFID".
+        sample_size (int, optional): Offending keys kept per rule.
+
+    Returns:
+        pd.DataFrame: One row per rule that matched at least one row (Rule, Count, Sample).
+    """
+    issues = []
+    for rule, columns, func in rules:
+        if not all(col in df.columns for col in columns):
+            continue
+        mask = func(df).fillna(False).astype(bool).to_numpy()
+        count = int(mask.sum())
+        if count:
+            sample = df.loc[mask, key].head(sample_size).tolist() if key in df.columns else []
+            issues.append({"Rule": rule, "Count": count, "Sample": sample})
+    return pd.DataFrame(issues, columns=ROW_ISSUE_COLUMNS)
+
+
+def write_quality_report(issues_df, profile_df, output_file):
+    """Writes the issues and column profile to a two-sheet workbook."""
+    os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+    with pd.ExcelWriter(output_file) as writer:
+        issues_df.to_excel(writer, sheet_name="Issues", index=False)
+        profile_df.to_excel(writer, sheet_name="Profile", index=False)
@@ -0,0 +1,210 @@
+import os
+import sys
+import time
+import zipfile
+import hashlib
+import argparse
+import importlib.util
+import threading
+from functools import partial
+from datetime import datetime
+from archive import file_hash
+from batch import CACHE_DIR
+from inputs import input_files
+from currency import FX_FILE
+from plugins import PLUGIN_DIR, unload_plugins
+from runlog import get_logger
+
+HAS_WATCHDOG = importlib.util.find_spec("watchdog") is not None
+
+DEFAULT_SETTLE_SECONDS = 5.0
+DEFAULT_POLL_INTERVAL = 2.0
+
+
+class InputWatcher:
+    """Waits for the watched input files to change and then to stop changing.
+
+    Change notifications come from watchdog (inotify on Linux, FSEvents on
+    macOS) when it is installed; otherwise the files are polled. A path may
+    be a glob, whose matching files are re-expanded on every check, so a
+    part file added to or removed from a split input counts as a change.
+    """
+
+    def __init__(self, paths, settle_seconds=DEFAULT_SETTLE_SECONDS, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.paths = list(dict.fromkeys(paths))
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.changed = threading.Event()
+        self.observer = None
+        self.last_snapshot = self.snapshot()
+
+    def start(self):
+        if not HAS_WATCHDOG:
+            return
+        from watchdog.observers import Observer
+        from watchdog.events import FileSystemEventHandler
+
+        changed = self.changed
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                changed.set()
+
+        self.observer = Observer()
+        for directory in {os.path.dirname(os.path.abspath(path)) for path in self.paths}:
+            if os.path.isdir(directory):
+                self.observer.schedule(Handler(), directory, recursive=False)
+        self.observer.start()
+
+    def stop(self):
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+
+    def files(self):
+        """The watched files, with globs expanded."""
+        return list(dict.fromkeys(file for path in self.paths for file in input_files(path)))
+
+    def snapshot(self):
+        """Returns (size, mtime) for every watched file that exists."""
+        state = {}
+        for path in self.files():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            state[path] = (stat.st_size, stat.st_mtime_ns)
+        return state
+
+    def wait_for_change(self):
+        """Blocks until a watched file is created, modified or removed."""
+        while True:
+            # Notifications only wake us early; the snapshot decides whether our files changed
+            self.changed.wait(timeout=self.poll_interval)
+            self.changed.clear()
+            current = self.snapshot()
+            if current != self.last_snapshot:
+                return
+
+    def wait_until_settled(self):
+        """Blocks until no watched file has changed for settle_seconds and every file is complete."""
+        previous = self.snapshot()
+        while True:
+            time.sleep(self.settle_seconds)
+            current = self.snapshot()
+            if current == previous and all(is_complete(path) for path in current):
+                self.last_snapshot = current
+                return current
+            previous = current
+
+
+def is_complete(path):
+    """A half-copied xlsx lacks its zip central directory, so it fails is_zipfile."""
+    if path.lower().endswith(".xlsx"):
+        return zipfile.is_zipfile(path)
+    return True
+
+
+def inputs_hash(paths):
+    """Combined content hash of the watched files, used to skip rebuilds of unchanged content."""
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        if os.path.exists(path):
+            digest.update(path.encode())
+            digest.update(file_hash(path).encode())
+    return digest.hexdigest()
+
+
+def inputs_present(paths):
+    """True when every required path exists, or for a glob, matches at least one file."""
+    return all(any(os.path.exists(file) for file in input_files(path)) for path in paths)
+
+
+def watched_paths(config):
+    """The optional files a run also reads, from the config: the FX table, the extra
+    layouts' template files and the derivation plugins."""
+    return ([(config.get("deal_values", {}) or {}).get("fx_file", FX_FILE)]
+            + [entry["template_file"] for entry in config.get("templates") or []]
+            + [os.path.join((config.get("plugins", {}) or {}).get("dir", PLUGIN_DIR), "*.py")])
+
+
+def run_pipeline(cache_dir=CACHE_DIR):
+    """Runs the pipeline in-process with freshly loaded plugins and a persistent parsed-input cache.
+
+    Inputs and the FX table go through the cache that batch.py uses, so after
+    a drop only the files whose content changed are parsed again. script logs
+    its own pipeline errors; anything else that escapes is logged with its
+    traceback so the daemon keeps watching.
+    """
+    import script
+    from validation import load_config
+    unload_plugins()
+    try:
+        script.run_pipeline(script.SFID_FILE, script.SFDC_DUMP_FILE, script.TEMPLATE_FILE, script.OUTPUT_FILE,
+                            load_config(script.CONFIG_FILE), script.CONFIG_FILE, cache_dir)
+    except script.PipelineError:
+        print("Pipeline run stopped early, see the messages above.")
+    except Exception as e:
+        get_logger().error(f"Error: Pipeline run failed: {e!r}", exc_info=True, extra={"stage": "watch"})
+        print("Pipeline run failed, still watching for changes.")
+
+
+def run_daemon(paths, settle_seconds=DEFAULT_SETTLE_SECONDS, poll_interval=DEFAULT_POLL_INTERVAL, run=run_pipeline,
+               optional_paths=()):
+    """Watches the input files and reruns the pipeline once a drop has settled.
+
+    Args:
+        paths (list): Files or globs that must exist before a run (inputs, template, config).
+        settle_seconds (float, optional): Quiet period required before a run.
+        poll_interval (float, optional): Polling period when watchdog is unavailable.
+        run (callable, optional): The pipeline entry point. Defaults to run_pipeline.
+        optional_paths (list, optional): Files or globs that also trigger a run but
+            need not exist (FX table, layout templates, plugins).
+    """
+    watcher = InputWatcher(list(paths) + list(optional_paths), settle_seconds, poll_interval)
+    watcher.start()
+    mode = "filesystem notifications" if HAS_WATCHDOG else f"polling every {poll_interval}s"
+    print(f"Watching {', '.join(watcher.paths)} ({mode}). Press Ctrl+C to stop.")
+    last_hash = None
+    try:
+        if inputs_present(paths):
+            watcher.wait_until_settled()
+            last_hash = inputs_hash(watcher.files())
+            run()
+        while True:
+            watcher.wait_for_change()
+            print(f"{datetime.now():%H:%M:%S} Change detected, waiting for files to settle...")
+            watcher.wait_until_settled()
+            current_hash = inputs_hash(watcher.files())
+            if current_hash == last_hash:
+                print(f"{datetime.now():%H:%M:%S} Content unchanged, skipping rebuild.")
+                continue
+            if not inputs_present(paths):
+                print(f"{datetime.now():%H:%M:%S} Waiting for all input files to be present.")
+                continue
+            last_hash = current_hash
+            print(f"{datetime.now():%H:%M:%S} Inputs changed, running pipeline.")
+            run()
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+    finally:
+        watcher.stop()
+
+
+def main(argv=None):
+    import script
+    from validation import load_config
+    parser = argparse.ArgumentParser(description="Rerun the pipeline whenever the input files change.")
+    parser.add_argument("--settle", type=float, default=DEFAULT_SETTLE_SECONDS,
+                        help="Seconds the files must stay unchanged before a run")
+    parser.add_argument("--poll", type=float, default=DEFAULT_POLL_INTERVAL,
+                        help="Polling interval when watchdog is not installed")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="Parsed-input cache reused between runs")
+    args = parser.parse_args(argv)
+    paths = [script.SFID_FILE, script.SFDC_DUMP_FILE, script.TEMPLATE_FILE, script.CONFIG_FILE]
+    run_daemon(paths, args.settle, args.poll, partial(run_pipeline, args.cache_dir),
+               watched_paths(load_config(script.CONFIG_FILE)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
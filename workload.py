@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+WEEK_COLUMN = "Proposed Sub. Date"
+STATUS_COLUMN = "Opp. Status"
+# (role, person column, allocation column or None) pairs of the weekly template
+ROLE_COLUMNS = [
+    ("Proposal Owner", "Proposal Owner", "Allocation% Proposal Owner 1"),
+    ("Proposal Owner", "Proposal Owner 2", "Allocation% Proposal Owner 2"),
+    ("Proposal Writer", "Proposal Writer", "Allocation% Proposal Writer 1"),
+    ("Proposal Writer", "Proposal Writer 2", "Allocation% Proposal Writer 2"),
+    ("Solution SPOC", "Solution SPOCs", None),
+    ("Delivery SPOC", "Delivery SPOC", None),
+    ("Orals SPOC", "Orals SPOC", None),
+]
+# Separators between several names in one cell, e.g. "Asha K / Ravi M, Li W"
+NAME_SEPARATORS = r"\s*(?:[,;/&\n]|\band\b)\s*"
+WORKLOAD_COLUMNS = ["Week", "Person", "Roles", "Opportunities", "Load", "Overloaded"]
+
+
+def _allocation(values, default):
+    """Allocation shares as fractions: 50 and 0.5 both mean half; blanks take the default."""
+    share = pd.to_numeric(values.astype(str).str.strip().str.rstrip("%"), errors="coerce")
+    share = share.where(share <= 1, share / 100)
+    return share.fillna(default)
+
+
+def assignments(derived, role_columns=ROLE_COLUMNS, statuses=("OPEN",), default_allocation=1.0):
+    """Reshapes the person/allocation column pairs into one row per (opportunity, person, role).
+
+    Each pair becomes a slice of the long frame in one column operation;
+    cells naming several people are split and exploded, and the SPOC roles,
+    which carry no allocation column, count as default_allocation.
+
+    Args:
+        derived (pd.DataFrame): The derived template frame.
+        role_columns (list, optional): (role, person column, allocation column) triples.
+        statuses (tuple, optional): Opp. Status values that count towards load; None counts every row.
+        default_allocation (float, optional): Share used when a cell has no allocation.
+
+    Returns:
+        pd.DataFrame: Columns Row, Week, Person, Role and Allocation.
+    """
+    rows = derived
+    if statuses is not None and STATUS_COLUMN in rows.columns:
+        rows = rows[rows[STATUS_COLUMN].isin(list(statuses))]
+    dates = pd.to_datetime(rows[WEEK_COLUMN], errors="coerce") if WEEK_COLUMN in rows.columns else \
+        pd.Series(pd.NaT, index=rows.index)
+    week = (dates - pd.to_timedelta(dates.dt.dayofweek, unit="D")).dt.normalize()
+
+    slices = []
+    for role, person_column, allocation_column in role_columns:
+        if person_column not in rows.columns:
+            continue
+        allocation = (_allocation(rows[allocation_column], default_allocation)
+                      if allocation_column and allocation_column in rows.columns
+                      else pd.Series(default_allocation, index=rows.index))
+        slices.append(pd.DataFrame({"Row": rows.index, "Week": week, "Person": rows[person_column].astype(object),
+                                    "Role": role, "Allocation": allocation}))
+    if not slices:
+        return pd.DataFrame(columns=["Row", "Week", "Person", "Role", "Allocation"])
+    long = pd.concat(slices, ignore_index=True)
+    long = long[long["Person"].notna() & long["Week"].notna()]
+    long["Person"] = long["Person"].astype("string").str.strip()
+    # Only the cells that actually name several people go through split and explode
+    several = long["Person"].str.contains(NAME_SEPARATORS, regex=True)
+    if several.any():
+        split = long[several].assign(Person=long.loc[several, "Person"].str.split(NAME_SEPARATORS, regex=True))
+        split = split.explode("Person")
+        split["Person"] = split["Person"].astype("string").str.strip()
+        long = pd.concat([long[~several], split], ignore_index=True)
+    return long[long["Person"].ne("") & ~long["Person"].isin(["-", "--", "nan", "None"])].reset_index(drop=True)
+
+
+def workload_rollup(derived, capacity=3.0, **options):
+    """Load per person and week of Proposed Sub. Date.
+
+    Args:
+        derived (pd.DataFrame): The derived template frame.
+        capacity (float, optional): Load above which a person-week is flagged as overloaded.
+        **options: Passed to assignments (role_columns, statuses, default_allocation).
+
+    Returns:
+        pd.DataFrame: WORKLOAD_COLUMNS, busiest person-weeks first within each week.
+    """
+    long = assignments(derived, **options)
+    if long.empty:
+        return pd.DataFrame(columns=WORKLOAD_COLUMNS)
+    # Roles are summed as bit flags per person-week, then each distinct flag set is labelled once
+    role_names = list(dict.fromkeys(role for role, _, _ in options.get("role_columns", ROLE_COLUMNS)))
+    long["Flag"] = np.left_shift(1, long["Role"].map({role: bit for bit, role in enumerate(role_names)}))
+    long["First"] = ~long.duplicated(["Week", "Person", "Row"])
+    long["Flag"] = long["Flag"].where(~long.duplicated(["Week", "Person", "Role"]), 0)
+    rollup = long.groupby(["Week", "Person"], sort=False).agg(
+        Opportunities=("First", "sum"), Load=("Allocation", "sum"), Flags=("Flag", "sum")).reset_index()
+    labels = {flags: ", ".join(role for bit, role in enumerate(role_names) if flags >> bit & 1)
+              for flags in rollup["Flags"].unique()}
+    rollup["Roles"] = rollup["Flags"].map(labels)
+    rollup["Load"] = rollup["Load"].round(2)
+    rollup["Overloaded"] = np.where(rollup["Load"] > capacity, "Yes", "No")
+    rollup["Week"] = rollup["Week"].dt.date
+    return rollup.sort_values(["Week", "Load", "Person"], ascending=[True, False, True],
+                              kind="stable")[WORKLOAD_COLUMNS].reset_index(drop=True)
+